@@ -0,0 +1,174 @@
+# Python imports
+from psycopg2 import sql
+from dagster import get_dagster_logger
+
+# Custom imports
+from summary_tables import (
+    GRADES,
+    INSPECTION_TABLES,
+    RESTAURANT_COLUMNS,
+    TOP_GRADED,
+    TOP_RESTAURANTS,
+)
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Columns the restaurant and open inspection histograms are colored by
+RESTAURANT_HUES = RESTAURANT_COLUMNS[1:4]
+OPEN_INSPECTION_HUES = RESTAURANT_COLUMNS[1:]
+
+TOP_RESTAURANT_NAMES = """
+    SELECT name, count(*) AS count FROM nyc_restraunts_cleaned
+    GROUP BY name ORDER BY count DESC, name LIMIT %(limit)s
+"""
+
+# Top names per grade, ranked by a window over the per-name counts
+TOP_GRADED_NAMES = sql.SQL(
+    """
+    SELECT grade, name, count FROM (
+        SELECT grade, name, count(*) AS count,
+            row_number() OVER (PARTITION BY grade ORDER BY count(*) DESC, name) AS rank
+        FROM {table} GROUP BY grade, name
+    ) AS ranked WHERE rank <= %(limit)s ORDER BY grade, rank
+    """
+)
+
+QUARTER_COUNTS = sql.SQL(
+    "SELECT quarter, count(*) AS count FROM {table} GROUP BY quarter ORDER BY quarter"
+)
+
+# Counts per bin and hue of a histogram, without NULL bins like the pandas groupby
+HUE_COUNTS = sql.SQL(
+    """
+    SELECT {x}, {hue}, {count}::bigint AS count FROM {table}
+    WHERE {x} IS NOT NULL AND {hue} IS NOT NULL
+    GROUP BY {x}, {hue} ORDER BY {x}, {hue}
+    """
+)
+
+DISTINCT_NAMES = sql.SQL("SELECT count(DISTINCT name) FROM {table}")
+
+# Inspections of both sources in the whole months both cover, with each state's total
+COMMON_WINDOW = """
+    WITH inspections AS (
+        SELECT 'nyc' AS state, date_trunc('month', inspection_date)::date AS month_start,
+            year, grade
+        FROM nyc_inspection_cleaned
+        UNION ALL
+        SELECT 'la', date_trunc('month', inspection_date)::date, year, grade
+        FROM la_inspection_cleaned
+    ),
+    common_window AS (
+        SELECT max(first_month) AS first_month, min(last_month) AS last_month FROM (
+            SELECT min(month_start) AS first_month, max(month_start) AS last_month
+            FROM inspections GROUP BY state
+        ) AS months
+    ),
+    common AS (
+        SELECT i.state, i.year, i.grade FROM inspections i, common_window w
+        WHERE i.month_start BETWEEN w.first_month AND w.last_month
+    ),
+    totals AS (SELECT state, count(*) AS total FROM common GROUP BY state)
+"""
+
+GRADE_SHARE = (
+    COMMON_WINDOW
+    + """
+    SELECT grade, count(*) AS count,
+        round(count(*) * 100.0 / total, 2)::float8 AS "grade%", state
+    FROM common JOIN totals USING (state)
+    GROUP BY state, total, grade ORDER BY state DESC, grade
+"""
+)
+
+YEARLY_GRADE_SHARE = (
+    COMMON_WINDOW
+    + """
+    SELECT grade, year, count(*) AS count,
+        round(count(*) * 100.0 / total, 2)::float8 AS "grade%", state
+    FROM common JOIN totals USING (state)
+    GROUP BY state, total, grade, year ORDER BY state DESC, grade, year
+"""
+)
+
+
+def hue_counts(postgres_obj, table_name, x, hue, count=None):
+    """
+    Counts the rows of a table per histogram bin and hue.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+        table_name (str): The table to count.
+        x (str): Column name of the bins.
+        hue (str): Column name of the hue.
+        count (str, optional): Column name of counts to sum. Default is None, counting rows.
+
+    Returns:
+        pandas.DataFrame: x, hue and count columns.
+    """
+    query = HUE_COUNTS.format(
+        x=sql.Identifier(x),
+        hue=sql.Identifier(hue),
+        count=sql.SQL("sum({})").format(sql.Identifier(count))
+        if count
+        else sql.SQL("count(*)"),
+        table=sql.Identifier(table_name),
+    )
+    return postgres_obj.fetch_query(query)
+
+
+def sql_datasets(postgres_obj):
+    """
+    Computes the data of every run_analysis chart inside PostgresDB.
+
+    The statistics are computed from the cleaned tables, so only the chart-sized result
+    sets are fetched. The open restaurant inspections are joined on restaurant keys built
+    outside the database and are aggregated from nyc_open_inspection_summary instead.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+
+    Returns:
+        dict: Dataset name to its DataFrame, as built by data_analysis.pandas_datasets.
+    """
+    datasets = {
+        "top_restaurants": postgres_obj.fetch_query(
+            TOP_RESTAURANT_NAMES, {"limit": TOP_RESTAURANTS}
+        )
+    }
+    for hue in RESTAURANT_HUES:
+        datasets[f"restaurants_by_{hue}"] = hue_counts(
+            postgres_obj, "nyc_restraunts_cleaned", "borough", hue
+        )
+
+    for source, table_name in INSPECTION_TABLES.items():
+        table = sql.Identifier(table_name)
+        datasets[f"{source}_quarters"] = postgres_obj.fetch_query(
+            QUARTER_COUNTS.format(table=table)
+        )
+        top = postgres_obj.fetch_query(
+            TOP_GRADED_NAMES.format(table=table), {"limit": TOP_GRADED}
+        )
+        for grade in GRADES:
+            top_grade = top[top.grade == grade]
+            datasets[f"{source}_top_{grade}"] = top_grade[["name", "count"]]
+
+    datasets["open_borough_grades"] = hue_counts(
+        postgres_obj, "nyc_open_inspection_summary", "borough", "grade", "count"
+    )
+    for hue in OPEN_INSPECTION_HUES:
+        datasets[f"open_grades_by_{hue}"] = hue_counts(
+            postgres_obj, "nyc_open_inspection_summary", "grade", hue, "count"
+        )
+
+    datasets["grade_share"] = postgres_obj.fetch_query(GRADE_SHARE)
+    yearly = postgres_obj.fetch_query(YEARLY_GRADE_SHARE)
+    for grade in GRADES:
+        yearly_grade = yearly[yearly.grade == grade]
+        datasets[f"grade_share_{grade}_yearly"] = yearly_grade[
+            ["year", "count", "grade%", "state"]
+        ]
+
+    logger.info(f"PostgresDB: {len(datasets)} Analysis Datasets Computed.")
+    return datasets
@@ -1,5 +1,24 @@
 # Python Imports
+import contextlib
+import hashlib
+import json
+import os
+import re
+import pandas as pd
 import plotly.express as px
+from dagster import get_dagster_logger
+
+# Custom Imports
+from ingestion_utils import bounded_map, process_pool
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Charts collected instead of shown while inside collect_charts, with their folder
+_collector = None
+
+# File recording the content hash each exported chart was rendered from
+MANIFEST = "manifest.json"
 
 
 def pie_chart(df, x, y, title):
@@ -12,8 +31,7 @@ def pie_chart(df, x, y, title):
         y (str): Column name for values.
         title (str): Title of the chart.
     """
-    fig = px.pie(df, values=y, names=x, title=title)
-    fig.show()
+    _draw("pie", df, title, x=x, y=y)
 
 
 def bar_chart(df, x, y, title, color=None):
@@ -27,28 +45,25 @@ def bar_chart(df, x, y, title, color=None):
         title (str): Title of the chart.
         color (str, optional): Column name for color encoding. Default is None.
     """
-    if not color:
-        fig = px.bar(df, x=x, y=y, title=title)
-    else:
-        fig = px.bar(df, x=x, y=y, title=title, color=color, barmode="group")
-    fig.show()
+    _draw("bar", df, title, x=x, y=y, color=color)
 
 
-def hist_chart(df, x, title, hue=None):
+def hist_chart(df, x, title, hue=None, y=None):
     """
     Generate histogram based on dataframe values.
 
+    The counts per bin are aggregated here, so only one row per bar is handed to plotly
+    instead of the rows to bin.
+
     Args:
         df (pandas.DataFrame): Input dataframe containing chart data.
         x (str): Column name for histogram bins.
         title (str): Title of the chart.
         hue (str, optional): Column name for color encoding. Default is None.
+        y (str, optional): Column name of pre-aggregated counts summed per bin. Default is
+            None, counting rows.
     """
-    if not hue:
-        fig = px.histogram(df, x=x, title=title)
-    else:
-        fig = px.histogram(df, x=x, color=hue, barmode="group", title=title)
-    fig.show()
+    _draw("hist", bin_counts(df, x, hue, y), title, x=x, y="count", hue=hue)
 
 
 def map_chart(df, x, y, title):
@@ -61,17 +76,222 @@ def map_chart(df, x, y, title):
         y (str): Column name for marker size.
         title (str): Title of the chart.
     """
-    px.set_mapbox_access_token("YOUR_MAPBOX_TOKEN")
-
-    fig = px.scatter_mapbox(
-        df,
-        lat="latitude",
-        lon="longitude",
-        color=x,
-        size=y,
-        hover_name=x,
-        zoom=9,
-        mapbox_style="carto-darkmatter",
-        title=title,
+    _draw("map", df, title, x=x, y=y)
+
+
+def bin_counts(df, x, hue=None, y=None):
+    """
+    Aggregates the bar heights of a histogram over categorical bins.
+
+    Args:
+        df (pandas.DataFrame): Input dataframe containing chart data.
+        x (str): Column name for histogram bins.
+        hue (str, optional): Column name for color encoding. Default is None.
+        y (str, optional): Column name of counts to sum. Default is None, counting rows.
+
+    Returns:
+        pandas.DataFrame: The x and hue columns and a count column, one row per bar.
+    """
+    by = [x] if not hue else [x, hue]
+    grouped = df.groupby(by, observed=True, sort=True)
+    counts = grouped[y].sum() if y else grouped.size()
+    return counts.rename("count").reset_index()
+
+
+def compare_datasets(expected, actual, atol=0.01):
+    """
+    Compares the chart data computed by two analysis backends.
+
+    Rows are compared in sorted order, ignoring dtypes, and values may differ by `atol` to
+    allow for rounding percentages half-even in numpy and half away from zero in SQL.
+
+    Args:
+        expected (dict): Dataset name to DataFrame, e.g. of the pandas backend.
+        actual (dict): Dataset name to DataFrame of the backend checked against it.
+        atol (float): Absolute tolerance of numeric values.
+
+    Returns:
+        list: Names of the datasets that differ or are missing from either side.
+    """
+    mismatches = []
+    for name in sorted(set(expected) | set(actual)):
+        if name not in expected or name not in actual:
+            logger.error(f"Analysis Dataset {name} Missing From One Backend.")
+            mismatches.append(name)
+            continue
+
+        left, right = (
+            df.sort_values(list(df.columns)).reset_index(drop=True)
+            for df in (expected[name], actual[name])
+        )
+        try:
+            pd.testing.assert_frame_equal(
+                left, right, check_dtype=False, check_exact=False, atol=atol, rtol=0
+            )
+        except AssertionError as e:
+            logger.error(f"Analysis Dataset {name} Differs: {e}")
+            mismatches.append(name)
+    return mismatches
+
+
+def make_figure(kind, df, title, x, y, color=None, hue=None):
+    """
+    Builds the plotly figure of a chart.
+
+    Args:
+        kind (str): "pie", "bar", "hist" or "map".
+        df (pandas.DataFrame): The chart data.
+        title (str): Title of the chart.
+        x (str): Column name of the labels, bins or map colors.
+        y (str): Column name of the values, counts or marker sizes.
+        color (str, optional): Column name for bar color encoding.
+        hue (str, optional): Column name for histogram color encoding.
+
+    Returns:
+        plotly.graph_objects.Figure: The figure.
+    """
+    if kind == "pie":
+        return px.pie(df, values=y, names=x, title=title)
+    if kind == "bar":
+        if not color:
+            return px.bar(df, x=x, y=y, title=title)
+        return px.bar(df, x=x, y=y, title=title, color=color, barmode="group")
+    if kind == "hist":
+        if not hue:
+            return px.histogram(df, x=x, y=y, title=title)
+        return px.histogram(df, x=x, y=y, color=hue, barmode="group", title=title)
+    if kind == "map":
+        px.set_mapbox_access_token("YOUR_MAPBOX_TOKEN")
+        return px.scatter_mapbox(
+            df,
+            lat="latitude",
+            lon="longitude",
+            color=x,
+            size=y,
+            hover_name=x,
+            zoom=9,
+            mapbox_style="carto-darkmatter",
+            title=title,
+        )
+    raise ValueError(f"Unsupported chart kind {kind}.")
+
+
+def _draw(kind, df, title, **params):
+    """
+    Shows a chart, or collects it for export inside collect_charts.
+    """
+    if _collector is not None:
+        charts, folder = _collector
+        charts.append((folder, kind, df, title, params))
+    else:
+        make_figure(kind, df, title, **params).show()
+
+
+@contextlib.contextmanager
+def collect_charts(charts, folder=""):
+    """
+    Collects the charts drawn inside the block instead of showing them.
+
+    Args:
+        charts (list): List the charts are appended to, or None to show them as usual.
+        folder (str): Sub-directory of the export directory the charts are written to.
+    """
+    global _collector
+    if charts is None:
+        yield
+        return
+
+    previous, _collector = _collector, (charts, folder)
+    try:
+        yield
+    finally:
+        _collector = previous
+
+
+def chart_hash(kind, df, title, params):
+    """
+    Returns the content hash of a chart: its kind, title, parameters and data.
+
+    Args:
+        kind (str): The chart kind.
+        df (pandas.DataFrame): The chart data.
+        title (str): Title of the chart.
+        params (dict): The remaining make_figure arguments.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([kind, title, params], sort_keys=True).encode())
+    digest.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _render(chart):
+    """
+    Renders one chart to its files; runs in the worker processes.
+    """
+    kind, df, title, params, paths = chart
+    fig = make_figure(kind, df, title, **params)
+    for path in paths:
+        if path.endswith(".html"):
+            # Load plotly.js from its CDN rather than inlining it in every file
+            fig.write_html(path, include_plotlyjs="cdn")
+        else:
+            fig.write_image(path)
+    return paths
+
+
+def export_charts(charts, plots_dir="plots", formats=("png",), processes=1):
+    """
+    Renders collected charts to static files, skipping charts whose data did not change.
+
+    Each chart is written to <plots_dir>/<folder>/<title>.<format>. The content hash of
+    every rendered chart is recorded in the manifest, and charts whose hash and files are
+    unchanged since the previous export are not rendered again. Rendering runs on
+    `processes` worker processes if more than one.
+
+    Args:
+        charts (list): Charts collected by collect_charts.
+        plots_dir (str): The export directory.
+        formats (list): File formats, "png", "svg" or "html". Images need kaleido.
+        processes (int): Number of worker processes, 1 to render in this process.
+
+    Returns:
+        dict: Numbers of "rendered" and "skipped" charts.
+    """
+    manifest_path = os.path.join(plots_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    stale, hashes = [], {}
+    for folder, kind, df, title, params in charts:
+        name = os.path.join(folder, re.sub(r"[^\w\s%-]", "", title).strip())
+        paths = [os.path.join(plots_dir, f"{name}.{fmt}") for fmt in formats]
+        hashes[name] = chart_hash(kind, df, title, params)
+
+        if manifest.get(name) == hashes[name] and all(map(os.path.exists, paths)):
+            continue
+        os.makedirs(os.path.join(plots_dir, folder), exist_ok=True)
+        stale.append((kind, df, title, params, paths))
+
+    if processes <= 1:
+        list(map(_render, stale))
+    else:
+        with process_pool(processes, ["analysis_utils"]) as pool:
+            list(bounded_map(pool, _render, stale, depth=2 * processes))
+
+    manifest.update(hashes)
+    os.makedirs(plots_dir, exist_ok=True)
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+    stats = {"rendered": len(stale), "skipped": len(charts) - len(stale)}
+    logger.info(
+        f"Charts Exported To {plots_dir} - {stats['rendered']} Rendered, "
+        f"{stats['skipped']} Unchanged."
     )
-    fig.show()
+    return stats
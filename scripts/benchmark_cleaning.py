@@ -0,0 +1,131 @@
+# Python imports
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# Custom imports
+from data_preprocessing import NYC_INSPECTION_CLEANING, LA_INSPECTION_CLEANING
+from summary_tables import GRADES
+
+
+def legacy_nyc_inspection(df):
+    """
+    The NYC inspection cleaning as the preprocess op ran it before the cleaning engine.
+    """
+    df = df.drop_duplicates()
+    df = df[["DBA", "BORO", "INSPECTION DATE", "GRADE"]]
+    df = df.dropna(subset=["GRADE"], how="all")
+    df = df[df.GRADE.isin(GRADES)]
+    df["INSPECTION DATE"] = pd.to_datetime(df["INSPECTION DATE"])
+    df = df[df["INSPECTION DATE"].dt.year >= 2016]
+    df.columns = ["name", "borough", "inspection_date", "grade"]
+    df["name"] = df["name"].str.lower()
+    df["month"] = df["inspection_date"].dt.month
+    df["year"] = df["inspection_date"].dt.year
+    df["quarter"] = df["inspection_date"].dt.quarter
+    df["name"] = df["name"].astype("string")
+    df["borough"] = df["borough"].astype("string")
+    df["grade"] = df["grade"].astype("string")
+    return df
+
+
+def legacy_la_inspection(df):
+    """
+    The LA inspection cleaning as the preprocess op ran it before the cleaning engine.
+    """
+    df = df.drop_duplicates()
+    df = df[["activity_date", "facility_name", "grade"]]
+    df = df[df.grade.isin(GRADES)]
+    df.columns = ["inspection_date", "name", "grade"]
+    df["inspection_date"] = pd.to_datetime(df["inspection_date"])
+    df["name"] = df["name"].str.lower()
+    df["month"] = df["inspection_date"].dt.month
+    df["year"] = df["inspection_date"].dt.year
+    df["quarter"] = df["inspection_date"].dt.quarter
+    df["name"] = df["name"].astype("string")
+    df["grade"] = df["grade"].astype("string")
+    return df
+
+
+def nyc_inspection_rows(rows, rng):
+    """
+    Generates NYC inspection CSV rows: one row per violation, several per inspection.
+    """
+    restaurants = np.array([f"Restaurant {i}" for i in range(rows // 20 + 1)])
+    days = pd.date_range("2012-01-01", "2023-12-31").strftime("%m/%d/%Y").to_numpy()
+    df = pd.DataFrame(
+        {
+            "CAMIS": rng.integers(0, len(restaurants), rows),
+            "DBA": rng.choice(restaurants, rows),
+            "BORO": rng.choice(["Bronx", "Brooklyn", "Manhattan", "Queens"], rows),
+            "INSPECTION DATE": rng.choice(days, rows),
+            "VIOLATION CODE": rng.choice(["02G", "04L", "06C", "08A", "10F"], rows),
+            "GRADE": rng.choice(["A", "B", "C", "N", "Z", None], rows),
+        }
+    )
+    for i in range(20):
+        df[f"COLUMN {i}"] = rng.choice(["x", "y", "z"], rows)
+    return df
+
+
+def la_inspection_rows(rows, rng):
+    """
+    Generates LA inspection JSON rows: one row per inspection.
+    """
+    facilities = np.array([f"FACILITY {i}" for i in range(rows // 10 + 1)])
+    days = pd.date_range("2016-01-01", "2023-12-31").strftime("%Y-%m-%dT00:00:00.000")
+    df = pd.DataFrame(
+        {
+            "serial_number": [f"DA{i:08d}" for i in range(rows)],
+            "activity_date": rng.choice(days.to_numpy(), rows),
+            "facility_name": rng.choice(facilities, rows),
+            "grade": rng.choice(["A", "B", "C", " "], rows),
+        }
+    )
+    for i in range(10):
+        df[f"column_{i}"] = rng.choice(["x", "y", "z"], rows)
+    return df
+
+
+def rows_per_second(clean, df, repeat):
+    """
+    Returns the best rows/second of `repeat` runs of a cleaning function on a copy of `df`.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        data = df.copy()
+        start = time.perf_counter()
+        clean(data)
+        best = min(best, time.perf_counter() - start)
+    return len(df) / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the cleaning pipelines.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    benchmarks = [
+        (
+            "nyc_inspection",
+            nyc_inspection_rows(args.rows, rng),
+            legacy_nyc_inspection,
+            NYC_INSPECTION_CLEANING.apply,
+        ),
+        (
+            "la_inspection",
+            la_inspection_rows(args.rows, rng),
+            legacy_la_inspection,
+            LA_INSPECTION_CLEANING.apply,
+        ),
+    ]
+
+    print(f"{'source':<16}{'legacy rows/s':>16}{'engine rows/s':>16}{'speedup':>10}")
+    for name, df, legacy, engine in benchmarks:
+        before = rows_per_second(legacy, df, args.repeat)
+        after = rows_per_second(engine, df, args.repeat)
+        print(f"{name:<16}{before:>16,.0f}{after:>16,.0f}{after / before:>9.1f}x")
@@ -0,0 +1,102 @@
+# Python imports
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# Custom imports
+from rollup import GradeCube
+from summary_tables import GRADES
+
+DIMS = ["year", "quarter", "month", "borough"]
+
+
+def inspection_rows(rows, rng):
+    """
+    Generates cleaned NYC inspection rows, with the categorical columns of preprocessing.
+    """
+    names = pd.Index(sorted(f"restaurant {i}" for i in range(rows // 20 + 1)))
+    days = pd.date_range("2016-01-01", "2023-12-31")
+    dates = pd.DatetimeIndex(days[rng.integers(0, len(days), rows)])
+    boroughs = ["Bronx", "Brooklyn", "Manhattan", "Queens", "Staten Island"]
+    return pd.DataFrame(
+        {
+            "name": pd.Categorical.from_codes(rng.integers(0, len(names), rows), names),
+            "borough": pd.Categorical.from_codes(
+                rng.integers(0, len(boroughs), rows), boroughs
+            ),
+            "inspection_date": dates,
+            "grade": pd.Categorical.from_codes(rng.integers(0, 3, rows), GRADES),
+            "month": dates.month.astype(np.int8),
+            "year": dates.year.astype(np.int16),
+            "quarter": dates.quarter.astype(np.int8),
+        }
+    )
+
+
+def legacy_rollup(df):
+    """
+    The per-grade counts as run_analysis computed them before the grade cube: one
+    boolean mask and copy of the rows per grade, then one groupby per dimension.
+    """
+    results = {}
+    for grade in GRADES:
+        df_grade = df[df.grade == grade]
+        for dim in DIMS:
+            counts = df_grade.groupby(dim, observed=True).size().rename("count")
+            results[(dim, grade)] = counts.reset_index()
+    return results
+
+
+def cube_rollup(df):
+    """
+    The same per-grade counts sliced from a grade cube built in one pass.
+    """
+    cube = GradeCube.build(df, DIMS, GRADES)
+    results = {}
+    for grade in GRADES:
+        for dim in DIMS:
+            results[(dim, grade)] = cube.counts_by(dim, grade=grade)
+    return results, cube
+
+
+def best_seconds(rollup, df, repeat):
+    """
+    Returns the best wall time of `repeat` runs of a rollup and the results of the last.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = rollup(df)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def same_results(legacy, cube):
+    """
+    Checks that both rollups produced the same counts.
+    """
+    for key, expected in legacy.items():
+        if not np.array_equal(expected.to_numpy(), cube[key].to_numpy()):
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the grade rollup cube.")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = inspection_rows(args.rows, np.random.default_rng(args.seed))
+    before, legacy = best_seconds(legacy_rollup, df, args.repeat)
+    after, (results, cube) = best_seconds(cube_rollup, df, args.repeat)
+
+    rows_mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"{'rollup':<10}{'seconds':>10}{'rows/s':>16}")
+    print(f"{'legacy':<10}{before:>10.3f}{args.rows / before:>16,.0f}")
+    print(f"{'cube':<10}{after:>10.3f}{args.rows / after:>16,.0f}")
+    match = same_results(legacy, results)
+    print(f"speedup {before / after:.1f}x, results match: {match}")
+    print(f"rows {rows_mb:,.1f} MB, cube {cube.nbytes() / 1e6:,.1f} MB")
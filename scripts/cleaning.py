@@ -0,0 +1,278 @@
+# Python imports
+import datetime
+import operator
+from functools import partial
+import numpy as np
+import pandas as pd
+from dagster import get_dagster_logger
+
+# Custom imports
+from ingestion_utils import bounded_map, process_pool
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Supported filter operators on DataFrame columns
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda series, values: series.isin(values),
+}
+
+# Smallest integer dtypes holding the derived date parts in compact mode
+DATE_PART_DTYPES = {"month": "int8", "quarter": "int8", "year": "int16"}
+
+
+class CleaningSpec:
+    """
+    A declarative cleaning pipeline for one source.
+
+    Rows are cleaned in a fixed order that keeps intermediate copies to a minimum: filters
+    on plain columns select the rows and projected columns in one take, duplicates are
+    detected on the projected columns, dates are parsed with an explicit format, date
+    filters and deduplication are applied in a second take, and month/year/quarter are
+    derived from one conversion of the date column.
+
+    Attributes:
+        columns (dict): Source column name to cleaned column name, in output order.
+        filters (list): (cleaned column, operator, value) tuples, combined with AND.
+        dates (dict): Cleaned date column to its source format, e.g. "%m/%d/%Y".
+        lower (list): Cleaned columns converted to lowercase.
+        date_parts (str): Cleaned date column month, year and quarter are derived from.
+        categories (list): Cleaned columns stored as categoricals in compact mode.
+        dedupe (bool): Drop rows duplicated on the projected columns.
+    """
+
+    def __init__(
+        self,
+        columns,
+        filters=None,
+        dates=None,
+        lower=None,
+        date_parts=None,
+        categories=None,
+        dedupe=False,
+    ):
+        """
+        Initializes a new CleaningSpec.
+
+        Args:
+            columns (dict): Source column name to cleaned column name, in output order.
+            filters (list, optional): (cleaned column, operator, value) tuples, combined
+                with AND. Operators are "==", "!=", ">", ">=", "<", "<=" and "in".
+            dates (dict, optional): Cleaned date column to its source format.
+            lower (list, optional): Cleaned columns converted to lowercase.
+            date_parts (str, optional): Cleaned date column month, year and quarter are
+                derived from.
+            categories (list, optional): Cleaned columns stored as categoricals in compact
+                mode.
+            dedupe (bool): Drop rows duplicated on the projected columns.
+        """
+        self.columns = columns
+        self.filters = filters or []
+        self.dates = dates or {}
+        self.lower = lower or []
+        self.date_parts = date_parts
+        self.categories = categories or []
+        self.dedupe = dedupe
+
+        for column, op, value in self.filters:
+            if op not in COMPARISONS:
+                raise ValueError(f"Unsupported operator {op} for {column}.")
+
+    def where(self, column, op, value):
+        """
+        Returns a copy of the spec with one more filter.
+
+        Args:
+            column (str): The cleaned column to filter on.
+            op (str): The filter operator.
+            value (object): The value compared against.
+
+        Returns:
+            CleaningSpec: The narrowed spec.
+        """
+        return CleaningSpec(
+            self.columns,
+            self.filters + [(column, op, value)],
+            self.dates,
+            self.lower,
+            self.date_parts,
+            self.categories,
+            self.dedupe,
+        )
+
+    def apply(self, df, dedupe=None):
+        """
+        Cleans a DataFrame of source rows.
+
+        Args:
+            df (pandas.DataFrame): Rows holding at least the source columns.
+            dedupe (bool, optional): Overrides the spec's deduplication, e.g. when the
+                source query already returned distinct rows.
+
+        Returns:
+            pandas.DataFrame: The cleaned rows, with string columns as "string" dtype and
+                int32 date parts.
+        """
+        dedupe = self.dedupe if dedupe is None else dedupe
+        sources = {target: source for source, target in self.columns.items()}
+        plain_filters = [f for f in self.filters if f[0] not in self.dates]
+        date_filters = [f for f in self.filters if f[0] in self.dates]
+
+        # Row filters on plain columns and projection in a single take
+        rows = np.flatnonzero(self._mask(df, plain_filters, sources))
+        df = df.iloc[rows, [df.columns.get_loc(col) for col in self.columns]]
+        df.columns = list(self.columns.values())
+
+        # Duplicates, unparsed dates and date filters only narrow a second take
+        keep = ~df.duplicated().to_numpy() if dedupe else np.ones(len(df), dtype=bool)
+        for column, fmt in self.dates.items():
+            df[column] = pd.to_datetime(df[column], format=fmt, cache=True)
+        keep &= self._mask(df, date_filters)
+        if not keep.all():
+            df = df.take(np.flatnonzero(keep))
+
+        for column in self.lower:
+            df[column] = df[column].str.lower()
+
+        for column in df.columns:
+            if column not in self.dates:
+                df[column] = df[column].astype("string")
+
+        if self.date_parts:
+            for column, values in derive_date_parts(df[self.date_parts]).items():
+                df[column] = values
+
+        return df
+
+    def apply_partitioned(self, df, processes, dedupe=None):
+        """
+        Cleans a DataFrame of source rows on a process pool, matching `apply` exactly.
+
+        With deduplication the rows are partitioned by a hash of the projected source
+        columns, so every set of duplicates falls in one partition and deduplicating each
+        partition is deduplicating globally. Otherwise the rows are split in contiguous
+        ranges. The cleaned partitions are put back in the original row order.
+
+        Args:
+            df (pandas.DataFrame): Rows holding at least the source columns.
+            processes (int): Number of worker processes and partitions.
+            dedupe (bool, optional): Overrides the spec's deduplication.
+
+        Returns:
+            pandas.DataFrame: The cleaned rows, identical to `apply(df)`.
+        """
+        dedupe = self.dedupe if dedupe is None else dedupe
+        if processes <= 1 or len(df) < processes:
+            return self.apply(df, dedupe)
+
+        # Number rows by position, the original labels are restored at the end
+        labels = df.index
+        df = df[list(self.columns)].reset_index(drop=True)
+
+        if dedupe:
+            keys = pd.util.hash_pandas_object(df, index=False).to_numpy() % processes
+            parts = [df.iloc[np.flatnonzero(keys == i)] for i in range(processes)]
+        else:
+            bounds = np.linspace(0, len(df), processes + 1, dtype=np.int64)
+            parts = [df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+        with process_pool(processes, ["cleaning"]) as pool:
+            cleaned = list(pool.map(partial(self.apply, dedupe=dedupe), parts))
+
+        df = pd.concat(cleaned)
+        if dedupe:
+            df = df.sort_index(kind="stable")
+        df.index = labels[df.index.to_numpy()]
+        return df
+
+    def apply_chunks(self, chunks, processes=1, dedupe=None):
+        """
+        Cleans a stream of DataFrame chunks, on a process pool if `processes` > 1.
+
+        Deduplication is per chunk, so it is only global if the chunks are disjoint.
+
+        Args:
+            chunks (iterable): DataFrames of source rows.
+            processes (int): Number of worker processes, 1 to clean in this process.
+            dedupe (bool, optional): Overrides the spec's deduplication.
+
+        Yields:
+            pandas.DataFrame: The cleaned chunks, in order.
+        """
+        clean = partial(self.apply, dedupe=dedupe)
+        if processes <= 1:
+            yield from map(clean, chunks)
+            return
+
+        with process_pool(processes, ["cleaning"]) as pool:
+            yield from bounded_map(pool, clean, chunks, depth=2 * processes)
+
+    def compact(self, df, arrow_strings=False, label="DataFrame"):
+        """
+        Converts cleaned rows to memory-optimized dtypes and logs their footprint.
+
+        The categorical columns become categoricals, date parts the smallest integer
+        dtype holding them and, optionally, `name` an Arrow-backed string column.
+
+        Args:
+            df (pandas.DataFrame): The cleaned rows.
+            arrow_strings (bool): Store the `name` column as Arrow-backed strings.
+            label (str): Name of the DataFrame in the log.
+
+        Returns:
+            pandas.DataFrame: The rows with compact dtypes.
+        """
+        before = df.memory_usage(deep=True).sum()
+
+        dtypes = {col: "category" for col in self.categories}
+        dtypes.update(DATE_PART_DTYPES)
+        if arrow_strings:
+            dtypes["name"] = "string[pyarrow]"
+        for column, dtype in dtypes.items():
+            if column in df.columns:
+                df[column] = df[column].astype(dtype)
+
+        after = df.memory_usage(deep=True).sum()
+        logger.info(
+            f"{label} Memory - {before / 1e6:.1f} MB Before, {after / 1e6:.1f} MB After "
+            f"({np.round((1 - after / max(before, 1)) * 100, 1)}% Saved)"
+        )
+        return df
+
+    def _mask(self, df, filters, sources=None):
+        """
+        Evaluates filters into one boolean array; `sources` maps cleaned to source names.
+        """
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, value in filters:
+            series = df[sources[column] if sources else column]
+            if isinstance(value, datetime.date):
+                value = pd.Timestamp(value)
+            mask &= COMPARISONS[op](series, value).fillna(False).to_numpy(dtype=bool)
+        return mask
+
+
+def derive_date_parts(dates):
+    """
+    Derives month, year and quarter from a datetime column in one vectorized pass.
+
+    Args:
+        dates (pandas.Series): A datetime64 column without missing values.
+
+    Returns:
+        dict: "month", "year" and "quarter" int32 arrays.
+    """
+    months = dates.to_numpy().astype("datetime64[M]").astype(np.int64)
+    year, month = np.divmod(months, 12)
+    month += 1
+    return {
+        "month": month.astype(np.int32),
+        "year": (year + 1970).astype(np.int32),
+        "quarter": ((month - 1) // 3 + 1).astype(np.int32),
+    }
@@ -1,13 +1,64 @@
 # Python imports
 from couchdb import Server, ServerError
-from couchdb.http import ResourceNotFound
-from dagster import get_dagster_logger
-import numpy as np
+from couchdb.http import ResourceNotFound, Session, Unauthorized
+from dagster import Field, get_dagster_logger, resource
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import random
+import socket
+import threading
+
+# Custom imports
+import metrics
+from ingestion_utils import batched, interleave
 
 # Setting up logger
 logger = get_dagster_logger()
 
+# Process-wide CouchDB servers, one keep-alive HTTP session per URL and credentials
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+class CountingSession(Session):
+    """
+    A CouchDB HTTP session counting its requests as round trips in the stage metrics.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        metrics.count("couch_round_trips")
+        return super().request(method, url, *args, **kwargs)
+
+
+def get_server(url, uname, pwd, timeout=60, retries=3):
+    """
+    Returns the process-wide CouchDB server for a URL and credentials, creating it once.
+
+    The server's HTTP session keeps finished connections open and hands them to the next
+    request, including requests from the worker threads of batched loads and reads.
+    Requests failing with a connection error are retried with exponential backoff, and
+    every request is counted in the stage metrics.
+
+    Args:
+        url (str): The CouchDB server URL.
+        uname (str): The username for authentication.
+        pwd (str): The password for authentication.
+        timeout (int): Socket timeout in seconds for each request.
+        retries (int): Number of retries after a connection error.
+
+    Returns:
+        couchdb.Server: The shared server.
+    """
+    key = (url, uname, pwd, timeout, retries)
+    with _servers_lock:
+        if key not in _servers:
+            session = CountingSession(
+                timeout=timeout, retry_delays=[0] + [2**i for i in range(retries)]
+            )
+            server = Server(url, session=session)
+            server.resource.credentials = (uname, pwd)
+            _servers[key] = server
+        return _servers[key]
+
 
 class CouchDB:
     """
@@ -18,29 +69,71 @@ class CouchDB:
         port (int): The port number of the CouchDB server..
         uname (str): The username for authentication.
         pwd (str): The password for authentication.
-        server (couchdb.Server): The CouchDB server connection object.
+        server (couchdb.Server): The shared CouchDB server and its keep-alive HTTP session.
         db (couchdb.Database): The CouchDB database object.
     """
 
-    def __init__(self, host="http://localhost", port=5984, uname="dap", pwd="dap"):
+    def __init__(
+        self,
+        host="http://localhost",
+        port=5984,
+        uname="dap",
+        pwd="dap",
+        timeout=60,
+        retries=3,
+    ):
+        """
+        Initializes a new CouchDB instance on the process-wide server of the CouchDB URL.
+
+        Args:
+            host (str): The hostname or URL of the CouchDB server.
+            port (int): The port number of the CouchDB server.
+            uname (str): The username for authentication.
+            pwd (str): The password for authentication.
+            timeout (int): Socket timeout in seconds for each request.
+            retries (int): Number of retries after a connection error.
+        """
         self.server = None
         self.db = None
 
         try:
-            # Establish connection to the CouchDB server
-            self.server = Server(f"{host}:{port}")
-            self.server.resource.credentials = (uname, pwd)
+            # Get the shared server of the CouchDB URL
+            self.server = get_server(f"{host}:{port}", uname, pwd, timeout, retries)
             logger.info("CouchDB Connection Successful.")
         except ServerError as e:
             logger.error(f"Error While Connecting to CouchDB: {e}")
 
-    def load_data(self, data, db_name):
+    def load_data(
+        self,
+        data,
+        db_name,
+        batch_size=5000,
+        workers=4,
+        sample=None,
+        seed=42,
+        key=None,
+        replace=False,
+    ):
         """
-        Loads data into a specified CouchDB database.
+        Loads data into a specified CouchDB database through batched _bulk_docs requests.
+
+        Documents are posted in batches of `batch_size`, with up to `workers` batches in
+        flight at once over the server's persistent HTTP session. With a `key` column the
+        document ids are taken from it, so reloading the same record cannot duplicate it.
 
         Args:
-            data (dict): The data to be loaded into the database.
+            data (dict or ingestion_utils.SocrataRows): The data to be loaded into the database.
             db_name (str): The name of the database where the data will be loaded.
+            batch_size (int): Number of documents per _bulk_docs request.
+            workers (int): Number of batches sent concurrently.
+            sample (int, optional): Load a random sample of this many documents instead of
+                the full dataset. Default is None, loading every document.
+            seed (int): Random seed used when sampling.
+            key (str, optional): Column used as document id. Default is server generated ids.
+            replace (bool): Delete and recreate the database before loading.
+
+        Returns:
+            bool: True if every document was loaded, False if loading failed.
 
         Raises:
             ResourceNotFound: If the specified database does not exist.
@@ -48,30 +141,35 @@ class CouchDB:
         """
         if self.server is None:
             logger.error("No Connection to CouchDB.")
-            return
+            return False
 
         try:
+            if replace and db_name in self.server:
+                self.server.delete(db_name)
+
             # Create the database if it doesn't exist
             if db_name not in self.server:
                 self.server.create(db_name)
 
             self.db = self.server[db_name]
 
-            # Extract data and save documents to the database
+            # Extract data into documents
             cols = [col["name"] for col in data["meta"]["view"]["columns"]]
-            vals = data["data"]
-            docs = [dict(zip(cols, val)) for val in vals]
+            docs = (dict(zip(cols, val)) for val in data["data"])
+
+            if sample is not None:
+                docs = random.Random(seed).sample(list(docs), sample)
 
-            # Setting random seed (limiting data because of long execution time)
-            seed_value = 42
-            random.seed(seed_value)
-            np.random.seed(seed_value)
-            docs = random.sample(docs, 10000)
+            if key is not None:
+                docs = (dict(doc, _id=str(doc[key])) for doc in docs)
 
-            for doc in docs:
-                self.db.save(doc)
+            loaded, failed = self._bulk_save(docs, batch_size, workers)
 
-            logger.info(f"Data Load To {db_name} Successful.")
+            if failed:
+                logger.error(f"CouchDB: {failed} Documents Failed To Load To {db_name}.")
+                return False
+            logger.info(f"Data Load To {db_name} Successful ({loaded} Documents).")
+            return True
 
         except ResourceNotFound:
             logger.error(f"CouchDB: Database {db_name} not found.")
@@ -79,6 +177,105 @@ class CouchDB:
         except Exception as e:
             logger.error(f"Error While Data Load To {db_name}: {e}")
 
+        return False
+
+    def upsert_data(self, docs, db_name, key, batch_size=5000, workers=4):
+        """
+        Inserts or replaces documents in a specified CouchDB database, matched on a key.
+
+        Document ids are taken from the `key` column and the current revision of existing
+        documents is looked up per batch, so changed records replace the stored ones.
+
+        Args:
+            docs (iterable): Documents keyed by column name.
+            db_name (str): The name of the database.
+            key (str): Column used as document id.
+            batch_size (int): Number of documents per _bulk_docs request.
+            workers (int): Number of batches sent concurrently.
+
+        Returns:
+            int: The number of documents written, or None if any document failed.
+        """
+        if db_name not in self.server:
+            self.server.create(db_name)
+        self.db = self.server[db_name]
+
+        docs = (dict(doc, _id=str(doc[key])) for doc in docs)
+        loaded, failed = self._bulk_save(docs, batch_size, workers, upsert=True)
+
+        if failed:
+            logger.error(f"CouchDB: {failed} Documents Failed To Upsert To {db_name}.")
+            return None
+        logger.info(f"CouchDB: Upserted {loaded} Documents To {db_name}.")
+        return loaded
+
+    def max_value(self, db_name, field):
+        """
+        Returns the largest value of a field across the documents of a database.
+
+        Args:
+            db_name (str): The name of the database.
+            field (str): The field to inspect.
+
+        Returns:
+            object: The largest value, or None if no document has the field.
+        """
+        self.db = self.server[db_name]
+        self.db.resource.post_json("_index", {"index": {"fields": [field]}})
+        _, _, data = self.db.resource.post_json(
+            "_find",
+            {
+                "selector": {field: {"$gt": None}},
+                "fields": [field],
+                "sort": [{field: "desc"}],
+                "limit": 1,
+            },
+        )
+        docs = data.get("docs", [])
+        return docs[0][field] if docs else None
+
+    def _bulk_save(self, docs, batch_size, workers, upsert=False):
+        """
+        Posts documents to _bulk_docs in concurrent batches and returns (loaded, failed) counts.
+
+        At most twice `workers` batches are held in memory at any time. With upsert enabled
+        each batch first looks up the current revisions of its document ids.
+        """
+        loaded = failed = 0
+        pending = set()
+
+        def _collect(done):
+            nonlocal loaded, failed
+            for future in done:
+                results = future.result()
+                saved = sum(success for success, _, _ in results)
+                loaded += saved
+                failed += len(results) - saved
+                metrics.count("rows_written", saved)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in batched(docs, batch_size):
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done)
+                save = self._upsert_batch if upsert else self.db.update
+                pending.add(executor.submit(save, batch))
+
+            _collect(wait(pending).done)
+
+        return loaded, failed
+
+    def _upsert_batch(self, batch):
+        """
+        Sets the current revision on documents that already exist, then saves the batch.
+        """
+        rows = self.db.view("_all_docs", keys=[doc["_id"] for doc in batch])
+        revs = {row.key: row.value["rev"] for row in rows if row.get("value")}
+        for doc in batch:
+            if doc["_id"] in revs:
+                doc["_rev"] = revs[doc["_id"]]
+        return self.db.update(batch)
+
     def fetch_data(self, db_name):
         """
         Fetches data from a specified CouchDB database.
@@ -100,6 +297,7 @@ class CouchDB:
         try:
             self.db = self.server[db_name]
             db_data = [doc for doc in self.db.view("_all_docs", include_docs=True)]
+            metrics.count("rows_read", len(db_data))
             logger.info(f"CouchDB: Data Fetch From {db_name} Successful.")
             return db_data
 
@@ -109,9 +307,227 @@ class CouchDB:
         except Exception as e:
             logger.error(f"Error While Fetching Data From {db_name}: {e}")
 
+    def iter_data(self, db_name, batch_size=10000, workers=4):
+        """
+        Streams the documents of a specified CouchDB database in batches.
+
+        The _all_docs key space is split into `workers` ranges which are read in parallel,
+        each paged by key with `batch_size` documents per request. Design documents are
+        skipped.
+
+        Args:
+            db_name (str): The name of the database from which to fetch data.
+            batch_size (int): Number of documents per request and per yielded batch.
+            workers (int): Number of key ranges read concurrently.
+
+        Yields:
+            list: Batches of documents, in no particular order.
+
+        Raises:
+            ResourceNotFound: If the specified database does not exist.
+            Exception: For other unexpected errors.
+        """
+        self.db = self.server[db_name]
+        ranges = self._key_ranges(workers)
+        batches = interleave([self._iter_range(lo, hi, batch_size) for lo, hi in ranges])
+
+        yield from batches
+        logger.info(f"CouchDB: Data Fetch From {db_name} Successful.")
+
+    def iter_query(self, db_name, query, batch_size=10000, workers=4):
+        """
+        Streams the documents and fields selected by a SourceQuery through Mango _find.
+
+        A Mango index is created on the filtered fields. The _id key space is split into
+        `workers` ranges which are queried in parallel and paged with the _find bookmark.
+
+        Args:
+            db_name (str): The name of the database from which to fetch data.
+            query (source_query.SourceQuery): The projection and filters to push down.
+            batch_size (int): Number of documents per request and per yielded batch.
+            workers (int): Number of key ranges queried concurrently.
+
+        Yields:
+            list: Batches of documents restricted to the selected fields.
+
+        Raises:
+            ResourceNotFound: If the specified database does not exist.
+            Exception: For other unexpected errors.
+        """
+        self.db = self.server[db_name]
+
+        # Index the filtered fields so _find does not scan every document
+        fields = sorted({col for col, _, _ in query.filters})
+        if fields:
+            self.db.resource.post_json("_index", {"index": {"fields": fields}})
+
+        ranges = self._key_ranges(workers)
+        batches = interleave(
+            [self._find_range(query, lo, hi, batch_size) for lo, hi in ranges]
+        )
+
+        yield from batches
+        logger.info(f"CouchDB: Query Fetch From {db_name} Successful.")
+
+    def fetch_query(self, db_name, query, batch_size=10000, workers=4):
+        """
+        Fetches the documents and fields selected by a SourceQuery as a single list.
+
+        Args:
+            db_name (str): The name of the database from which to fetch data.
+            query (source_query.SourceQuery): The projection and filters to push down.
+            batch_size (int): Number of documents per _find request.
+            workers (int): Number of key ranges queried concurrently.
+
+        Returns:
+            list: A list of documents restricted to the selected fields.
+        """
+        if self.server is None:
+            logger.error("No Connection to CouchDB.")
+            return None
+
+        try:
+            return [
+                doc
+                for batch in self.iter_query(db_name, query, batch_size, workers)
+                for doc in batch
+            ]
+
+        except ResourceNotFound:
+            logger.error(f"Database {db_name} not found.")
+
+        except Exception as e:
+            logger.error(f"Error While Fetching Data From {db_name}: {e}")
+
+    def _key_ranges(self, workers):
+        """
+        Splits the _all_docs key space of the current database into up to `workers` ranges.
+
+        Boundaries are the keys found at evenly spaced offsets, so ranges hold a similar
+        number of documents whatever the id distribution.
+        """
+        total = self.db.view("_all_docs", limit=0).total_rows
+        bounds = []
+        for i in range(1, max(workers, 1)):
+            rows = list(self.db.view("_all_docs", skip=i * total // workers, limit=1))
+            if rows and (not bounds or rows[0].id > bounds[-1]):
+                bounds.append(rows[0].id)
+
+        return list(zip([None] + bounds, bounds + [None]))
+
+    def _iter_range(self, lo, hi, batch_size):
+        """
+        Pages through the _all_docs key range [lo, hi) of the current database.
+        """
+        options = {"include_docs": True, "limit": batch_size}
+        if lo is not None:
+            options["startkey"] = lo
+        if hi is not None:
+            options["endkey"] = hi
+            options["inclusive_end"] = False
+
+        while True:
+            rows = list(self.db.view("_all_docs", **options))
+            docs = [row.doc for row in rows if not row.id.startswith("_design/")]
+            metrics.count("rows_read", len(docs))
+            if docs:
+                yield docs
+            if len(rows) < batch_size:
+                return
+
+            # Continue after the last key of this page
+            options["startkey"] = rows[-1].id
+            options["skip"] = 1
+
+    def _find_range(self, query, lo, hi, batch_size):
+        """
+        Pages through the _find results of a SourceQuery within the _id range [lo, hi).
+        """
+        body = dict(query.to_mango(), limit=batch_size)
+        id_range = {}
+        if lo is not None:
+            id_range["$gte"] = lo
+        if hi is not None:
+            id_range["$lt"] = hi
+        if id_range:
+            body["selector"] = {"$and": [body["selector"], {"_id": id_range}]}
+
+        while True:
+            _, _, data = self.db.resource.post_json("_find", body)
+            docs = data.get("docs", [])
+            metrics.count("rows_read", len(docs))
+            if docs:
+                yield docs
+            if len(docs) < batch_size:
+                return
+            body["bookmark"] = data["bookmark"]
+
+    def count_data(self, db_name):
+        """
+        Counts the documents of a specified database, excluding design documents.
+
+        Args:
+            db_name (str): The name of the database to count.
+
+        Returns:
+            int: The number of documents.
+        """
+        db = self.server[db_name]
+        design_docs = db.view("_all_docs", startkey="_design/", endkey="_design0")
+        return db.info()["doc_count"] - len(design_docs)
+
+    def ping(self):
+        """
+        Checks that the CouchDB server is reachable and the credentials are accepted.
+
+        Returns:
+            bool: True if the server answered, False otherwise.
+        """
+        try:
+            self.server.version()
+            self.server.resource.get_json("_session")
+            return True
+
+        except (ServerError, Unauthorized, socket.error) as e:
+            logger.error(f"CouchDB Health Check Failed: {e}")
+            return False
+
     def close_connection(self):
         """
-        Closes the connection to the CouchDB server.
+        Releases this instance. The shared server and its HTTP session stay open for reuse.
         """
         self.server = None
+        self.db = None
         logger.info("CouchDB Connection Terminated.")
+
+
+@resource(
+    config_schema={
+        "host": Field(str, default_value="http://localhost"),
+        "port": Field(int, default_value=5984),
+        "uname": Field(str, default_value="dap"),
+        "pwd": Field(str, default_value="dap"),
+        "timeout": Field(int, default_value=60),
+        "retries": Field(int, default_value=3),
+    }
+)
+def couch_resource(init_context):
+    """
+    Provides ops with a CouchDB connector on the process-wide server.
+
+    The server is health checked when the resource is initialized.
+
+    Args:
+        init_context (InitResourceContext): The resource context holding the configuration.
+
+    Yields:
+        CouchDB: The connector bound to the shared server.
+    """
+    couch_obj = CouchDB(**init_context.resource_config)
+    if couch_obj.server is None or not couch_obj.ping():
+        raise ConnectionError("CouchDB Is Not Reachable.")
+
+    try:
+        yield couch_obj
+    finally:
+        couch_obj.close_connection()
@@ -1,96 +1,298 @@
 # Python Imports
+import os
+import sys
+import time
 import pandas as pd
 import numpy as np
-from dagster import op, In, get_dagster_logger
+from psycopg2 import sql
+from dagster import op, In, Field, get_dagster_logger
 
 # Custom Imports
-from postgres_connector import PostgresDB
+import analysis_utils
 from analysis_utils import *
+from memo import MemoStore, code_version, fingerprint
+from metrics import instrumented
+from rollup import GradeCube
+from summary_tables import (
+    GRADES,
+    INSPECTION_TABLES,
+    RESTAURANT_COLUMNS,
+    TOP_GRADED,
+    TOP_RESTAURANTS,
+)
+from analysis_queries import (
+    DISTINCT_NAMES,
+    OPEN_INSPECTION_HUES,
+    RESTAURANT_HUES,
+    sql_datasets,
+)
+from sketches import NameSketch, merge_sketches, top_accuracy
 
 # Setting up logger
 logger = get_dagster_logger()
 
+# Fingerprints of the last chart export, invalidated by changes to the chart code
+MEMO = MemoStore()
+CODE_VERSION = code_version(sys.modules[__name__], analysis_utils)
 
-@op(ins={"start": In(bool)})
-def run_analysis(start):
+
+def top_names(names, source, grade=None):
     """
-    Performing analysis and generating charts.
+    Selects the ranked top names of a source, optionally for one grade.
 
-    Parameters:
-           start (str): Start date for analysis (not currently used).
+    Args:
+        names (pandas.DataFrame): Rows of the top_names summary table.
+        source (str): The source name.
+        grade (str, optional): The grade. Default is None, the ungraded ranking.
 
     Returns:
-           None
+        pandas.DataFrame: name and count columns, highest count first.
+    """
+    mask = names.source == source
+    mask &= names.grade.isna() if grade is None else names.grade == grade
+    return names[mask].sort_values("rank")[["name", "count"]]
+
+
+def grade_shares(monthly):
+    """
+    Computes the NYC vs LA grade shares over the whole months both sources cover.
+
+    Args:
+        monthly (GradeCube): Cube of inspection_monthly_summary by source, month_start
+            and year.
+
+    Returns:
+        dict: "grade_share" and "grade_share_<grade>_yearly" datasets.
+    """
+    nyc_monthly = monthly.where("source", ["nyc_inspection"])
+    la_monthly = monthly.where("source", ["la_inspection"])
+
+    # Making sure data is of similar time period, in whole months
+    nyc_months = nyc_monthly.counts_by("month_start")["month_start"]
+    la_months = la_monthly.counts_by("month_start")["month_start"]
+    min_month = max(nyc_months.min(), la_months.min())
+    max_month = min(nyc_months.max(), la_months.max())
+    window = [m for m in monthly.levels["month_start"] if min_month <= m <= max_month]
+    datasets = {"grade_share": []}
+    yearly = {grade: [] for grade in GRADES}
+
+    for state, cube in [("nyc", nyc_monthly), ("la", la_monthly)]:
+        cube = cube.where("month_start", window)
+        total = cube.total()
+
+        # Overall grade% comparision NYC vs LA
+        grades = cube.counts_by("grade")
+        grades["grade%"] = np.round(grades["count"] / total * 100, 2)
+        grades["state"] = state
+        datasets["grade_share"].append(grades)
+
+        # Yearly grade% comparision NYC vs LA, per grade
+        for grade in GRADES:
+            grades_yearly = cube.counts_by("year", grade=grade)
+            grades_yearly["grade%"] = np.round(
+                grades_yearly["count"] / total * 100, 2
+            )
+            grades_yearly["state"] = state
+            yearly[grade].append(grades_yearly)
+
+    datasets["grade_share"] = pd.concat(datasets["grade_share"], axis=0)
+    for grade in GRADES:
+        datasets[f"grade_share_{grade}_yearly"] = pd.concat(yearly[grade], axis=0)
+    return datasets
+
+
+def pandas_datasets(postgres_obj):
+    """
+    Computes the data of every run_analysis chart in pandas, from the summary tables.
+
+    The graded summaries are rolled up into grade cubes in one pass each, which the
+    datasets are sliced from instead of masking the rows once per grade and source.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+
+    Returns:
+        dict: Dataset name to its DataFrame.
     """
-    # Connect to PostgresDB
-    postgres_obj = PostgresDB()
+    # Fetch the Pre-aggregated Summaries from PostgresDB
+    monthly = postgres_obj.fetch_data("inspection_monthly_summary")
+    restaurants = postgres_obj.fetch_data("nyc_restaurant_summary")
+    open_inspections = postgres_obj.fetch_data("nyc_open_inspection_summary")
+    names = postgres_obj.fetch_data("top_names")
+
+    monthly = GradeCube.build(
+        monthly, ["source", "month_start", "year", "quarter"], GRADES, weight="count"
+    )
+    open_inspections = GradeCube.build(
+        open_inspections, RESTAURANT_COLUMNS, GRADES, weight="count"
+    )
+
+    datasets = {"top_restaurants": top_names(names, "nyc_restaurants")}
+    for hue in RESTAURANT_HUES:
+        datasets[f"restaurants_by_{hue}"] = bin_counts(
+            restaurants, "borough", hue, "count"
+        )
+
+    for source in INSPECTION_TABLES:
+        source_monthly = monthly.where("source", [source])
+        datasets[f"{source}_quarters"] = source_monthly.counts_by("quarter")
+        for grade in GRADES:
+            datasets[f"{source}_top_{grade}"] = top_names(names, source, grade)
+
+    datasets["open_borough_grades"] = open_inspections.counts_by("borough", "grade")
+    for hue in OPEN_INSPECTION_HUES:
+        datasets[f"open_grades_by_{hue}"] = open_inspections.counts_by("grade", hue)
+
+    datasets.update(grade_shares(monthly))
+    return datasets
+
 
-    # Fetch Pre-processed NYC Restaurants Data from PostgresDB
-    df1 = postgres_obj.fetch_data("nyc_restraunts_cleaned")
-    # Fetch Pre-processed NYC Inspections Data from PostgresDB
-    df2 = postgres_obj.fetch_data("nyc_inspection_cleaned")
-    # Fetch Pre-processed LA Inspections Data from PostgresDB
-    df3 = postgres_obj.fetch_data("la_inspection_cleaned")
+# Analysis backends computing the chart datasets
+BACKENDS = {"pandas": pandas_datasets, "sql": sql_datasets}
 
-    # Close connection from PostgresDB
-    postgres_obj.close_connection()
+# Cleaned tables whose names are sketched, by the source the sketches are stored under
+SKETCHED_TABLES = {"nyc_restaurants": "nyc_restraunts_cleaned", **INSPECTION_TABLES}
 
+
+def sketch_datasets(postgres_obj):
+    """
+    Estimates the top name datasets and distinct names from the name sketches.
+
+    The per-grade and per-year sketches written by loading_cleaned_data are merged per
+    grade for the top names and over all grades for the distinct names.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+
+    Returns:
+        tuple: Dataset name to its estimated top names DataFrame, and source name to its
+            estimated number of distinct names. Sources without sketches are left out.
+    """
+    datasets, distinct = {}, {}
+    for source in SKETCHED_TABLES:
+        sketches = {
+            key: NameSketch.from_bytes(sketch)
+            for key, sketch in postgres_obj.read_sketches(source).items()
+        }
+        if not sketches:
+            continue
+
+        merged = merge_sketches(sketches.values())
+        distinct[source] = merged.distinct.estimate()
+        if source not in INSPECTION_TABLES:
+            datasets["top_restaurants"] = merged.top(TOP_RESTAURANTS)
+            continue
+        for grade in GRADES:
+            graded = merge_sketches(
+                sketch for (g, _), sketch in sketches.items() if g == grade
+            )
+            if graded is not None:
+                datasets[f"{source}_top_{grade}"] = graded.top(TOP_GRADED)
+    return datasets, distinct
+
+
+def compare_sketches(postgres_obj, datasets, sketched, distinct):
+    """
+    Logs the accuracy of sketched top names and distinct names against exact ones.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+        datasets (dict): The exact chart datasets.
+        sketched (dict): The sketched top name datasets.
+        distinct (dict): Source name to its estimated number of distinct names.
+    """
+    for name, df in sketched.items():
+        accuracy = top_accuracy(datasets[name], df)
+        logger.info(
+            f"Sketched {name}: Recall {accuracy['recall']:.0%}, "
+            f"Max Count Overestimate {accuracy['max_error']}."
+        )
+    for source, estimate in distinct.items():
+        table = sql.Identifier(SKETCHED_TABLES[source])
+        exact = postgres_obj.fetch_value(DISTINCT_NAMES.format(table=table))
+        error = abs(estimate - exact) / exact if exact else 0.0
+        logger.info(
+            f"{source}: {estimate} Distinct Names Estimated, {exact} Exact "
+            f"({error:.2%} Error)."
+        )
+
+
+def restaurant_charts(datasets):
+    """
+    Draws the NYC open restaurant charts.
+
+    Args:
+        datasets (dict): The chart datasets.
+    """
     # Top 10 Most Frequent Restaurants in NYC
-    name_counts = df1.name.value_counts()[:10].reset_index()
-    bar_chart(name_counts, "name", "count", "Top 10 Most Frequent Restaurants")
+    bar_chart(
+        datasets["top_restaurants"], "name", "count", "Top 10 Most Frequent Restaurants"
+    )
 
     # Types Distribution by NYC Borough
-    hist_chart(df1, "borough", "Open Restaurant Borough vs Type", hue="type")
+    hist_chart(
+        datasets["restaurants_by_type"],
+        "borough",
+        "Open Restaurant Borough vs Type",
+        hue="type",
+        y="count",
+    )
 
     # Sidewalk Approval DIstribution by NYC Borough
     hist_chart(
-        df1,
+        datasets["restaurants_by_sidewalk_seating_approval"],
         "borough",
         "Open Restaurant Borough vs Sidewalk Seating Approval",
         hue="sidewalk_seating_approval",
+        y="count",
     )
 
     # Roadway Approval DIstribution by NYC Borough
     hist_chart(
-        df1,
+        datasets["restaurants_by_roadway_seating_approval"],
         "borough",
         "Open Restaurant Borough vs Roadway Seating Approval",
         hue="roadway_seating_approval",
+        y="count",
     )
 
-    # Quarter-wise Inspection Counts in NYC
-    quarter_counts = df2.quarter.value_counts().reset_index()
-    pie_chart(quarter_counts, "quarter", "count", "NYC Inspection Quarter")
-
-    # Quarter-wise Inspection Counts in LA
-    quarter_counts = df3.quarter.value_counts().reset_index()
-    pie_chart(quarter_counts, "quarter", "count", "LA Inspection Quarter")
-
-    # Grade-wise top 5 Restaurants in NYC
-    a_grades_nyc = df2[df2.grade == "A"]["name"].value_counts()[:5].reset_index()
-    b_grades_nyc = df2[df2.grade == "B"]["name"].value_counts()[:5].reset_index()
-    c_grades_nyc = df2[df2.grade == "C"]["name"].value_counts()[:5].reset_index()
-    bar_chart(a_grades_nyc, "name", "count", "NYC Top 5 Restraunts with A Grade")
-    bar_chart(b_grades_nyc, "name", "count", "NYC Top 5 Restraunts with B Grade")
-    bar_chart(c_grades_nyc, "name", "count", "NYC Top 5 Restraunts with C Grade")
-
-    # Grade-wise top 5 Restaurants in LA
-    a_grades_la = df3[df3.grade == "A"]["name"].value_counts()[:5].reset_index()
-    b_grades_la = df3[df3.grade == "B"]["name"].value_counts()[:5].reset_index()
-    c_grades_la = df3[df3.grade == "C"]["name"].value_counts()[:5].reset_index()
-    bar_chart(a_grades_la, "name", "count", "LA Top 5 Restraunts with A Grade")
-    bar_chart(b_grades_la, "name", "count", "LA Top 5 Restraunts with B Grade")
-    bar_chart(c_grades_la, "name", "count", "LA Top 5 Restraunts with C Grade")
-
-    # NYC Open Inspections
-    open_inspections = pd.merge(
-        df1, df2.drop("borough", axis=1), on="name", how="inner"
+
+def inspection_charts(datasets, source, state):
+    """
+    Draws the inspection charts of one source.
+
+    Args:
+        datasets (dict): The chart datasets.
+        source (str): The source name.
+        state (str): The state prefixed to the chart titles.
+    """
+    # Quarter-wise Inspection Counts
+    pie_chart(
+        datasets[f"{source}_quarters"],
+        "quarter",
+        "count",
+        f"{state} Inspection Quarter",
     )
 
+    # Grade-wise top 5 Restaurants
+    for grade in GRADES:
+        bar_chart(
+            datasets[f"{source}_top_{grade}"],
+            "name",
+            "count",
+            f"{state} Top 5 Restraunts with {grade} Grade",
+        )
+
+
+def open_inspection_charts(datasets):
+    """
+    Draws the charts of NYC inspections of open restaurants.
+
+    Args:
+        datasets (dict): The chart datasets.
+    """
     # NYC Open Restaurants Grade Distribution by Borough
-    grade_borrough_open_counts = (
-        open_inspections.groupby(["borough", "grade"]).size().reset_index(name="count")
-    )
+    grade_borrough_open_counts = datasets["open_borough_grades"].copy()
     lat_lon = {
         "Bronx": (40.8466508, -73.8785937),
         "Brooklyn": (40.6526006, -73.9497211),
@@ -104,131 +306,169 @@ def run_analysis(start):
     grade_borrough_open_counts["longitude"] = grade_borrough_open_counts["borough"].map(
         lambda x: lat_lon[x][1]
     )
-    map_chart(
-        grade_borrough_open_counts[grade_borrough_open_counts.grade == "A"],
-        "borough",
-        "count",
-        "NYC Open Restaurants A Grades by Borough",
-    )
-    map_chart(
-        grade_borrough_open_counts[grade_borrough_open_counts.grade == "B"],
-        "borough",
-        "count",
-        "NYC Open Restaurants B Grades by Borough",
-    )
-    map_chart(
-        grade_borrough_open_counts[grade_borrough_open_counts.grade == "C"],
-        "borough",
-        "count",
-        "NYC Open Restaurants C Grades by Borough",
-    )
+    for grade in GRADES:
+        map_chart(
+            grade_borrough_open_counts[grade_borrough_open_counts.grade == grade],
+            "borough",
+            "count",
+            f"NYC Open Restaurants {grade} Grades by Borough",
+        )
 
     # NYC Open Restaurants Grades by Type
     hist_chart(
-        open_inspections, "grade", "NYC Open Restaurants Type vs Grade", hue="type"
+        datasets["open_grades_by_type"],
+        "grade",
+        "NYC Open Restaurants Type vs Grade",
+        hue="type",
+        y="count",
     )
 
     # NYC Open Restaurants Grades by Approvals
-    hist_chart(
-        open_inspections,
-        "grade",
-        "NYC Open Restaurants Type vs Sidewalk Seating Approval",
-        hue="sidewalk_seating_approval",
-    )
-    hist_chart(
-        open_inspections,
-        "grade",
-        "NYC Open Restaurants Type vs Roadway Seating Approval",
-        hue="roadway_seating_approval",
-    )
-    hist_chart(
-        open_inspections,
-        "grade",
-        "NYC Open Restaurants Type vs Alcohol Permission",
-        hue="alcohol_permission",
-    )
+    for hue, label in [
+        ("sidewalk_seating_approval", "Sidewalk Seating Approval"),
+        ("roadway_seating_approval", "Roadway Seating Approval"),
+        ("alcohol_permission", "Alcohol Permission"),
+    ]:
+        hist_chart(
+            datasets[f"open_grades_by_{hue}"],
+            "grade",
+            f"NYC Open Restaurants Type vs {label}",
+            hue=hue,
+            y="count",
+        )
 
-    df_nyc = df2.copy()
-    df_la = df3.copy()
 
-    # Making sure data is of similar time period
-    min_date = max(df_nyc.inspection_date.min(), df_la.inspection_date.min())
-    max_date = min(df_nyc.inspection_date.max(), df_la.inspection_date.max())
-    df_nyc = df_nyc[
-        (df_nyc.inspection_date >= min_date) & (df_nyc.inspection_date <= max_date)
-    ]
-    df_la = df_la[
-        (df_la.inspection_date >= min_date) & (df_la.inspection_date <= max_date)
-    ]
+def comparison_charts(datasets):
+    """
+    Draws the NYC vs LA grade comparison charts.
 
+    Args:
+        datasets (dict): The chart datasets.
+    """
     # Overall grade% comparision NYC vs LA
-    nyc_grades = df_nyc.grade.value_counts().reset_index()
-    la_grades = df_la.grade.value_counts().reset_index()
-    nyc_grades["grade%"] = np.round(nyc_grades["count"] / len(df_nyc) * 100, 2)
-    la_grades["grade%"] = np.round(la_grades["count"] / len(df_la) * 100, 2)
-    nyc_grades["state"] = "nyc"
-    la_grades["state"] = "la"
-    grades_comp = pd.concat([nyc_grades, la_grades], axis=0)
-    bar_chart(
-        grades_comp, x="grade", y="grade%", title="Grade% NYC vs LA", color="state"
-    )
-
-    # A grade% comparision NYC vs LA
-    nyc_A_grades_yearly = df_nyc[df_nyc.grade == "A"].year.value_counts().reset_index()
-    la_A_grades_yearly = df_la[df_la.grade == "A"].year.value_counts().reset_index()
-    nyc_A_grades_yearly["grade%"] = np.round(
-        nyc_A_grades_yearly["count"] / len(df_nyc) * 100, 2
-    )
-    la_A_grades_yearly["grade%"] = np.round(
-        la_A_grades_yearly["count"] / len(df_la) * 100, 2
-    )
-    nyc_A_grades_yearly["state"] = "nyc"
-    la_A_grades_yearly["state"] = "la"
-    A_grades_comp = pd.concat([nyc_A_grades_yearly, la_A_grades_yearly], axis=0)
     bar_chart(
-        A_grades_comp,
-        x="year",
+        datasets["grade_share"],
+        x="grade",
         y="grade%",
-        title="A Grade% NYC vs LA Yearly",
+        title="Grade% NYC vs LA",
         color="state",
     )
 
-    # B grade% comparision NYC vs LA
-    nyc_B_grades_yearly = df_nyc[df_nyc.grade == "B"].year.value_counts().reset_index()
-    la_B_grades_yearly = df_la[df_la.grade == "B"].year.value_counts().reset_index()
-    nyc_B_grades_yearly["grade%"] = np.round(
-        nyc_B_grades_yearly["count"] / len(df_nyc) * 100, 2
-    )
-    la_B_grades_yearly["grade%"] = np.round(
-        la_B_grades_yearly["count"] / len(df_la) * 100, 2
-    )
-    nyc_B_grades_yearly["state"] = "nyc"
-    la_B_grades_yearly["state"] = "la"
-    B_grades_comp = pd.concat([nyc_B_grades_yearly, la_B_grades_yearly], axis=0)
-    bar_chart(
-        B_grades_comp,
-        x="year",
-        y="grade%",
-        title="B Grade% NYC vs LA Yearly",
-        color="state",
-    )
+    # Yearly grade% comparision NYC vs LA, per grade
+    for grade in GRADES:
+        bar_chart(
+            datasets[f"grade_share_{grade}_yearly"],
+            x="year",
+            y="grade%",
+            title=f"{grade} Grade% NYC vs LA Yearly",
+            color="state",
+        )
 
-    # C grade% comparision NYC vs LA
-    nyc_C_grades_yearly = df_nyc[df_nyc.grade == "C"].year.value_counts().reset_index()
-    la_C_grades_yearly = df_la[df_la.grade == "C"].year.value_counts().reset_index()
-    nyc_C_grades_yearly["grade%"] = np.round(
-        nyc_C_grades_yearly["count"] / len(df_nyc) * 100, 2
-    )
-    la_C_grades_yearly["grade%"] = np.round(
-        la_C_grades_yearly["count"] / len(df_la) * 100, 2
-    )
-    nyc_C_grades_yearly["state"] = "nyc"
-    la_C_grades_yearly["state"] = "la"
-    C_grades_comp = pd.concat([nyc_C_grades_yearly, la_C_grades_yearly], axis=0)
-    bar_chart(
-        C_grades_comp,
-        x="year",
-        y="grade%",
-        title="C Grade% NYC vs LA Yearly",
-        color="state",
-    )
+
+@op(
+    config_schema={
+        "export": Field(bool, default_value=False),
+        "plots_dir": Field(str, default_value="plots"),
+        "formats": Field([str], default_value=["png"]),
+        "processes": Field(int, default_value=1),
+        "backend": Field(str, default_value="pandas"),
+        "compare": Field(bool, default_value=False),
+        "top_names": Field(str, default_value="exact"),
+    },
+    ins={"versions": In(dict)},
+    required_resource_keys={"postgres"},
+)
+@instrumented
+def run_analysis(context, versions):
+    """
+    Performing analysis and generating charts.
+
+    Charts are drawn from the summary tables refreshed by loading_cleaned_data, a few
+    hundred rows in total, instead of the cleaned tables. In export mode the charts are
+    rendered headless to files under `plots_dir` instead of being shown, on `processes`
+    worker processes, and charts whose data did not change are not rendered again. An
+    export is skipped entirely if no summary table, nor the config and chart code, changed
+    since the last export.
+
+    The chart data is computed by the `backend`: "pandas" sums the summary tables in
+    pandas, "sql" computes every statistic from the cleaned tables inside PostgresDB and
+    fetches only the chart-sized results. With `compare` enabled both backends run and
+    datasets whose results differ are logged as errors.
+
+    With `top_names` set to "sketch" the top name charts are drawn from the name sketches
+    of loading_cleaned_data, and the distinct names of each source are estimated. With
+    `compare` enabled their accuracy against the exact counts is logged.
+
+    Parameters:
+           context (dagster.OpExecutionContext): Op context holding the export config.
+           versions (dict): Table name to the fingerprint of its loaded rows.
+
+    Returns:
+           None
+    """
+    config = context.op_config
+
+    # Skip an export of unchanged summary tables
+    key = None
+    if config["export"] and versions and None not in versions.values():
+        key = fingerprint("run_analysis", versions, config, CODE_VERSION)
+        manifest = os.path.join(config["plots_dir"], MANIFEST)
+        if MEMO.recorded("run_analysis", key) and os.path.exists(manifest):
+            logger.info("Summary Tables Unchanged, Chart Export Skipped.")
+            return
+
+    # Borrow a pooled PostgresDB connection
+    postgres_obj = context.resources.postgres
+
+    # Compute the chart datasets with the selected backend
+    if config["backend"] not in BACKENDS:
+        raise ValueError(f"Unsupported analysis backend {config['backend']}.")
+    backends = list(BACKENDS) if config["compare"] else [config["backend"]]
+    results = {}
+    for backend in backends:
+        start = time.perf_counter()
+        results[backend] = BACKENDS[backend](postgres_obj)
+        logger.info(
+            f"Analysis Datasets Computed With {backend} Backend In "
+            f"{time.perf_counter() - start:.3f}s."
+        )
+    datasets = results[config["backend"]]
+
+    if config["compare"]:
+        mismatches = compare_datasets(results["pandas"], results["sql"])
+        if mismatches:
+            logger.error(f"Analysis Backends Differ On: {', '.join(mismatches)}")
+        else:
+            logger.info(f"Analysis Backends Agree On {len(datasets)} Datasets.")
+
+    # Replace the exact top names with sketched ones
+    if config["top_names"] not in ("exact", "sketch"):
+        raise ValueError(f"Unsupported top names mode {config['top_names']}.")
+    if config["top_names"] == "sketch":
+        sketched, distinct = sketch_datasets(postgres_obj)
+        if not sketched:
+            logger.error("No Name Sketches Found, Exact Top Names Charted.")
+        for source, estimate in distinct.items():
+            logger.info(f"{source}: About {estimate} Distinct Restaurant Names.")
+        if config["compare"]:
+            compare_sketches(postgres_obj, datasets, sketched, distinct)
+        datasets = {**datasets, **sketched}
+
+    # Draw the charts of each plots folder, collected for export in export mode
+    charts = [] if config["export"] else None
+    with collect_charts(charts, "nyc_open_restaurants"):
+        restaurant_charts(datasets)
+    with collect_charts(charts, "nyc_inspection"):
+        inspection_charts(datasets, "nyc_inspection", "NYC")
+    with collect_charts(charts, "la_inspection"):
+        inspection_charts(datasets, "la_inspection", "LA")
+    with collect_charts(charts, "open_restaurants_inspection"):
+        open_inspection_charts(datasets)
+    with collect_charts(charts, "nyc_vs_la"):
+        comparison_charts(datasets)
+
+    if charts is not None:
+        export_charts(
+            charts, config["plots_dir"], config["formats"], config["processes"]
+        )
+        MEMO.record("run_analysis", key)
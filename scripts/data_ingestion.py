@@ -1,40 +1,474 @@
 # Python imports
+import datetime
+import re
 import urllib.request
 from urllib.error import URLError
 import pandas as pd
 import json
-from dagster import op, Out, get_dagster_logger
+from collections import defaultdict
+from dagster import (
+    op,
+    In,
+    Out,
+    Field,
+    Noneable,
+    Optional,
+    Permissive,
+    get_dagster_logger,
+)
 
 # Custom imports
-from postgres_connector import PostgresDB
-from couch_connector import CouchDB
-from mongo_connector import MongoDB
+from ingestion_utils import SocrataRows, prefetch, soql_pages
+from downloads import DownloadCache, fetch_all, open_spool, spool_digest
+from memo import fingerprint
+from metrics import instrumented
+from summary_tables import INSPECTION_TABLES
 
 # Setting up logger
 logger = get_dagster_logger()
 
+# Source export URLs
+NYC_INSPECTION_URL = (
+    "https://data.cityofnewyork.us/api/views/43nn-pn8j/rows.csv?accessType=DOWNLOAD"
+)
+LA_INSPECTION_URL = (
+    "https://data.lacity.org/api/views/29fd-3paw/rows.json?accessType=DOWNLOAD"
+)
+NYC_RESTAURANTS_URL = (
+    "https://data.cityofnewyork.us/api/views/pitm-atqc/rows.json?accessType=DOWNLOAD"
+)
 
-@op(out=Out(bool))
-def ingest_nyc_inspection():
+# Source resource endpoints queried with SoQL for incremental ingestion
+NYC_INSPECTION_RESOURCE = "https://data.cityofnewyork.us/resource/43nn-pn8j.csv"
+LA_INSPECTION_RESOURCE = "https://data.lacity.org/resource/29fd-3paw.json"
+NYC_RESTAURANTS_RESOURCE = "https://data.cityofnewyork.us/resource/pitm-atqc.json"
+
+# Socrata floating timestamps as returned by resource endpoints
+FLOATING_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.000")
+
+# Natural keys used to upsert incremental rows
+NYC_INSPECTION_KEY = ["CAMIS", "INSPECTION DATE", "VIOLATION CODE"]
+LA_INSPECTION_KEY = "serial_number"
+NYC_RESTAURANTS_KEY = "id"
+
+# High water mark of the NYC inspection table, as an ISO date
+NYC_INSPECTION_MARK_QUERY = (
+    "SELECT max(to_date(\"INSPECTION DATE\", 'MM/DD/YYYY'))::text FROM nyc_inspection"
+)
+
+# NYC inspection resource field names to CSV export headers
+NYC_INSPECTION_FIELDS = {
+    "camis": "CAMIS",
+    "dba": "DBA",
+    "boro": "BORO",
+    "building": "BUILDING",
+    "street": "STREET",
+    "zipcode": "ZIPCODE",
+    "phone": "PHONE",
+    "cuisine_description": "CUISINE DESCRIPTION",
+    "inspection_date": "INSPECTION DATE",
+    "action": "ACTION",
+    "violation_code": "VIOLATION CODE",
+    "violation_description": "VIOLATION DESCRIPTION",
+    "critical_flag": "CRITICAL FLAG",
+    "score": "SCORE",
+    "grade": "GRADE",
+    "grade_date": "GRADE DATE",
+    "record_date": "RECORD DATE",
+    "inspection_type": "INSPECTION TYPE",
+    "latitude": "Latitude",
+    "longitude": "Longitude",
+    "community_board": "Community Board",
+    "council_district": "Council District",
+    "census_tract": "Census Tract",
+    "bin": "BIN",
+    "bbl": "BBL",
+    "nta": "NTA",
+}
+
+# Explicit dtypes for the NYC inspection CSV, so every chunk parses to the same schema
+NYC_INSPECTION_DTYPES = defaultdict(
+    lambda: "str",
+    {
+        "CAMIS": "int64",
+        "ZIPCODE": "float64",
+        "SCORE": "float64",
+        "Latitude": "float64",
+        "Longitude": "float64",
+        "Community Board": "float64",
+        "Council District": "float64",
+        "Census Tract": "float64",
+        "BIN": "float64",
+        "BBL": "float64",
+    },
+)
+
+
+def open_source(spool, name, url):
+    """
+    Opens a source for reading, from its spool file if downloaded, otherwise from its URL.
+
+    Args:
+        spool (dict): Source name to spool file path, or None if not downloaded.
+        name (str): The source name.
+        url (str): The source URL.
+
+    Returns:
+        io.BufferedIOBase: A binary file object over the source body.
+    """
+    if spool.get(name):
+        return open_spool(spool[name])
+    return urllib.request.urlopen(url)
+
+
+def unchanged_export(spool, name, state):
+    """
+    Checks whether the database already holds the downloaded export of a source.
+
+    Args:
+        spool (dict): Source name to spool file path, or None if not downloaded.
+        name (str): The source name.
+        state (dict): The ingestion state of the source, or None.
+
+    Returns:
+        tuple: The SHA-256 digest of the export, or None if it was not downloaded, and
+            True if the last ingest was a full load of the same export.
+    """
+    digest = spool_digest(spool.get(name))
+    unchanged = bool(digest and state and state.get("content_hash") == digest)
+    return digest, unchanged
+
+
+def delta_source(context, name):
+    """
+    Checks whether an incremental ingest of a source will fetch a delta, i.e. the source
+    has a recorded high water mark and, for nyc_restaurants, a stored column schema.
+
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the mongo and postgres
+            resources.
+        name (str): The source name.
+
+    Returns:
+        bool: True if the ingest op, run with `incremental: true`, loads a delta.
+    """
+    if name == "nyc_restaurants" and context.resources.mongo.fetch_meta(name) is None:
+        return False
+    state = context.resources.postgres.read_state(name)
+    return bool(state and state["high_water_mark"])
+
+
+def stored_fingerprint(postgres_obj, source):
+    """
+    Returns a fingerprint of the rows of a source as stored by its last ingest.
+
+    A full load of a downloaded export is identified by the export's digest, so reloading
+    the same export keeps the fingerprint. Other ingests, such as deltas, are identified
+    by their recorded state, which changes on every ingest.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection holding the etl_state table.
+        source (str): The source name.
+
+    Returns:
+        str: The fingerprint, or None if the source was never ingested.
+    """
+    state = postgres_obj.read_state(source)
+    if state is None:
+        return None
+    if state["content_hash"]:
+        return fingerprint(source, state["content_hash"])
+    return fingerprint(source, state)
+
+
+def read_json(url):
+    """
+    Reads and parses a JSON document from a URL.
+
+    Args:
+        url (str): The URL to read.
+
+    Returns:
+        object: The parsed JSON document.
+    """
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
+
+
+def read_nyc_inspection_page(url):
+    """
+    Reads a page of the NYC inspection resource endpoint in the CSV export layout.
+
+    Resource field names are mapped to the export headers, dates are formatted as
+    MM/DD/YYYY and numeric columns are cast like the export.
+
+    Args:
+        url (str): The page URL.
+
+    Returns:
+        pandas.DataFrame: The page rows.
+    """
+    df = pd.read_csv(url, dtype=str)
+    df = df[[col for col in NYC_INSPECTION_FIELDS if col in df.columns]]
+    df = df.rename(columns=NYC_INSPECTION_FIELDS)
+
+    for col in ["INSPECTION DATE", "GRADE DATE", "RECORD DATE"]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format="ISO8601").dt.strftime("%m/%d/%Y")
+
+    numeric = {
+        col: dtype for col, dtype in NYC_INSPECTION_DTYPES.items() if col in df.columns
+    }
+    return df.astype(numeric)
+
+
+def upsert_nyc_inspection_delta(postgres_obj, mark, page_size):
+    """
+    Fetches NYC inspection rows inspected on or after a date and upserts them.
+
+    Pages are combined before the upsert, so rows sharing a key on different pages are
+    replaced together.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+        mark (str): The ISO date of the high water mark.
+        page_size (int): Number of rows per SoQL request.
+
+    Returns:
+        int: The number of upserted rows, or None if the upsert failed.
+    """
+    pages = list(
+        soql_pages(
+            NYC_INSPECTION_RESOURCE,
+            f"inspection_date >= '{mark}T00:00:00'",
+            page_size,
+            read=read_nyc_inspection_page,
+        )
+    )
+    if not pages:
+        logger.info("NYC Inspection: No New Rows.")
+        return 0
+
+    delta = pd.concat(pages, ignore_index=True)
+    return postgres_obj.upsert_data(delta, "nyc_inspection", NYC_INSPECTION_KEY)
+
+
+def socrata_document(row, names=None):
+    """
+    Converts a resource endpoint row to the layout of the rows.json export.
+
+    Floating timestamps lose their milliseconds and the :created_at and :updated_at system
+    fields become epoch seconds, as in the export.
+
+    Args:
+        row (dict): A row returned by a Socrata resource endpoint.
+        names (dict, optional): Field name to export column name; other fields are dropped.
+
+    Returns:
+        dict: The row keyed like the export.
+    """
+    doc = {}
+    for field, value in row.items():
+        if field in (":created_at", ":updated_at"):
+            value = int(
+                datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+            )
+        elif isinstance(value, str) and FLOATING_TIMESTAMP.fullmatch(value):
+            value = value[:19]
+
+        if names is None:
+            doc[field] = value
+        elif field in names:
+            doc[names[field]] = value
+    return doc
+
+
+@op(
+    config_schema={
+        "enabled": Field(bool, default_value=True),
+        "spool_dir": Field(str, default_value="spool"),
+        "connections": Field(int, default_value=8),
+        "retries": Field(int, default_value=3),
+        "timeout": Field(int, default_value=300),
+        "urls": Field(Permissive(), default_value={}),
+        "cache": Field(bool, default_value=True),
+        "cache_dir": Field(str, default_value="cache"),
+        "cache_max_mb": Field(int, default_value=10240),
+        "incremental": Field([str], default_value=[]),
+    },
+    out=Out(dict),
+    required_resource_keys={"mongo", "postgres"},
+)
+@instrumented
+def download_sources(context):
+    """
+    Downloads the three source exports concurrently into local spool files.
+
+    Transfers share one asyncio HTTP client, accept gzip transfer encoding and resume
+    interrupted downloads with Range requests. Source URLs can be overridden through the
+    `urls` config, e.g. to point at a local http_standin server.
+
+    With the cache enabled, downloads are kept in a content-addressed DownloadCache of at
+    most `cache_max_mb`, and a source whose cached copy the server reports as not modified
+    is not downloaded again. The number of cache hits is attached to the output.
+
+    Sources listed in `incremental`, whose ingest ops run with `incremental: true`, are
+    not downloaded once they have a recorded high water mark (and, for nyc_restaurants,
+    a stored column schema), since their ingest fetches the delta through SoQL instead.
+
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the download config.
+
+    Returns:
+        dict: Source name to spool file path; None makes the ingest op read its URL.
+    """
+    config = context.op_config
+    urls = {
+        "nyc_inspection": NYC_INSPECTION_URL,
+        "la_inspection": LA_INSPECTION_URL,
+        "nyc_restaurants": NYC_RESTAURANTS_URL,
+    }
+    urls.update(config["urls"])
+
+    if not config["enabled"]:
+        return {name: None for name in urls}
+
+    # Skip the sources their ingest op will fetch as deltas
+    deltas = [name for name in config["incremental"] if delta_source(context, name)]
+    for name in deltas:
+        urls.pop(name, None)
+        logger.info(f"{name} Ingests A Delta, Download Skipped.")
+
+    cache = None
+    if config["cache"]:
+        cache = DownloadCache(config["cache_dir"], config["cache_max_mb"] << 20)
+
+    spool, hits = fetch_all(
+        urls,
+        config["spool_dir"],
+        connections=config["connections"],
+        retries=config["retries"],
+        timeout=config["timeout"],
+        cache=cache,
+    )
+    context.add_output_metadata(
+        {
+            "cache_hits": sum(hits.values()),
+            "cache_misses": len(hits) - sum(hits.values()),
+        }
+    )
+    logger.info(f"Source Downloads Successful ({sum(hits.values())} Cache Hits).")
+    return {**spool, **dict.fromkeys(deltas)}
+
+
+@op(
+    config_schema={
+        "streaming": Field(bool, default_value=True),
+        "chunksize": Field(int, default_value=100000),
+        "prefetch": Field(int, default_value=2),
+        "staging": Field(bool, default_value=True),
+        "unlogged": Field(bool, default_value=False),
+        "incremental": Field(bool, default_value=False),
+    },
+    ins={"spool": In(dict)},
+    out=Out(Optional[str]),
+    required_resource_keys={"postgres"},
+)
+@instrumented
+def ingest_nyc_inspection(context, spool):
     """
     Fetches NYC inspection data from a CSV URL and ingests it into a PostgreSQL database.
 
+    In streaming mode the CSV is parsed in chunks of `chunksize` rows on a background
+    thread while the previous chunks are written to PostgresDB, so download, parse and
+    load overlap and memory stays bounded to `prefetch` chunks. Chunks are bulk loaded with
+    COPY into a staging table which replaces nyc_inspection once the last chunk is written.
+
+    In incremental mode only rows inspected on or after the recorded high water mark are
+    fetched through SoQL and upserted on (CAMIS, INSPECTION DATE, VIOLATION CODE). Either
+    way the new high water mark is recorded in the etl_state table. A full load is skipped
+    if the downloaded export is the one nyc_inspection was last fully loaded from.
+
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the streaming config.
+        spool (dict): Source name to downloaded spool file, read instead of the URL if set.
+
     Returns:
-        bool: True if the operation was successful, False otherwise.
+        str: Fingerprint of the stored rows, or None if the ingest failed.
     """
-    result = True
+    version = None
     try:
-        URL = "https://data.cityofnewyork.us/api/views/43nn-pn8j/rows.csv?accessType=DOWNLOAD"
+        URL = NYC_INSPECTION_URL
+        config = context.op_config
 
         try:
-            # Read CSV data from URL
-            data = pd.read_csv(URL)
-            logger.info("NYC Inspection Fetch From URL Seccessful.")
+            # Borrow a pooled PostgreSQL connection
+            postgres_obj = context.resources.postgres
+            state = postgres_obj.read_state("nyc_inspection")
+            digest, unchanged = unchanged_export(spool, "nyc_inspection", state)
+
+            if config["incremental"] and state and state["high_water_mark"]:
+                # Fetch and upsert only rows inspected since the high water mark
+                mark, mode = state["high_water_mark"], "delta"
+                upserted = upsert_nyc_inspection_delta(
+                    postgres_obj, mark, config["chunksize"]
+                )
+                loaded = upserted is not None
+            elif unchanged:
+                # PostgresDB already holds this export
+                mode = None
+                logger.info("NYC Inspection Export Unchanged, Reload Skipped.")
+            else:
+                mark, mode = None, "full"
+                with open_source(spool, "nyc_inspection", URL) as source:
+                    if config["streaming"]:
+                        # Read CSV data in chunks and load each chunk as it arrives
+                        chunks = pd.read_csv(
+                            source,
+                            chunksize=config["chunksize"],
+                            dtype=NYC_INSPECTION_DTYPES,
+                        )
+                        rows = postgres_obj.load_chunks(
+                            prefetch(chunks, config["prefetch"]),
+                            "nyc_inspection",
+                            staging=config["staging"],
+                            unlogged=config["unlogged"],
+                        )
+                        loaded = rows is not None
+                        if loaded:
+                            logger.info("NYC Inspection Fetch From URL Successful.")
+                    else:
+                        # Read CSV data
+                        data = pd.read_csv(source, dtype=NYC_INSPECTION_DTYPES)
+                        logger.info("NYC Inspection Fetch From URL Successful.")
+                        loaded = postgres_obj.load_data(
+                            data,
+                            "nyc_inspection",
+                            staging=config["staging"],
+                            unlogged=config["unlogged"],
+                        )
+
+            if mode is not None and not loaded:
+                # The table may hold part of the export, so it must not match it again
+                postgres_obj.clear_content_hash("nyc_inspection")
+                return None
 
-            # Connect to PostgreSQL database and load data
-            postgres_obj = PostgresDB()
-            postgres_obj.load_data(data, "nyc_inspection")
-            postgres_obj.close_connection()
+            # Record the new high water mark once the load succeeded
+            if mode is not None:
+                postgres_obj.write_state(
+                    "nyc_inspection",
+                    postgres_obj.fetch_value(NYC_INSPECTION_MARK_QUERY),
+                    mark,
+                    mode,
+                    digest if mode == "full" else None,
+                )
+            if mode == "full":
+                # The cleaned table must be rebuilt from the reloaded rows
+                postgres_obj.clear_state(INSPECTION_TABLES["nyc_inspection"])
+            context.add_output_metadata({"cache_hit": mode is None})
+
+            # Fingerprint of the stored rows, keying the memoized downstream ops
+            version = stored_fingerprint(postgres_obj, "nyc_inspection")
 
         except URLError as e:
             logger.error(f"URL Error: {e}")
@@ -47,36 +481,118 @@ def ingest_nyc_inspection():
 
     except Exception as e:
         logger.error(f"Error: {e}")
-        result = False
 
-    return result
+    return version
 
 
-@op(out=Out(bool))
-def ingest_la_inspection():
+@op(
+    config_schema={
+        "batch_size": Field(int, default_value=5000),
+        "workers": Field(int, default_value=4),
+        "sample": Field(Noneable(int), default_value=None),
+        "streaming": Field(bool, default_value=True),
+        "incremental": Field(bool, default_value=False),
+    },
+    ins={"spool": In(dict)},
+    out=Out(Optional[str]),
+    required_resource_keys={"couch", "postgres"},
+)
+@instrumented
+def ingest_la_inspection(context, spool):
     """
     Fetches LA inspection data from a JSON URL and ingests it into a CouchDB database.
 
+    In streaming mode rows are parsed incrementally from the HTTP response and written
+    with concurrent _bulk_docs batches as they arrive. The full dataset replaces the
+    database unless a `sample` size is configured; documents are keyed by serial_number.
+
+    In incremental mode only inspections on or after the recorded high water mark are
+    fetched through SoQL and upserted by serial_number. A full load is skipped if the
+    downloaded export is the one la_inspection was last fully loaded from.
+
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the bulk load config.
+        spool (dict): Source name to downloaded spool file, read instead of the URL if set.
+
     Returns:
-        bool: True if the operation was successful, False otherwise.
+        str: Fingerprint of the stored rows, or None if the ingest failed.
     """
-    result = True
+    version = None
     try:
-        URL = (
-            "https://data.lacity.org/api/views/29fd-3paw/rows.json?accessType=DOWNLOAD"
-        )
+        URL = LA_INSPECTION_URL
 
         try:
-            # Read JSON data from URL
-            with urllib.request.urlopen(URL) as response:
-                response = response.read().decode("utf-8")
-                data = json.loads(response)
-            logger.info("LA Inspection Fetch From URL Seccessful.")
+            # Borrow CouchDB and PostgresDB holding the ingestion state
+            couch_obj = context.resources.couch
+            postgres_obj = context.resources.postgres
+            state = postgres_obj.read_state("la_inspection")
+            digest, unchanged = unchanged_export(spool, "la_inspection", state)
+
+            if context.op_config["incremental"] and state and state["high_water_mark"]:
+                # Fetch and upsert only inspections since the high water mark
+                mark, mode = state["high_water_mark"], "delta"
+                pages = soql_pages(
+                    LA_INSPECTION_RESOURCE,
+                    f"activity_date >= '{mark}'",
+                    context.op_config["batch_size"],
+                    read=read_json,
+                )
+                upserted = couch_obj.upsert_data(
+                    (socrata_document(row) for page in pages for row in page),
+                    "la_inspection",
+                    key=LA_INSPECTION_KEY,
+                    batch_size=context.op_config["batch_size"],
+                    workers=context.op_config["workers"],
+                )
+                loaded = upserted is not None
+            elif unchanged:
+                # CouchDB already holds this export
+                mode = None
+                logger.info("LA Inspection Export Unchanged, Reload Skipped.")
+            else:
+                mark, mode = None, "full"
+                with open_source(spool, "la_inspection", URL) as response:
+                    if context.op_config["streaming"]:
+                        # Parse JSON rows straight off the response while loading them
+                        data = SocrataRows(response)
+                    else:
+                        # Read JSON data from URL
+                        data = json.loads(response.read().decode("utf-8"))
+
+                    # Load data
+                    loaded = couch_obj.load_data(
+                        data,
+                        "la_inspection",
+                        batch_size=context.op_config["batch_size"],
+                        workers=context.op_config["workers"],
+                        sample=context.op_config["sample"],
+                        key=LA_INSPECTION_KEY,
+                        replace=True,
+                    )
+                if loaded:
+                    logger.info("LA Inspection Fetch From URL Successful.")
 
-            # Connect to CouchDB and load data
-            couch_obj = CouchDB()
-            couch_obj.load_data(data, "la_inspection")
-            couch_obj.close_connection()
+            if mode is not None and not loaded:
+                # The database may hold part of the export, so it must not match it again
+                postgres_obj.clear_content_hash("la_inspection")
+                return None
+
+            # Record the new high water mark once the load succeeded
+            if mode is not None:
+                postgres_obj.write_state(
+                    "la_inspection",
+                    couch_obj.max_value("la_inspection", "activity_date"),
+                    mark,
+                    mode,
+                    digest if mode == "full" else None,
+                )
+            if mode == "full":
+                # The cleaned table must be rebuilt from the reloaded rows
+                postgres_obj.clear_state(INSPECTION_TABLES["la_inspection"])
+            context.add_output_metadata({"cache_hit": mode is None})
+
+            # Fingerprint of the stored rows, keying the memoized downstream ops
+            version = stored_fingerprint(postgres_obj, "la_inspection")
 
         except URLError as e:
             logger.error(f"URL Error: {e}")
@@ -91,34 +607,119 @@ def ingest_la_inspection():
 
     except Exception as e:
         logger.error(f"Error: {e}")
-        result = False
 
-    return result
+    return version
 
 
-@op(out=Out(bool))
-def ingest_nyc_restaurants():
+@op(
+    config_schema={
+        "row_documents": Field(bool, default_value=True),
+        "batch_size": Field(int, default_value=10000),
+        "streaming": Field(bool, default_value=True),
+        "incremental": Field(bool, default_value=False),
+    },
+    ins={"spool": In(dict)},
+    out=Out(Optional[str]),
+    required_resource_keys={"mongo", "postgres"},
+)
+@instrumented
+def ingest_nyc_restaurants(context, spool):
     """
     Fetches NYC restaurants data from a JSON URL and ingests it into a MongoDB database.
 
+    By default every row is stored as its own document, inserted unordered in batches,
+    with the column schema stored once alongside the collection. In streaming mode rows are
+    parsed incrementally from the HTTP response and inserted as they arrive.
+
+    In incremental mode (row documents only) rows whose Socrata :updated_at is past the
+    recorded high water mark are fetched through SoQL and upserted by row id. A full load
+    is skipped if the downloaded export is the one nyc_restaurants was last loaded from.
+
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the load config.
+        spool (dict): Source name to downloaded spool file, read instead of the URL if set.
+
     Returns:
-        bool: True if the operation was successful, False otherwise.
+        str: Fingerprint of the stored rows, or None if the ingest failed.
     """
-    result = True
+    version = None
     try:
-        URL = "https://data.cityofnewyork.us/api/views/pitm-atqc/rows.json?accessType=DOWNLOAD"
+        URL = NYC_RESTAURANTS_URL
 
         try:
-            # Read JSON data from URL
-            with urllib.request.urlopen(URL) as response:
-                response = response.read().decode("utf-8")
-                data = json.loads(response)
-            logger.info("NYC Restaurants Fetch From URL Seccessful.")
+            # Borrow MongoDB and PostgresDB holding the ingestion state
+            mongo_obj = context.resources.mongo
+            postgres_obj = context.resources.postgres
+            state = postgres_obj.read_state("nyc_restaurants")
+            meta = mongo_obj.fetch_meta("nyc_restaurants")
+            incremental = context.op_config["incremental"] and meta is not None
+            digest, unchanged = unchanged_export(spool, "nyc_restaurants", state)
+
+            if incremental and state and state["high_water_mark"]:
+                # Fetch and upsert only rows updated since the high water mark
+                mark, mode = state["high_water_mark"], "delta"
+                updated = datetime.datetime.fromtimestamp(
+                    int(mark), datetime.timezone.utc
+                ).strftime("%Y-%m-%dT%H:%M:%S")
+                pages = soql_pages(
+                    NYC_RESTAURANTS_RESOURCE,
+                    f":updated_at > '{updated}'",
+                    context.op_config["batch_size"],
+                    read=read_json,
+                    select=":*, *",
+                )
+                names = {col["fieldName"]: col["name"] for col in meta}
+                upserted = mongo_obj.upsert_data(
+                    (socrata_document(row, names) for page in pages for row in page),
+                    "nyc_restaurants",
+                    key=NYC_RESTAURANTS_KEY,
+                    batch_size=context.op_config["batch_size"],
+                )
+                loaded = upserted is not None
+            elif unchanged:
+                # MongoDB already holds this export
+                mode = None
+                logger.info("NYC Restaurants Export Unchanged, Reload Skipped.")
+            else:
+                mark, mode = None, "full"
+                with open_source(spool, "nyc_restaurants", URL) as response:
+                    if context.op_config["streaming"]:
+                        # Parse JSON rows straight off the response while loading them
+                        data = SocrataRows(response)
+                    else:
+                        # Read JSON data from URL
+                        data = json.loads(response.read().decode("utf-8"))
+
+                    # Load data
+                    loaded = mongo_obj.load_data(
+                        data,
+                        "nyc_restaurants",
+                        row_documents=context.op_config["row_documents"],
+                        batch_size=context.op_config["batch_size"],
+                        key=NYC_RESTAURANTS_KEY,
+                    )
+                if loaded:
+                    logger.info("NYC Restaurants Fetch From URL Successful.")
+
+            if mode is not None and not loaded:
+                # The collection may hold part of the export, so it must not match it again
+                postgres_obj.clear_content_hash("nyc_restaurants")
+                return None
+
+            # Record the new high water mark once the load succeeded
+            if mode is not None:
+                high_water_mark = mongo_obj.max_value("nyc_restaurants", "updated_at")
+                postgres_obj.write_state(
+                    "nyc_restaurants",
+                    None if high_water_mark is None else str(high_water_mark),
+                    mark,
+                    mode,
+                    digest if mode == "full" else None,
+                )
+            context.add_output_metadata({"cache_hit": mode is None})
 
-            # Connect to MongoDB and load data
-            mongo_obj = MongoDB()
-            mongo_obj.load_data(data, "nyc_restaurants")
-            mongo_obj.close_connection()
+            # Fingerprint of the stored rows, keying the memoized downstream ops
+            version = stored_fingerprint(postgres_obj, "nyc_restaurants")
 
         except URLError as e:
             logger.error(f"URL Error: {e}")
@@ -133,6 +734,5 @@ def ingest_nyc_restaurants():
 
     except Exception as e:
         logger.error(f"Error: {e}")
-        result = False
 
-    return result
+    return version
@@ -1,27 +1,179 @@
 # Python Imports
+import datetime
+import sys
 import pandas as pd
 import numpy as np
-from dagster import op, Out, In, get_dagster_logger
+from dagster import op, Out, In, Field, Optional, get_dagster_logger
 from dagster_pandas import PandasColumn, create_dagster_pandas_dataframe_type
+from dagster_pandas.constraints import (
+    ColumnDTypeFnConstraint,
+    NonNullableColumnConstraint,
+)
+from pandas.api.types import CategoricalDtype, is_string_dtype
 
 # Custom Imports
-from postgres_connector import PostgresDB
-from mongo_connector import MongoDB
-from couch_connector import CouchDB
+import cleaning as cleaning_module
+import name_index
+from source_query import SourceQuery
+from cleaning import CleaningSpec
+from memo import MemoStore, code_version, fingerprint
+from metrics import instrumented
+from summary_tables import GRADES, INSPECTION_TABLES, refresh_summary_tables
+from table_schema import CLEANED_TABLES
+from sketches import refresh_name_sketches
+from name_index import (
+    INSPECTION_COUNTS,
+    RESTAURANT_COUNTS,
+    NameIndex,
+    join_open_inspections,
+)
 
 # Setting up logger
 logger = get_dagster_logger()
 
+# Memoized preprocess outputs, invalidated by changes to the cleaning code
+MEMO = MemoStore()
+CODE_VERSION = code_version(sys.modules[__name__], cleaning_module)
+JOIN_CODE_VERSION = code_version(name_index)
+
+# Summary table written by joining_open_inspections
+JOIN_TABLE = "nyc_open_inspection_summary"
+
+# Cleaning pipelines: column map, filters, date formats and derived fields per source
+NYC_RESTAURANT_CLEANING = CleaningSpec(
+    columns={
+        "Seating Interest (Sidewalk/Roadway/Both)": "type",
+        "Restaurant Name": "name",
+        "Borough": "borough",
+        "Approved for Sidewalk Seating": "sidewalk_seating_approval",
+        "Approved for Roadway Seating": "roadway_seating_approval",
+        "Qualify Alcohol": "alcohol_permission",
+    },
+    lower=["name"],
+    categories=[
+        "type",
+        "borough",
+        "sidewalk_seating_approval",
+        "roadway_seating_approval",
+        "alcohol_permission",
+    ],
+)
+
+NYC_INSPECTION_CLEANING = CleaningSpec(
+    columns={
+        "DBA": "name",
+        "BORO": "borough",
+        "INSPECTION DATE": "inspection_date",
+        "GRADE": "grade",
+    },
+    filters=[
+        ("grade", "in", GRADES),
+        ("inspection_date", ">=", datetime.date(2016, 1, 1)),
+    ],
+    dates={"inspection_date": "%m/%d/%Y"},
+    lower=["name"],
+    date_parts="inspection_date",
+    categories=["borough", "grade"],
+    dedupe=True,
+)
+
+LA_INSPECTION_CLEANING = CleaningSpec(
+    columns={
+        "activity_date": "inspection_date",
+        "facility_name": "name",
+        "grade": "grade",
+    },
+    filters=[("grade", "in", GRADES)],
+    dates={"inspection_date": "ISO8601"},
+    lower=["name"],
+    date_parts="inspection_date",
+    categories=["grade"],
+)
+
+# Source queries pushing feature selection and filters into the databases
+NYC_RESTAURANT_QUERY = SourceQuery(columns=list(NYC_RESTAURANT_CLEANING.columns))
+
+DATE_FORMATS = {"INSPECTION DATE": "MM/DD/YYYY"}
+
+NYC_INSPECTION_QUERY = SourceQuery(
+    columns=list(NYC_INSPECTION_CLEANING.columns),
+    filters=[
+        ("GRADE", "in", GRADES),
+        ("INSPECTION DATE", ">=", datetime.date(2016, 1, 1)),
+    ],
+    date_formats=DATE_FORMATS,
+)
+
+LA_INSPECTION_QUERY = SourceQuery(
+    columns=list(LA_INSPECTION_CLEANING.columns),
+    filters=[("grade", "in", GRADES)],
+)
+
+
+def enum_column(name):
+    """
+    Builds a non-nullable PandasColumn accepting string or categorical dtypes.
+
+    Args:
+        name (str): The column name.
+
+    Returns:
+        dagster_pandas.PandasColumn: The column definition.
+    """
+    return PandasColumn(
+        name=name,
+        constraints=[
+            ColumnDTypeFnConstraint(
+                lambda dtype: is_string_dtype(dtype) or isinstance(dtype, CategoricalDtype)
+            ),
+            NonNullableColumnConstraint(),
+        ],
+    )
+
+
+def grade_column():
+    """
+    Builds the non-nullable PandasColumn of A, B and C grades, as strings or categoricals.
+
+    Returns:
+        dagster_pandas.PandasColumn: The column definition.
+    """
+    return PandasColumn.categorical_column(
+        name="grade",
+        categories=set(GRADES),
+        of_types={"category", "string", "object"},
+        non_nullable=True,
+    )
+
+
+def date_part_columns():
+    """
+    Builds the non-nullable integer PandasColumns of the extracted date parts.
+
+    Returns:
+        list: The month, year and quarter column definitions.
+    """
+    return [
+        PandasColumn.integer_column(
+            name="month", min_value=1, max_value=12, non_nullable=True
+        ),
+        PandasColumn.integer_column(name="year", non_nullable=True),
+        PandasColumn.integer_column(
+            name="quarter", min_value=1, max_value=4, non_nullable=True
+        ),
+    ]
+
+
 # Define Dagster pandas dataframe types
 nyc_restaurant_df = create_dagster_pandas_dataframe_type(
     name="nyc_restaurant_df",
     columns=[
-        PandasColumn.string_column(name="type", non_nullable=True),
+        enum_column("type"),
         PandasColumn.string_column(name="name", non_nullable=True),
-        PandasColumn.string_column(name="borough", non_nullable=True),
-        PandasColumn.string_column(name="sidewalk_seating_approval", non_nullable=True),
-        PandasColumn.string_column(name="roadway_seating_approval", non_nullable=True),
-        PandasColumn.string_column(name="alcohol_permission", non_nullable=True),
+        enum_column("borough"),
+        enum_column("sidewalk_seating_approval"),
+        enum_column("roadway_seating_approval"),
+        enum_column("alcohol_permission"),
     ],
 )
 
@@ -29,12 +181,10 @@ nyc_inspection_df = create_dagster_pandas_dataframe_type(
     name="nyc_inspection_df",
     columns=[
         PandasColumn.string_column(name="name", non_nullable=True),
-        PandasColumn.string_column(name="borough", non_nullable=True),
+        enum_column("borough"),
         PandasColumn.datetime_column(name="inspection_date", non_nullable=True),
-        PandasColumn.string_column(name="grade", non_nullable=True),
-        PandasColumn.numeric_column(name="month", non_nullable=True),
-        PandasColumn.numeric_column(name="year", non_nullable=True),
-        PandasColumn.numeric_column(name="quarter", non_nullable=True),
+        grade_column(),
+        *date_part_columns(),
     ],
 )
 
@@ -43,74 +193,111 @@ la_inspection_df = create_dagster_pandas_dataframe_type(
     columns=[
         PandasColumn.datetime_column(name="inspection_date", non_nullable=True),
         PandasColumn.string_column(name="name", non_nullable=True),
-        PandasColumn.string_column(name="grade", non_nullable=True),
-        PandasColumn.numeric_column(name="month", non_nullable=True),
-        PandasColumn.numeric_column(name="year", non_nullable=True),
-        PandasColumn.numeric_column(name="quarter", non_nullable=True),
+        grade_column(),
+        *date_part_columns(),
     ],
 )
 
 
-@op(ins={"start": In(bool)}, out=Out(nyc_restaurant_df))
-def preprocess_nyc_restaurant(start):
+def delta_window(postgres_obj, source):
     """
-    Fetches and preprocesses NYC restaurant data from MongoDB.
+    Returns the date from which a source's cleaned table must be rebuilt, if a delta
+    suffices.
+
+    The window starts at the watermark last applied to the cleaned table, which
+    loading_cleaned_data records in etl_state under the cleaned table's name once the
+    table and its summaries were refreshed. Deltas ingested by runs whose cleaning or
+    loading failed therefore stay inside the window until a run applies them.
 
     Args:
-        start (bool): Dummy input to trigger the operation.
+        postgres_obj (PostgresDB): The PostgresDB connection holding the etl_state table.
+        source (str): The source name.
 
     Returns:
-        pandas.DataFrame: Processed NYC restaurant data.
+        str: The applied high water mark, or None if the whole table must be rebuilt:
+            the last ingest was a full load or no mark was applied since.
     """
-    # Connect to MongoDB
-    mongo_obj = MongoDB()
-    # Fetch JSON from MongoDB
-    nyc_restaurants = mongo_obj.fetch_data("nyc_restaurants")
-    # Close connection from MongoDB
-    mongo_obj.close_connection()
-
-    # Transforming JSON to Dataframe
-    cols = [col["name"] for col in nyc_restaurants[0]["meta"]["view"]["columns"]]
-    vals = nyc_restaurants[0]["data"]
-    df = pd.DataFrame(vals, columns=cols)
-
-    # Initial records count
-    initial_records = len(df)
-
-    # Dropping duplicates
-    df = df.drop_duplicates()
-
-    # Feature selection
-    use_cols = [
-        "Seating Interest (Sidewalk/Roadway/Both)",
-        "Restaurant Name",
-        "Borough",
-        "Approved for Sidewalk Seating",
-        "Approved for Roadway Seating",
-        "Qualify Alcohol",
-    ]
-    df = df[use_cols]
+    state = postgres_obj.read_state(source)
+    if not state or state["mode"] != "delta":
+        return None
+    applied = postgres_obj.read_state(INSPECTION_TABLES[source])
+    if applied is None:
+        return None
+    return applied["high_water_mark"]
 
-    # Renaming columns
-    df.columns = [
-        "type",
-        "name",
-        "borough",
-        "sidewalk_seating_approval",
-        "roadway_seating_approval",
-        "alcohol_permission",
-    ]
 
-    # Converting name to lowercase
-    df["name"] = df["name"].str.lower()
+@op(
+    config_schema={
+        "pushdown": Field(bool, default_value=True),
+        "batch_size": Field(int, default_value=10000),
+        "compact": Field(bool, default_value=True),
+        "arrow_strings": Field(bool, default_value=False),
+        "processes": Field(int, default_value=1),
+    },
+    ins={"source_version": In(Optional[str])},
+    out={
+        "result": Out(nyc_restaurant_df, io_manager_key="parquet_io_manager"),
+        "version": Out(Optional[str]),
+    },
+    required_resource_keys={"mongo"},
+)
+@instrumented
+def preprocess_nyc_restaurant(context, source_version):
+    """
+    Fetches and preprocesses NYC restaurant data from MongoDB.
+
+    Rows are streamed from a MongoDB cursor in batches and the DataFrame is built from
+    those batches. With pushdown enabled only the used columns are returned. Rows carry
+    unique Socrata ids, so no duplicates exist to drop after projection. Rows are cleaned
+    by NYC_RESTAURANT_CLEANING, on `processes` worker processes if more than one. The
+    output is memoized on the fingerprint of the ingested rows, the config and the code.
 
-    # Converting object to string
-    df["type"] = df["type"].astype("string")
-    df["name"] = df["name"].astype("string")
-    df["borough"] = df["borough"].astype("string")
-    df["sidewalk_seating_approval"] = df["sidewalk_seating_approval"].astype("string")
-    df["roadway_seating_approval"] = df["roadway_seating_approval"].astype("string")
-    df["alcohol_permission"] = df["alcohol_permission"].astype("string")
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the fetch config.
+        source_version (str): Fingerprint of the ingested rows, or None if unknown.
+
+    Returns:
+        tuple: Processed NYC restaurant data and its fingerprint, or None if unknown.
+    """
+    config = context.op_config
+
+    # Reuse the output of the same ingested rows, config and cleaning code
+    key = fingerprint("preprocess_nyc_restaurant", source_version, config, CODE_VERSION)
+    df = MEMO.load("preprocess_nyc_restaurant", key)
+    if df is not None:
+        return df, key
+    use_cols = NYC_RESTAURANT_QUERY.columns
+
+    # Borrow the pooled MongoDB client
+    mongo_obj = context.resources.mongo
+
+    if config["pushdown"]:
+        # Initial records count
+        initial_records = mongo_obj.count_data("nyc_restaurants")
+
+        # Feature selection in MongoDB
+        batches = mongo_obj.iter_query(
+            "nyc_restaurants", NYC_RESTAURANT_QUERY, batch_size=config["batch_size"]
+        )
+        df = pd.concat(
+            [pd.DataFrame(batch, columns=use_cols) for batch in batches]
+            or [pd.DataFrame(columns=use_cols)],
+            ignore_index=True,
+        )
+    else:
+        # Fetch JSON rows from MongoDB and transform them into a Dataframe
+        batches = mongo_obj.iter_query(
+            "nyc_restaurants", SourceQuery(), batch_size=config["batch_size"]
+        )
+        df = pd.concat([pd.DataFrame(batch) for batch in batches], ignore_index=True)
+
+        # Initial records count
+        initial_records = len(df)
+
+    # Feature selection, renaming and type conversion
+    df = NYC_RESTAURANT_CLEANING.apply_partitioned(df, config["processes"])
+    if config["compact"]:
+        df = NYC_RESTAURANT_CLEANING.compact(df, config["arrow_strings"], "NYC Restaurants")
 
     # Logging
     logger.info(f"Records before cleaning - {initial_records}")
@@ -121,64 +308,99 @@ def preprocess_nyc_restaurant(start):
     )
     logger.info("NYC Restautants JSON Preprocess Successful.")
 
-    return df
+    MEMO.store("preprocess_nyc_restaurant", key, df)
+    return df, key
 
 
-@op(ins={"start": In(bool)}, out=Out(nyc_inspection_df))
-def preprocess_nyc_inspection(start):
+@op(
+    config_schema={
+        "streaming": Field(bool, default_value=True),
+        "chunksize": Field(int, default_value=50000),
+        "compact": Field(bool, default_value=True),
+        "arrow_strings": Field(bool, default_value=False),
+        "processes": Field(int, default_value=1),
+    },
+    ins={"source_version": In(Optional[str])},
+    out={
+        "result": Out(nyc_inspection_df, io_manager_key="parquet_io_manager"),
+        "version": Out(Optional[str]),
+    },
+    required_resource_keys={"postgres"},
+)
+@instrumented
+def preprocess_nyc_inspection(context, source_version):
     """
     Fetches and preprocesses NYC inspection data from PostgresDB.
 
+    In streaming mode duplicates, grades and dates are filtered in PostgresDB and only the
+    used columns are read through a server-side cursor, one chunk at a time. Rows are
+    cleaned by NYC_INSPECTION_CLEANING, deduplicated on the used columns, on `processes`
+    worker processes if more than one: chunk by chunk when streaming, otherwise in
+    partitions hashed on the used columns. After a delta ingest only rows inspected since
+    the previous high water mark are processed. The output is memoized on the fingerprint
+    of the ingested rows, the config and the code.
+
     Args:
-        start (bool): Dummy input to trigger the operation.
+        context (dagster.OpExecutionContext): Op context holding the streaming config.
+        source_version (str): Fingerprint of the ingested rows, or None if unknown.
 
     Returns:
-        pandas.DataFrame: Processed NYC inspection data.
+        tuple: Processed NYC inspection data and its fingerprint, or None if unknown.
     """
-    # Connect to PostgresDB
-    postgres_obj = PostgresDB()
-    # Fetch CSV from PostgresDB
-    df = postgres_obj.fetch_data("nyc_inspection")
-    # Close connection from PostgresDB
-    postgres_obj.close_connection()
-
-    # Initial records count
-    initial_records = len(df)
-
-    # Dropping duplicates
-    df = df.drop_duplicates()
-
-    # Feature selection
-    use_cols = ["DBA", "BORO", "INSPECTION DATE", "GRADE"]
-    df = df[use_cols]
-
-    # Dropping rows with null values in GRADE
-    df = df.dropna(subset=["GRADE"], how="all")
-
-    # Filtering out grades A, B, C
-    df = df[df.GRADE.isin(["A", "B", "C"])]
-
-    # Converting INSPECTION DATE from string to datetime
-    df["INSPECTION DATE"] = pd.to_datetime(df["INSPECTION DATE"])
-
-    # Filtering out INSPECTION DATE
-    df = df[df["INSPECTION DATE"].dt.year >= 2016]
-
-    # Renaming columns
-    df.columns = ["name", "borough", "inspection_date", "grade"]
-
-    # Converting name to lowercase
-    df["name"] = df["name"].str.lower()
-
-    # Extracting month, year and quarter
-    df["month"] = df["inspection_date"].dt.month
-    df["year"] = df["inspection_date"].dt.year
-    df["quarter"] = df["inspection_date"].dt.quarter
-
-    # Converting object to string
-    df["name"] = df["name"].astype("string")
-    df["borough"] = df["borough"].astype("string")
-    df["grade"] = df["grade"].astype("string")
+    config = context.op_config
+
+    # Reuse the output of the same ingested rows, config and cleaning code
+    key = fingerprint("preprocess_nyc_inspection", source_version, config, CODE_VERSION)
+    df = MEMO.load("preprocess_nyc_inspection", key)
+    if df is not None:
+        return df, key
+    use_cols = NYC_INSPECTION_QUERY.columns
+
+    # Borrow a pooled PostgresDB connection
+    postgres_obj = context.resources.postgres
+
+    # Only rows inspected since the last delta ingest started need processing
+    window = delta_window(postgres_obj, "nyc_inspection")
+    query, window_query = NYC_INSPECTION_QUERY, SourceQuery(date_formats=DATE_FORMATS)
+    cleaning = NYC_INSPECTION_CLEANING
+    if window is not None:
+        window_date = datetime.date.fromisoformat(window)
+        query = query.where("INSPECTION DATE", ">=", window_date)
+        window_query = window_query.where("INSPECTION DATE", ">=", window_date)
+        cleaning = cleaning.where("inspection_date", ">=", window_date)
+
+    if config["streaming"]:
+        # Initial records count
+        initial_records = postgres_obj.count_rows("nyc_inspection", *window_query.to_sql())
+
+        # Dropping duplicates, feature selection and filtering in PostgresDB
+        chunks = postgres_obj.iter_query(
+            "nyc_inspection",
+            query,
+            chunksize=config["chunksize"],
+            distinct=True,
+        )
+        # Chunks are already distinct on the used columns
+        cleaned = list(
+            cleaning.apply_chunks(chunks, config["processes"], dedupe=False)
+        )
+        df = (
+            pd.concat(cleaned, ignore_index=True)
+            if cleaned
+            else cleaning.apply(pd.DataFrame(columns=use_cols))
+        )
+    else:
+        # Fetch CSV from PostgresDB
+        df = postgres_obj.fetch_data("nyc_inspection")
+
+        # Initial records count
+        initial_records = len(df)
+
+        # Feature selection, dropping duplicates and filtering
+        df = cleaning.apply_partitioned(df, config["processes"])
+
+    if config["compact"]:
+        df = cleaning.compact(df, config["arrow_strings"], "NYC Inspections")
 
     # Logging
     logger.info(f"Records before cleaning - {initial_records}")
@@ -189,61 +411,114 @@ def preprocess_nyc_inspection(start):
     )
     logger.info("NYC Inspections CSV Preprocess Successful.")
 
-    return df
+    MEMO.store("preprocess_nyc_inspection", key, df)
+    return df, key
 
 
-@op(ins={"start": In(bool)}, out=Out(la_inspection_df))
-def preprocess_la_inspection(start):
+@op(
+    config_schema={
+        "pushdown": Field(bool, default_value=True),
+        "batch_size": Field(int, default_value=10000),
+        "workers": Field(int, default_value=4),
+        "compact": Field(bool, default_value=True),
+        "arrow_strings": Field(bool, default_value=False),
+        "processes": Field(int, default_value=1),
+    },
+    ins={"source_version": In(Optional[str])},
+    out={
+        "result": Out(la_inspection_df, io_manager_key="parquet_io_manager"),
+        "version": Out(Optional[str]),
+    },
+    required_resource_keys={"couch", "postgres"},
+)
+@instrumented
+def preprocess_la_inspection(context, source_version):
     """
     Fetches and preprocesses LA inspection data from CouchDB.
 
+    Documents are read in batches from parallel key ranges and the DataFrame is built
+    incrementally from those batches. With pushdown enabled CouchDB filters grades with a
+    Mango selector and returns only the used fields. Documents carry unique ids, so no
+    duplicates exist to drop after projection. Rows are cleaned by LA_INSPECTION_CLEANING,
+    on `processes` worker processes if more than one.
+    After a delta ingest only inspections since the previous high water mark are processed.
+    The output is memoized on the fingerprint of the ingested rows, the config and the code.
+
     Args:
-        start (bool): Dummy input to trigger the operation.
+        context (dagster.OpExecutionContext): Op context holding the fetch config.
+        source_version (str): Fingerprint of the ingested rows, or None if unknown.
 
     Returns:
-        pandas.DataFrame: Processed LA inspection data.
+        tuple: Processed LA inspection data and its fingerprint, or None if unknown.
     """
-    # Connect to CouchDB
-    couch_obj = CouchDB()
-    # Fetch JSON from CouchDB
-    la_inspection = couch_obj.fetch_data("la_inspection")
-    # Close connection from CouchDB
-    couch_obj.close_connection()
-
-    # Transform JSON into DataFrame
-    temp = [row["doc"] for row in la_inspection]
-    df = pd.DataFrame(temp)
-
-    # Initial records count
-    initial_records = len(df)
-
-    # Dropping duplicates
-    df = df.drop_duplicates()
-
-    # Feature selection
-    use_cols = ["activity_date", "facility_name", "grade"]
-    df = df[use_cols]
-
-    # Filtering out grades A, B, C
-    df = df[df.grade.isin(["A", "B", "C"])]
-
-    # Renaming columns
-    df.columns = ["inspection_date", "name", "grade"]
-
-    # Converting inspection_date from string to datetime
-    df["inspection_date"] = pd.to_datetime(df["inspection_date"])
-
-    # Converting name to lowercase
-    df["name"] = df["name"].str.lower()
-
-    # Extracting month, year and quarter
-    df["month"] = df["inspection_date"].dt.month
-    df["year"] = df["inspection_date"].dt.year
-    df["quarter"] = df["inspection_date"].dt.quarter
-
-    # Converting object to string
-    df["name"] = df["name"].astype("string")
-    df["grade"] = df["grade"].astype("string")
+    config = context.op_config
+
+    # Reuse the output of the same ingested rows, config and cleaning code
+    key = fingerprint("preprocess_la_inspection", source_version, config, CODE_VERSION)
+    df = MEMO.load("preprocess_la_inspection", key)
+    if df is not None:
+        return df, key
+    use_cols = LA_INSPECTION_QUERY.columns
+
+    # Only inspections since the last delta ingest started need processing
+    window = delta_window(context.resources.postgres, "la_inspection")
+    cleaning = LA_INSPECTION_CLEANING
+    if window is not None:
+        cleaning = cleaning.where("inspection_date", ">=", pd.Timestamp(window))
+
+    # Borrow the pooled CouchDB server
+    couch_obj = context.resources.couch
+
+    if config["pushdown"]:
+        query = LA_INSPECTION_QUERY
+        if window is not None:
+            query = query.where("activity_date", ">=", window)
+
+        # Feature selection and grade filtering in CouchDB, cleaning batch by batch
+        batches = couch_obj.iter_query(
+            "la_inspection",
+            query,
+            batch_size=config["batch_size"],
+            workers=config["workers"],
+        )
+        fetched = 0
+
+        def _frames():
+            nonlocal fetched
+            for batch in batches:
+                fetched += len(batch)
+                yield pd.DataFrame(batch, columns=use_cols)
+
+        cleaned = list(cleaning.apply_chunks(_frames(), config["processes"]))
+
+        # Initial records count, only the fetched window for deltas
+        initial_records = (
+            couch_obj.count_data("la_inspection") if window is None else fetched
+        )
+        df = (
+            pd.concat(cleaned, ignore_index=True)
+            if cleaned
+            else cleaning.apply(pd.DataFrame(columns=use_cols))
+        )
+    else:
+        # Fetch JSON from CouchDB and transform each batch into a DataFrame
+        batches = couch_obj.iter_data(
+            "la_inspection",
+            batch_size=config["batch_size"],
+            workers=config["workers"],
+        )
+        df = pd.concat(
+            [pd.DataFrame(batch) for batch in batches], ignore_index=True
+        )
+
+        # Initial records count
+        initial_records = len(df)
+
+        # Feature selection and filtering
+        df = cleaning.apply_partitioned(df, config["processes"])
+
+    if config["compact"]:
+        df = cleaning.compact(df, config["arrow_strings"], "LA Inspections")
 
     # Logging
     logger.info(f"Records before cleaning - {initial_records}")
@@ -254,7 +529,8 @@ def preprocess_la_inspection(start):
     )
     logger.info("LA Inspections JSON Preprocess Successful.")
 
-    return df
+    MEMO.store("preprocess_la_inspection", key, df)
+    return df, key
 
 
 @op(
@@ -262,41 +538,238 @@ def preprocess_la_inspection(start):
         "nyc_restaurant_df": In(nyc_restaurant_df),
         "nyc_inspection_df": In(nyc_inspection_df),
         "la_inspection_df": In(la_inspection_df),
+        "nyc_restaurant_version": In(Optional[str]),
+        "nyc_inspection_version": In(Optional[str]),
+        "la_inspection_version": In(Optional[str]),
     },
-    out=Out(bool),
+    out=Out(dict),
+    config_schema={
+        "partition_by_year": Field(bool, default_value=False),
+        "sketches": Field(bool, default_value=False),
+        "sketch_epsilon": Field(float, default_value=0.001),
+        "sketch_delta": Field(float, default_value=0.01),
+        "hll_precision": Field(int, default_value=14),
+    },
+    required_resource_keys={"postgres"},
 )
-def loading_cleaned_data(nyc_restaurant_df, nyc_inspection_df, la_inspection_df):
+@instrumented
+def loading_cleaned_data(
+    context,
+    nyc_restaurant_df,
+    nyc_inspection_df,
+    la_inspection_df,
+    nyc_restaurant_version,
+    nyc_inspection_version,
+    la_inspection_version,
+):
     """
     Loads cleaned dataframes into PostgreSQL database.
 
+    Inspection tables whose source was ingested as a delta only have the rows of the delta
+    window replaced; otherwise tables are replaced as a whole. The summary tables charted by
+    run_analysis are then refreshed from the loaded tables.
+
+    Each table records the fingerprint of the DataFrame it was loaded from, and tables
+    whose DataFrame is unchanged are not loaded again. Summary tables are only refreshed
+    if a table changed, the monthly inspection summary only for the changed sources.
+
+    Tables are created from their managed schemas in CLEANED_TABLES: typed columns, an
+    identity key and the indexes the summaries and joins filter on. With partition_by_year
+    enabled the inspection tables are partitioned by year. A table's fingerprint covers its
+    layout, so a layout change reloads it.
+
+    With sketches enabled the names of each loaded table are also sketched per grade and
+    year (Space-Saving, Count-Min and HyperLogLog with the configured error bounds) into
+    the name_sketches table, for run_analysis' approximate top names. A delta load only
+    rebuilds the sketches of the years in its window.
+
     Args:
+        context (dagster.OpExecutionContext): Op context holding the PostgresDB resource.
         nyc_restaurant_df (pandas.DataFrame): Cleaned NYC restaurant data.
         nyc_inspection_df (pandas.DataFrame): Cleaned NYC inspection data.
         la_inspection_df (pandas.DataFrame): Cleaned LA inspection data.
-\
+        nyc_restaurant_version (str): Fingerprint of the NYC restaurant data, or None.
+        nyc_inspection_version (str): Fingerprint of the NYC inspection data, or None.
+        la_inspection_version (str): Fingerprint of the LA inspection data, or None.
+
     Returns:
-        bool: True if data loading is successful, False otherwise.
+        dict: Table name to the fingerprint of its loaded rows, None if unknown or the
+            load failed.
     """
-    result = True
+    config = context.op_config
+    sketching = {}
+    if config["sketches"]:
+        sketching = {
+            "epsilon": config["sketch_epsilon"],
+            "delta": config["sketch_delta"],
+            "precision": config["hll_precision"],
+        }
+
+    versions = {}
     try:
 
-        # Connect to PostgresDB
-        postgres_obj = PostgresDB()
+        # Borrow a pooled PostgresDB connection
+        postgres_obj = context.resources.postgres
+
+        # Load nyc_restraunts_cleaned, nyc_inspection_cleaned and la_inspection_cleaned
+        windows = {}
+        loaded = {}
+        applied = {}
+        for df, table_name, source, version in [
+            (
+                nyc_restaurant_df,
+                "nyc_restraunts_cleaned",
+                "nyc_restaurants",
+                nyc_restaurant_version,
+            ),
+            (
+                nyc_inspection_df,
+                "nyc_inspection_cleaned",
+                "nyc_inspection",
+                nyc_inspection_version,
+            ),
+            (
+                la_inspection_df,
+                "la_inspection_cleaned",
+                "la_inspection",
+                la_inspection_version,
+            ),
+        ]:
+            schema = CLEANED_TABLES[table_name]
+            if config["partition_by_year"] and source in INSPECTION_TABLES:
+                schema = schema.partition_on("year")
+            version = fingerprint(version, vars(schema), sketching)
+
+            recorded = postgres_obj.read_fingerprint(table_name)
+            if version is not None and recorded == version:
+                # The table already holds these rows
+                versions[table_name] = version
+                logger.info(f"PostgresDB: {table_name} Unchanged, Load Skipped.")
+                continue
+
+            window = mark = None
+            if source in INSPECTION_TABLES:
+                window = windows[source] = delta_window(postgres_obj, source)
+                # The ingested watermark these rows were cleaned up to
+                mark = (postgres_obj.read_state(source) or {}).get("high_water_mark")
+            if window is None:
+                success = postgres_obj.load_data(
+                    df, table_name, staging=True, schema=schema
+                )
+            else:
+                # Replace the rows of the delta window only, in one transaction
+                success = postgres_obj.replace_rows(
+                    df, table_name, "inspection_date >= %s", (window,), schema
+                )
+            if success and sketching:
+                refresh_name_sketches(
+                    postgres_obj, source, table_name, df, window, **sketching
+                )
+            loaded[table_name] = version if success else None
+            if success and mark is not None:
+                applied[table_name] = (mark, window)
+
+        # Refresh the grade, borough, year, quarter and type rollups
+        if loaded:
+            refresh_summary_tables(postgres_obj, windows)
+
+        # Record the loaded fingerprints once the summaries match the tables
+        for table_name, version in loaded.items():
+            postgres_obj.write_fingerprint(table_name, version)
+        for table_name, (mark, window) in applied.items():
+            postgres_obj.write_state(
+                table_name, mark, window, "full" if window is None else "delta"
+            )
+        versions.update(loaded)
+
+    except Exception as e:
+        logger.error(f"Error : {e}")
+        versions = {}
+
+    return versions
 
-        # Load nyc_restraunts_cleaned to PostgresDB
-        postgres_obj.load_data(nyc_restaurant_df, "nyc_restraunts_cleaned")
 
-        # Load nyc_inspection_cleaned to PostgresDB
-        postgres_obj.load_data(nyc_inspection_df, "nyc_inspection_cleaned")
+@op(
+    config_schema={"borough_key": Field(bool, default_value=False)},
+    ins={"versions": In(dict)},
+    out=Out(dict),
+    required_resource_keys={"postgres"},
+)
+@instrumented
+def joining_open_inspections(context, versions):
+    """
+    Joins open restaurants with their NYC inspections on normalized restaurant keys.
 
-        # Load la_inspection_cleaned to PostgresDB
-        postgres_obj.load_data(la_inspection_df, "la_inspection_cleaned")
+    Restaurant names are normalized and mapped to integer keys by the NameIndex persisted
+    in PostgresDB. Both cleaned tables are read as per-name counts, aggregated per key and
+    joined on the keys, optionally co-keyed with the borough, into the
+    nyc_open_inspection_summary table charted by run_analysis. The join cardinality and
+    memory use are logged and attached to the output. The join is skipped if neither
+    cleaned table nor the join config and code changed since it last ran.
+
+    Args:
+        context (dagster.OpExecutionContext): Op context holding the join config.
+        versions (dict): Table name to the fingerprint of its loaded rows.
+
+    Returns:
+        dict: The table fingerprints, plus the fingerprint of nyc_open_inspection_summary,
+            None if the join failed.
+    """
+    versions = dict(versions)
+    key = fingerprint(
+        "joining_open_inspections",
+        versions.get("nyc_restraunts_cleaned"),
+        versions.get("nyc_inspection_cleaned"),
+        context.op_config,
+        JOIN_CODE_VERSION,
+    )
+    versions["nyc_open_inspection_summary"] = None
+    try:
 
-        # Close connection from PostgresDB
-        postgres_obj.close_connection()
+        # Borrow a pooled PostgresDB connection
+        postgres_obj = context.resources.postgres
+
+        if key is not None and postgres_obj.read_fingerprint(JOIN_TABLE) == key:
+            # The summary already holds this join
+            logger.info(f"PostgresDB: {JOIN_TABLE} Unchanged, Join Skipped.")
+            versions[JOIN_TABLE] = key
+            return versions
+
+        # Per-name counts of both sides, aggregated in PostgresDB
+        restaurants = postgres_obj.fetch_query(RESTAURANT_COUNTS)
+        inspections = postgres_obj.fetch_query(INSPECTION_COUNTS)
+
+        # Join on integer restaurant keys and persist the new keys
+        index = NameIndex.load(postgres_obj)
+        summary, stats = join_open_inspections(
+            restaurants, inspections, index, context.op_config["borough_key"]
+        )
+        stats["new_keys"] = index.save(postgres_obj)
+        # Without persisted keys the next run could key the same names differently
+        if stats["new_keys"] is not None and postgres_obj.load_data(
+            summary, JOIN_TABLE, staging=True
+        ):
+            postgres_obj.write_fingerprint(JOIN_TABLE, key)
+            versions[JOIN_TABLE] = key
+
+        # Logging
+        logger.info(
+            f"Names - {stats['restaurant_names']} Restaurant, "
+            f"{stats['inspection_names']} Inspection"
+        )
+        logger.info(
+            f"Keys - {stats['restaurant_keys']} Restaurant, "
+            f"{stats['inspection_keys']} Inspection, {stats['matched_keys']} Matched, "
+            f"{stats['new_keys']} New"
+        )
+        logger.info(
+            f"Join Cardinality - {stats['pair_rows']} Key Pairs For "
+            f"{stats['joined_rows']} Joined Rows"
+        )
+        logger.info(f"Join Memory - {stats['memory_mb']} MB")
+        context.add_output_metadata(stats)
 
     except Exception as e:
         logger.error(f"Error : {e}")
-        result = False
 
-    return result
+    return versions
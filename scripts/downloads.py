@@ -0,0 +1,444 @@
+# Python imports
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import aiohttp
+from dagster import get_dagster_logger
+
+# Custom imports
+import metrics
+
+# Setting up logger
+logger = get_dagster_logger()
+
+
+async def download(session, url, path, retries=3, chunk_size=1 << 16, cached=None):
+    """
+    Downloads a URL into a local spool file, resuming interrupted transfers.
+
+    The body is stored exactly as sent, gzip transfer encoding included, so byte offsets
+    stay valid for HTTP Range requests. A partial download is kept in `<path>.part` and
+    resumed with a Range request guarded by If-Range, so the server sends the whole body
+    again if it changed in between. A `<path>.json` sidecar records the URL, validators
+    and content encoding for `open_spool`. With a cached copy the request is conditional
+    on its ETag and Last-Modified validators, and nothing is downloaded if it is current.
+
+    Args:
+        session (aiohttp.ClientSession): The shared HTTP client session.
+        url (str): The URL to download.
+        path (str): The spool file path.
+        retries (int): Number of retries after a failed or interrupted transfer.
+        chunk_size (int): Number of bytes written at a time.
+        cached (dict, optional): The DownloadCache entry of the URL, holding the etag and
+            last_modified validators of the cached copy.
+
+    Returns:
+        int: The number of bytes received over the network, or None if the server
+            answered 304 Not Modified to the conditional request.
+
+    Raises:
+        aiohttp.ClientError: If the download still fails after all retries.
+        asyncio.TimeoutError: If the download still times out after all retries.
+    """
+    part_path = f"{path}.part"
+    received = 0
+
+    attempt = 0
+    while True:
+        meta = _read_meta(path)
+        headers = {"Accept-Encoding": "gzip"}
+        offset = 0
+        if os.path.exists(part_path) and meta.get("url") == url:
+            offset = os.path.getsize(part_path)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+        elif cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return None
+                if response.status == 206:
+                    mode = "ab"
+                elif response.status == 416 and offset:
+                    # The partial file no longer matches the body, start over without
+                    # a Range request within the same attempt
+                    os.remove(part_path)
+                    continue
+                else:
+                    response.raise_for_status()
+                    mode = "wb"
+                    meta = {
+                        "url": url,
+                        "encoding": response.headers.get("Content-Encoding", "identity"),
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                    _write_meta(path, meta)
+
+                with open(part_path, mode) as spool:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        spool.write(chunk)
+                        received += len(chunk)
+                        metrics.count("bytes_downloaded", len(chunk))
+
+            os.replace(part_path, path)
+            _write_meta(path, dict(meta, complete=True))
+            return received
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Client errors such as 404 will not go away by retrying
+            client_error = isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+            if attempt == retries or client_error:
+                raise
+            logger.warning(f"Download Of {url} Interrupted, Retrying: {e}")
+            await asyncio.sleep(2**attempt)
+            attempt += 1
+
+
+async def download_all(
+    urls, spool_dir, connections=8, retries=3, timeout=300, cache=None
+):
+    """
+    Downloads several URLs concurrently over one shared HTTP client session.
+
+    With a cache, a URL whose cached copy is still current according to a conditional
+    GET is not downloaded again, and new downloads are moved into the cache.
+
+    Args:
+        urls (dict): Source name to URL.
+        spool_dir (str): Directory holding the spool files, named after the sources.
+        connections (int): Maximum number of concurrent connections.
+        retries (int): Number of retries per source after a failed transfer.
+        timeout (int): Seconds without receiving data before a transfer is retried.
+        cache (DownloadCache, optional): The download cache.
+
+    Returns:
+        tuple: Source name to spool file path, or None if the download failed, and
+            source name to True if the cached copy was used.
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    paths = {name: os.path.join(spool_dir, name) for name in urls}
+    hits = {name: False for name in urls}
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=client_timeout, auto_decompress=False
+    ) as session:
+
+        async def _download(name):
+            url = urls[name]
+            cached = await asyncio.to_thread(cache.lookup, url) if cache else None
+
+            start = time.perf_counter()
+            received = await download(session, url, paths[name], retries, cached=cached)
+            elapsed = time.perf_counter() - start
+
+            if received is None:
+                paths[name], hits[name] = cache.hit(url), True
+                logger.info(f"Downloaded {name}: Not Modified, Cached Copy Used.")
+                return
+
+            if cache:
+                paths[name] = await asyncio.to_thread(cache.store, url, paths[name])
+            else:
+                await asyncio.to_thread(stamp_digest, paths[name])
+            logger.info(
+                f"Downloaded {name}: {received / 1e6:.1f} MB In {elapsed:.1f}s "
+                f"({received / 1e6 / max(elapsed, 1e-9):.1f} MB/s)."
+            )
+
+        results = await asyncio.gather(
+            *(_download(name) for name in urls), return_exceptions=True
+        )
+
+    for name, result in zip(urls, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error While Downloading {name}: {result}")
+            paths[name] = None
+
+    if cache:
+        cache.evict(keep=[paths[name] for name in urls])
+        cache.save()
+
+    return paths, hits
+
+
+def fetch_all(urls, spool_dir, **options):
+    """
+    Runs `download_all` to completion from synchronous code.
+
+    Args:
+        urls (dict): Source name to URL.
+        spool_dir (str): Directory holding the spool files.
+        **options: Keyword arguments passed to `download_all`.
+
+    Returns:
+        tuple: Source name to spool file path, or None if the download failed, and
+            source name to True if the cached copy was used.
+    """
+    return asyncio.run(download_all(urls, spool_dir, **options))
+
+
+class DownloadCache:
+    """
+    A size-bounded, content-addressed on-disk cache of downloaded source exports.
+
+    Completed downloads are stored once per SHA-256 digest under `objects/`, with the
+    spool sidecar metadata next to them. `index.json` maps each URL to the digest, size
+    and validators of its latest copy. Copies are verified against their digest before
+    use, and the least recently used copies are evicted once the cache exceeds its size.
+
+    Attributes:
+        cache_dir (str): Directory holding the index and objects.
+        max_bytes (int): Size the cached objects are evicted down to.
+        index (dict): URL to cache entry.
+    """
+
+    def __init__(self, cache_dir="cache", max_bytes=10 << 30):
+        """
+        Initializes a new DownloadCache, reading its index if present.
+
+        Args:
+            cache_dir (str): Directory holding the index and objects.
+            max_bytes (int): Size the cached objects are evicted down to.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+
+        try:
+            with open(os.path.join(cache_dir, "index.json")) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def object_path(self, digest):
+        """
+        Returns the path of the cached object with a SHA-256 digest.
+        """
+        return os.path.join(self.cache_dir, "objects", digest)
+
+    def lookup(self, url):
+        """
+        Returns the cache entry of a URL if its object is present and intact.
+
+        An object that is missing or fails checksum verification is dropped together
+        with its entry, so the URL is downloaded unconditionally.
+
+        Args:
+            url (str): The URL.
+
+        Returns:
+            dict: The cache entry, or None.
+        """
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+
+        path = self.object_path(entry["sha256"])
+        if os.path.exists(path) and file_digest(path) == entry["sha256"]:
+            return entry
+
+        logger.warning(f"Cached Copy Of {url} Failed Verification, Dropping It.")
+        with self._lock:
+            self.index.pop(url, None)
+            self._remove(entry["sha256"])
+        return None
+
+    def hit(self, url):
+        """
+        Marks the cached copy of a URL as used and returns its object path.
+
+        Args:
+            url (str): The URL.
+
+        Returns:
+            str: The object path, readable with open_spool.
+        """
+        with self._lock:
+            entry = self.index[url]
+            entry["last_used"] = time.time()
+            return self.object_path(entry["sha256"])
+
+    def store(self, url, path):
+        """
+        Moves a completed spool file into the cache under its SHA-256 digest.
+
+        Args:
+            url (str): The URL the file was downloaded from.
+            path (str): The completed spool file.
+
+        Returns:
+            str: The object path, readable with open_spool.
+        """
+        meta = stamp_digest(path)
+        digest = meta["sha256"]
+        target = self.object_path(digest)
+
+        with self._lock:
+            if os.path.exists(target):
+                os.remove(path)
+                os.remove(f"{path}.json")
+            else:
+                os.replace(path, target)
+                os.replace(f"{path}.json", f"{target}.json")
+
+            # The previous copy of the URL is superseded
+            previous = self.index.get(url)
+            self.index[url] = {
+                "sha256": digest,
+                "size": os.path.getsize(target),
+                "etag": meta.get("etag"),
+                "last_modified": meta.get("last_modified"),
+                "last_used": time.time(),
+            }
+            if previous and previous["sha256"] != digest:
+                self._remove(previous["sha256"])
+        return target
+
+    def evict(self, keep=()):
+        """
+        Evicts the least recently used objects until the cache fits its size.
+
+        Args:
+            keep (iterable): Object paths in use, which are never evicted.
+        """
+        keep = {os.path.basename(path) for path in keep if path}
+        with self._lock:
+            sizes, last_used = {}, {}
+            for entry in self.index.values():
+                sizes[entry["sha256"]] = entry["size"]
+                last_used[entry["sha256"]] = max(
+                    last_used.get(entry["sha256"], 0), entry["last_used"]
+                )
+
+            total = sum(sizes.values())
+            for digest in sorted(last_used, key=last_used.get):
+                if total <= self.max_bytes:
+                    break
+                if digest in keep:
+                    continue
+                total -= sizes[digest]
+                self.index = {
+                    url: entry
+                    for url, entry in self.index.items()
+                    if entry["sha256"] != digest
+                }
+                self._remove(digest)
+                logger.info(
+                    f"Evicted Cached Download {digest[:12]} ({sizes[digest]} Bytes)."
+                )
+
+    def save(self):
+        """
+        Writes the index, replacing the previous one atomically.
+        """
+        path = os.path.join(self.cache_dir, "index.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _remove(self, digest):
+        """
+        Removes a cached object and its sidecar, if no URL still refers to it. Callers
+        hold the lock.
+        """
+        if any(entry["sha256"] == digest for entry in self.index.values()):
+            return
+        for path in (self.object_path(digest), f"{self.object_path(digest)}.json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    Returns the SHA-256 hex digest of a file, read in chunks.
+
+    Args:
+        path (str): The file path.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stamp_digest(path):
+    """
+    Records the SHA-256 digest of a completed spool file in its sidecar metadata.
+
+    Args:
+        path (str): The completed spool file.
+
+    Returns:
+        dict: The updated sidecar metadata.
+    """
+    meta = dict(_read_meta(path), sha256=file_digest(path))
+    _write_meta(path, meta)
+    return meta
+
+
+def spool_digest(path):
+    """
+    Returns the SHA-256 digest recorded for a spool file, or None if there is none.
+
+    Args:
+        path (str): The spool file path, or None if the source was not downloaded.
+
+    Returns:
+        str: The hex digest, or None.
+    """
+    return _read_meta(path).get("sha256") if path else None
+
+
+def open_spool(path):
+    """
+    Opens a completed spool file for reading, decoding gzip transfer encoding.
+
+    Args:
+        path (str): The spool file path.
+
+    Returns:
+        io.BufferedIOBase: A binary file object over the decoded body.
+    """
+    if _read_meta(path).get("encoding") == "gzip":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _read_meta(path):
+    """
+    Reads the sidecar metadata of a spool file, or an empty dict if there is none.
+    """
+    try:
+        with open(f"{path}.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path, meta):
+    """
+    Writes the sidecar metadata of a spool file.
+    """
+    with open(f"{path}.json", "w") as f:
+        json.dump(meta, f)
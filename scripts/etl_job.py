@@ -5,28 +5,54 @@ from dagster import job
 from data_ingestion import *
 from data_preprocessing import *
 from data_analysis import *
+from postgres_connector import postgres_resource
+from mongo_connector import mongo_resource
+from couch_connector import couch_resource
+from parquet_io_manager import parquet_io_manager
 
 
-@job
+# Pooled connections shared by all ops of a run process, and Parquet storage for the
+# cleaned DataFrames passed between ops
+@job(
+    resource_defs={
+        "postgres": postgres_resource,
+        "mongo": mongo_resource,
+        "couch": couch_resource,
+        "parquet_io_manager": parquet_io_manager,
+    }
+)
 def etl():
-    # Running Visualizations
+    # Download Source Exports Concurrently
+    spool = download_sources()
+
+    # Pre-processing NYC Restaurants JSON Data
+    nyc_restaurant, nyc_restaurant_version = preprocess_nyc_restaurant(
+        # Ingest NYC Restaurants JSON Data
+        ingest_nyc_restaurants(spool)
+    )
+    # Pre-processing NYC Inspection CSV Data
+    nyc_inspection, nyc_inspection_version = preprocess_nyc_inspection(
+        # Ingest NYC Inspection CSV Data
+        ingest_nyc_inspection(spool)
+    )
+    # Pre-processing LA Inspection JSON Data
+    la_inspection, la_inspection_version = preprocess_la_inspection(
+        # Ingest LA Inspection JSON Data
+        ingest_la_inspection(spool)
+    )
+
+    # Running Visualizations on the Summary Tables
     run_analysis(
-        # Loading Pre-processed Data into PostgresDB
-        loading_cleaned_data(
-            # Pre-processing NYC Restaurants JSON Data
-            preprocess_nyc_restaurant(
-                # Ingest NYC Restaurants JSON Data
-                ingest_nyc_restaurants()
-            ),
-            # Pre-processing NYC Inspection CSV Data
-            preprocess_nyc_inspection(
-                # Ingest NYC Inspection CSV Data
-                ingest_nyc_inspection()
-            ),
-            # Pre-processing LA Inspection JSON Data
-            preprocess_la_inspection(
-                # Ingest LA Inspection JSON Data
-                ingest_la_inspection()
-            ),
-        ),
+        # Joining Open Restaurants and Inspections on Restaurant Keys
+        joining_open_inspections(
+            # Loading Pre-processed Data and Summary Tables into PostgresDB
+            loading_cleaned_data(
+                nyc_restaurant,
+                nyc_inspection,
+                la_inspection,
+                nyc_restaurant_version,
+                nyc_inspection_version,
+                la_inspection_version,
+            )
+        )
     )
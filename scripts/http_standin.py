@@ -0,0 +1,190 @@
+# Python imports
+import argparse
+import email.utils
+import os
+import re
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandinHandler(SimpleHTTPRequestHandler):
+    """
+    A local stand-in for the Socrata export endpoints, serving fixture files.
+
+    Supports single HTTP Range requests with If-Range validation and conditional GETs with
+    If-None-Match or If-Modified-Since, serves `<file>.gz` with gzip content encoding when
+    the client accepts it, and can throttle and interrupt responses to exercise download
+    throughput and resume behaviour.
+
+    Attributes:
+        throttle (int): Maximum bytes per second per response, or None for no limit.
+        drop_after (int): Bytes sent before the first response for each file is cut off,
+            or None to never interrupt.
+    """
+
+    throttle = None
+    drop_after = None
+    _dropped = set()
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.translate_path(self.path.split("?", 1)[0])
+        if not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+
+        encoding = None
+        if "gzip" in self.headers.get("Accept-Encoding", "") and os.path.isfile(
+            f"{path}.gz"
+        ):
+            path, encoding = f"{path}.gz", "gzip"
+
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+        start, end = 0, size - 1
+
+        last_modified = self.date_time_string(int(stat.st_mtime))
+        if self._not_modified(etag, int(stat.st_mtime)):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return
+
+        byte_range = self._parse_range(size)
+        if_range = self.headers.get("If-Range")
+        if byte_range and (if_range is None or if_range == etag):
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        elif byte_range is False:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.end_headers()
+            return
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            self._send_body(f, end - start + 1, path)
+
+    def _not_modified(self, etag, mtime):
+        """
+        Returns True if If-None-Match or If-Modified-Since show the client's copy is current.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return mtime <= since
+        return False
+
+    def _parse_range(self, size):
+        """
+        Returns (start, end) for a satisfiable Range header, False if unsatisfiable, else None.
+        """
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if not match or match.group(1) == match.group(2) == "":
+            return None
+
+        if match.group(1) == "":
+            # Suffix range, the last N bytes
+            start, end = max(size - int(match.group(2)), 0), size - 1
+        else:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+
+        if start >= size or start > end:
+            return False
+        return start, end
+
+    def _send_body(self, f, length, path):
+        """
+        Copies `length` bytes of a file to the client, throttled and possibly cut off.
+        """
+        limit = length
+        with self._lock:
+            if self.drop_after is not None and path not in self._dropped:
+                self._dropped.add(path)
+                limit = min(length, self.drop_after)
+
+        sent = 0
+        started = time.perf_counter()
+        while sent < limit:
+            chunk = f.read(min(1 << 16, limit - sent))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if self.throttle:
+                ahead = sent / self.throttle - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        if sent < length:
+            # Simulate an interrupted transfer
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+
+def serve(directory, port=0, throttle=None, drop_after=None):
+    """
+    Starts a stand-in server in a background thread.
+
+    Args:
+        directory (str): Directory holding the fixture files.
+        port (int): Port to listen on, 0 for any free port.
+        throttle (int, optional): Maximum bytes per second per response.
+        drop_after (int, optional): Bytes sent before the first response per file is cut off.
+
+    Returns:
+        http.server.ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    handler = type(
+        "ConfiguredStandinHandler",
+        (StandinHandler,),
+        {"throttle": throttle, "drop_after": drop_after, "_dropped": set()},
+    )
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), partial(handler, directory=directory)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fixture files like Socrata.")
+    parser.add_argument("directory", help="Directory holding the fixture files.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--throttle", type=int, default=None, help="Bytes per second.")
+    parser.add_argument(
+        "--drop-after", type=int, default=None, help="Cut first responses after N bytes."
+    )
+    args = parser.parse_args()
+
+    server = serve(args.directory, args.port, args.throttle, args.drop_after)
+    print(f"Serving {args.directory} on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
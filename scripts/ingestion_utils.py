@@ -0,0 +1,351 @@
+# Python imports
+import codecs
+import collections
+import json
+import multiprocessing
+import queue
+import threading
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Sentinel marking the end of a prefetched stream
+_DONE = object()
+
+
+def batched(iterable, size):
+    """
+    Splits an iterable into lists of at most `size` items.
+
+    Args:
+        iterable (iterable): The items to split.
+        size (int): Maximum number of items per list.
+
+    Yields:
+        list: Consecutive batches of items.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def soql_pages(url, where, page_size, read, select=None, order=":id"):
+    """
+    Reads the rows of a Socrata resource endpoint matching a SoQL predicate, page by page.
+
+    Args:
+        url (str): The resource endpoint, e.g. https://<domain>/resource/<id>.json.
+        where (str): The SoQL $where predicate.
+        page_size (int): Number of rows per request.
+        read (callable): Reads a page URL into a sized object such as a list or DataFrame.
+        select (str, optional): The SoQL $select clause, e.g. ":*, *" for system fields.
+        order (str): The SoQL $order clause, which keeps paging stable.
+
+    Yields:
+        object: The non-empty pages returned by `read`.
+    """
+    offset = 0
+    while True:
+        params = {"$where": where, "$order": order, "$limit": page_size, "$offset": offset}
+        if select:
+            params["$select"] = select
+
+        page = read(f"{url}?{urllib.parse.urlencode(params)}")
+        if len(page):
+            yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+def bounded_map(executor, fn, iterable, depth=2):
+    """
+    Maps a function over an iterable on an executor, keeping at most `depth` calls in flight.
+
+    Unlike Executor.map, the iterable is consumed lazily, so a stream of chunks is never
+    submitted all at once.
+
+    Args:
+        executor (concurrent.futures.Executor): The executor running the calls.
+        fn (callable): The function to apply to each item.
+        iterable (iterable): The items.
+        depth (int): Maximum number of submitted calls not yet yielded.
+
+    Yields:
+        object: The results, in the order of the items.
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max(depth, 1):
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def process_pool(processes, preload):
+    """
+    Returns a process pool forked from a clean fork server rather than the op process, so
+    workers inherit no threads or database connections. The server preloads the given
+    modules once, so later pools start without importing them again.
+
+    Args:
+        processes (int): Number of worker processes.
+        preload (list): Names of the modules the workers run functions of.
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: The pool.
+    """
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(preload)
+    return ProcessPoolExecutor(processes, mp_context=context)
+
+
+def prefetch(iterable, depth=2):
+    """
+    Iterates over an iterable in a background thread, keeping at most `depth` items buffered.
+
+    Lets the producer (download and parse) run ahead of the consumer (database load)
+    while keeping memory bounded to a few items.
+
+    Args:
+        iterable (iterable): The iterable to consume in the background.
+        depth (int): Maximum number of items buffered ahead of the consumer.
+
+    Yields:
+        object: Items of the iterable, in order.
+
+    Raises:
+        Exception: Any exception raised by the producer is re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def _produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                buffer.put(item)
+            buffer.put(_DONE)
+        except BaseException as e:
+            buffer.put(e)
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Unblock the producer if the consumer stops early
+        stop.set()
+        while not buffer.empty():
+            buffer.get_nowait()
+
+
+def interleave(iterables, depth=2):
+    """
+    Iterates over several iterables concurrently, one background thread each.
+
+    Items are yielded in the order they become available, with at most `depth` items
+    buffered per iterable.
+
+    Args:
+        iterables (list): The iterables to consume in parallel.
+        depth (int): Maximum number of items buffered per iterable.
+
+    Yields:
+        object: Items of all iterables, in completion order.
+
+    Raises:
+        Exception: Any exception raised by a producer is re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=max(depth, 1) * max(len(iterables), 1))
+    stop = threading.Event()
+
+    def _produce(iterable):
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                buffer.put(item)
+        except BaseException as e:
+            buffer.put(e)
+        finally:
+            buffer.put(_DONE)
+
+    for iterable in iterables:
+        threading.Thread(target=_produce, args=(iterable,), daemon=True).start()
+
+    try:
+        remaining = len(iterables)
+        while remaining:
+            item = buffer.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Unblock the producers if the consumer stops early
+        stop.set()
+        while not buffer.empty():
+            buffer.get_nowait()
+
+
+class SocrataRows:
+    """
+    An incremental reader for Socrata rows.json payloads.
+
+    The payload is read from a binary stream in chunks. The top-level `meta` object is
+    parsed first, then the entries of the `data` array are decoded one at a time, so only
+    the current chunk and row are held in memory. Connectors read it like the parsed
+    payload: `rows["meta"]` is the metadata and `rows["data"]` an iterator over the rows.
+
+    Attributes:
+        meta (dict): The parsed `meta` object.
+        bytes_read (int): Number of bytes read from the stream so far.
+    """
+
+    def __init__(self, stream, chunk_size=1 << 16):
+        """
+        Initializes a new SocrataRows reader and parses the payload up to the `data` array.
+
+        Args:
+            stream (io.RawIOBase): A binary stream such as an HTTP response.
+            chunk_size (int): Number of bytes read from the stream at a time.
+
+        Raises:
+            json.JSONDecodeError: If the payload is not valid JSON.
+            ValueError: If `meta` does not precede `data` in the payload.
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._rows_started = False
+        self.bytes_read = 0
+        self.meta = None
+
+        self._expect("{")
+        while True:
+            key = self._decode()
+            self._expect(":")
+            if key == "data":
+                break
+            value = self._decode()
+            if key == "meta":
+                self.meta = value
+            self._expect(",")
+
+        if self.meta is None:
+            raise ValueError("Socrata payload has no meta object before data.")
+        self._expect("[")
+
+    def __getitem__(self, key):
+        if key == "meta":
+            return self.meta
+        if key == "data":
+            return self.rows()
+        raise KeyError(key)
+
+    def rows(self):
+        """
+        Iterates over the rows of the `data` array. Can only be consumed once.
+
+        Yields:
+            list: The values of one row.
+        """
+        if self._rows_started:
+            raise RuntimeError("Socrata rows can only be iterated once.")
+        self._rows_started = True
+
+        if self._peek() == "]":
+            return
+        while True:
+            yield self._decode()
+            token = self._next_token()
+            if token == "]":
+                return
+            if token != ",":
+                raise json.JSONDecodeError("Expecting ','", self._buffer, self._pos - 1)
+
+    def to_dict(self):
+        """
+        Materializes the payload as the dictionary json.loads would return.
+
+        Returns:
+            dict: The payload with `meta` and the list of `data` rows.
+        """
+        return {"meta": self.meta, "data": list(self.rows())}
+
+    def _fill(self):
+        """
+        Reads the next chunk from the stream, returning False at the end of the stream.
+        """
+        if self._eof:
+            return False
+
+        # Drop the consumed part of the buffer
+        if self._pos:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+
+        chunk = self._stream.read(self._chunk_size)
+        self.bytes_read += len(chunk)
+        self._eof = not chunk
+        self._buffer += self._decoder.decode(chunk, final=self._eof)
+        return not self._eof
+
+    def _peek(self):
+        """
+        Skips whitespace and returns the next character without consuming it.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise json.JSONDecodeError("Unexpected end of data", self._buffer, self._pos)
+
+    def _next_token(self):
+        """
+        Consumes and returns the next non-whitespace character.
+        """
+        char = self._peek()
+        self._pos += 1
+        return char
+
+    def _expect(self, char):
+        """
+        Consumes the next non-whitespace character, which must be `char`.
+        """
+        if self._next_token() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._buffer, self._pos - 1)
+
+    def _decode(self):
+        """
+        Decodes the next JSON value, reading more chunks until it is complete.
+
+        Only strings, objects and arrays are decoded here, so a value cut off at the end of
+        the buffer always fails to decode rather than decoding partially.
+        """
+        self._peek()
+        while True:
+            try:
+                value, self._pos = self._json.raw_decode(self._buffer, self._pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
@@ -0,0 +1,139 @@
+# Python imports
+import glob
+import hashlib
+import inspect
+import json
+import os
+from dagster import get_dagster_logger
+
+# Custom imports
+from parquet_io_manager import read_parquet, write_parquet
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Directory of the memoized op outputs
+MEMO_DIR = os.path.join("storage", "memo")
+
+
+def fingerprint(*parts):
+    """
+    Returns a fingerprint of JSON-serializable parts, such as input fingerprints and config.
+
+    Args:
+        *parts: The values identifying an input or output. None makes the fingerprint None.
+
+    Returns:
+        str: A SHA-256 hex digest, or None if any part is None.
+    """
+    if any(part is None for part in parts):
+        return None
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def code_version(*modules):
+    """
+    Returns a fingerprint of the source code of modules, so code changes invalidate memos.
+
+    Args:
+        *modules (module): The modules an op's output depends on.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    return fingerprint(*(inspect.getsource(module) for module in modules))
+
+
+class MemoStore:
+    """
+    Keeps the latest output of each op, keyed by the fingerprint it was made from.
+
+    DataFrame outputs are stored as <base_dir>/<step>/<key>.parquet. Ops whose output is a
+    side effect, such as written files, record their fingerprint as <key>.json instead.
+    Storing a new output of a step removes its previous one, so the store holds one output
+    per step.
+
+    Attributes:
+        base_dir (str): Directory holding the outputs, one sub-directory per step.
+    """
+
+    def __init__(self, base_dir=MEMO_DIR):
+        """
+        Initializes a new MemoStore.
+
+        Args:
+            base_dir (str): Directory holding the outputs, one sub-directory per step.
+        """
+        self.base_dir = base_dir
+
+    def _path(self, step, key, extension="parquet"):
+        """
+        Returns the file path of a memoized output.
+        """
+        return os.path.join(self.base_dir, step, f"{key}.{extension}")
+
+    def _clear(self, step, extension):
+        """
+        Removes the memoized outputs of a step.
+        """
+        for path in glob.glob(os.path.join(self.base_dir, step, f"*.{extension}")):
+            os.remove(path)
+
+    def load(self, step, key):
+        """
+        Returns the memoized output of a step for a fingerprint, if there is one.
+
+        Args:
+            step (str): The op name.
+            key (str): The fingerprint, or None to never match.
+
+        Returns:
+            pandas.DataFrame: The memoized output, or None.
+        """
+        if key is None or not os.path.exists(self._path(step, key)):
+            return None
+        logger.info(f"{step}: Inputs Unchanged, Memoized Output {key[:12]} Reused.")
+        return read_parquet(self._path(step, key))
+
+    def store(self, step, key, df):
+        """
+        Memoizes the output of a step, replacing its previous output.
+
+        Args:
+            step (str): The op name.
+            key (str): The fingerprint, or None to not memoize.
+            df (pandas.DataFrame): The output.
+        """
+        if key is None:
+            return
+        self._clear(step, "parquet")
+        write_parquet(df, self._path(step, key))
+
+    def recorded(self, step, key):
+        """
+        Checks whether a step last ran for a fingerprint.
+
+        Args:
+            step (str): The op name.
+            key (str): The fingerprint, or None to never match.
+
+        Returns:
+            bool: True if the fingerprint is recorded.
+        """
+        return key is not None and os.path.exists(self._path(step, key, "json"))
+
+    def record(self, step, key):
+        """
+        Records the fingerprint a step ran for, replacing the previous one.
+
+        Args:
+            step (str): The op name.
+            key (str): The fingerprint, or None to not record.
+        """
+        if key is None:
+            return
+        self._clear(step, "json")
+        os.makedirs(os.path.join(self.base_dir, step), exist_ok=True)
+        with open(self._path(step, key, "json"), "w") as f:
+            json.dump({"step": step, "fingerprint": key}, f)
@@ -0,0 +1,277 @@
+# Python imports
+import csv
+import datetime
+import functools
+import json
+import os
+import resource
+import threading
+import time
+import pandas as pd
+from dagster import AssetMaterialization, get_dagster_logger
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Directory of the per-stage metrics files
+METRICS_DIR = os.path.join("storage", "metrics")
+
+# Process-wide counters, incremented by the downloads and the database connectors
+COUNTERS = (
+    "bytes_downloaded",
+    "rows_read",
+    "rows_written",
+    "postgres_round_trips",
+    "mongo_round_trips",
+    "couch_round_trips",
+)
+
+# Columns of a stage's metrics row, in file order
+FIELDS = [
+    "run_id",
+    "stage",
+    "status",
+    "started_at",
+    "wall_s",
+    "cpu_s",
+    "peak_rss_mb",
+    "rows_in",
+    "rows_out",
+    "rows_in_per_s",
+    "rows_out_per_s",
+    "bytes_downloaded",
+    "postgres_round_trips",
+    "mongo_round_trips",
+    "couch_round_trips",
+]
+
+_counters = dict.fromkeys(COUNTERS, 0)
+_counters_lock = threading.Lock()
+_files_lock = threading.Lock()
+
+
+def count(name, n=1):
+    """
+    Adds to a process-wide counter.
+
+    Counters are shared by every thread of the process, such as the download tasks and the
+    connectors' worker threads, and each stage records how much they grew while it ran.
+
+    Args:
+        name (str): The counter, one of COUNTERS.
+        n (int): The amount to add.
+    """
+    with _counters_lock:
+        _counters[name] += n
+
+
+def counters():
+    """
+    Returns a snapshot of the process-wide counters.
+    """
+    with _counters_lock:
+        return dict(_counters)
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident set size of the process where the kernel supports it
+    (Linux), so the next reading is the peak of the current stage only.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    """
+    Returns the peak resident set size of the process in MB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is the peak over the process lifetime, in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _cpu_seconds():
+    """
+    Returns the user and system CPU time of the process and its finished worker processes.
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _rows(value):
+    """
+    Counts the DataFrame rows of an op input or output, tuples of outputs included.
+    """
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_rows(item) for item in value)
+    return 0
+
+
+class Stage:
+    """
+    Measures the resources one pipeline stage uses, from start to stop.
+
+    Rows in are the rows of the stage's DataFrame inputs plus the rows it read from the
+    databases, and rows out the rows of its DataFrame outputs plus the rows it wrote to the
+    databases. Round trips and downloaded bytes are the growth of the process-wide counters.
+
+    Attributes:
+        name (str): The stage name, e.g. the op name.
+        rows_in (int): Rows passed in as DataFrames.
+        rows_out (int): Rows passed out as DataFrames.
+    """
+
+    def __init__(self, name):
+        """
+        Initializes a new Stage.
+
+        Args:
+            name (str): The stage name, e.g. the op name.
+        """
+        self.name = name
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def start(self):
+        """
+        Starts measuring.
+        """
+        _reset_peak_rss()
+        self._started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._counters = counters()
+        self._cpu = _cpu_seconds()
+        self._wall = time.perf_counter()
+
+    def stop(self, run_id=None, status="success"):
+        """
+        Stops measuring and returns the metrics of the stage.
+
+        Args:
+            run_id (str, optional): The Dagster run the stage belongs to.
+            status (str): "success", or "failed" if the stage raised.
+
+        Returns:
+            dict: The metrics row, keyed by FIELDS.
+        """
+        wall = time.perf_counter() - self._wall
+        cpu = _cpu_seconds() - self._cpu
+        grown = {
+            name: value - self._counters[name] for name, value in counters().items()
+        }
+        rows_in = self.rows_in + grown["rows_read"]
+        rows_out = self.rows_out + grown["rows_written"]
+
+        return {
+            "run_id": run_id,
+            "stage": self.name,
+            "status": status,
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "rows_in_per_s": round(rows_in / max(wall, 1e-9), 1),
+            "rows_out_per_s": round(rows_out / max(wall, 1e-9), 1),
+            "bytes_downloaded": grown["bytes_downloaded"],
+            "postgres_round_trips": grown["postgres_round_trips"],
+            "mongo_round_trips": grown["mongo_round_trips"],
+            "couch_round_trips": grown["couch_round_trips"],
+        }
+
+
+def write_metrics(row, metrics_dir=METRICS_DIR):
+    """
+    Appends a stage's metrics to stages.jsonl and stages.csv, one row per stage and run.
+
+    Args:
+        row (dict): The metrics row, keyed by FIELDS.
+        metrics_dir (str): Directory holding the metrics files.
+    """
+    os.makedirs(metrics_dir, exist_ok=True)
+    csv_path = os.path.join(metrics_dir, "stages.csv")
+
+    with _files_lock:
+        with open(os.path.join(metrics_dir, "stages.jsonl"), "a") as f:
+            f.write(json.dumps(row) + "\n")
+
+        new = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        with open(csv_path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            if new:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+def emit(context, row):
+    """
+    Reports a stage's metrics as a Dagster AssetMaterialization and in the metrics files.
+
+    Args:
+        context (dagster.OpExecutionContext): The context of the measured op.
+        row (dict): The metrics row, keyed by FIELDS.
+    """
+    context.log_event(
+        AssetMaterialization(
+            asset_key=["pipeline_metrics", row["stage"]],
+            description=f"Performance of {row['stage']}.",
+            metadata={
+                key: value
+                for key, value in row.items()
+                if key not in ("run_id", "stage")
+            },
+        )
+    )
+    try:
+        write_metrics(row)
+    except OSError as e:
+        logger.error(f"Error While Writing Metrics Of {row['stage']}: {e}")
+
+    logger.info(
+        f"{row['stage']}: {row['wall_s']}s Wall, {row['cpu_s']}s CPU, "
+        f"{row['peak_rss_mb']} MB Peak RSS, {row['rows_in']} Rows In, "
+        f"{row['rows_out']} Rows Out."
+    )
+
+
+def instrumented(fn):
+    """
+    Measures every call of an op's compute function as a Stage named after the function.
+
+    Apply below @op. The metrics are emitted once the function returns or raises.
+
+    Args:
+        fn (function): The compute function, taking the op context first.
+
+    Returns:
+        function: The measured compute function.
+    """
+
+    @functools.wraps(fn)
+    def _measured(context, *args, **kwargs):
+        stage = Stage(fn.__name__)
+        stage.rows_in = _rows(args) + _rows(tuple(kwargs.values()))
+        stage.start()
+
+        status = "failed"
+        try:
+            result = fn(context, *args, **kwargs)
+            stage.rows_out = _rows(result)
+            status = "success"
+            return result
+        finally:
+            emit(context, stage.stop(context.run_id, status))
+
+    return _measured
@@ -0,0 +1,80 @@
+# Python imports
+import argparse
+import os
+import pandas as pd
+
+# Custom imports
+from metrics import METRICS_DIR
+
+COLUMNS = [
+    "wall_s",
+    "cpu_s",
+    "peak_rss_mb",
+    "rows_in_per_s",
+    "rows_out_per_s",
+    "postgres_round_trips",
+    "mongo_round_trips",
+    "couch_round_trips",
+]
+
+
+def load_runs(path):
+    """
+    Reads the stage metrics, one row per stage and run, ordered by run start.
+    """
+    df = pd.read_csv(path, parse_dates=["started_at"])
+    started = df.groupby("run_id")["started_at"].transform("min")
+    return df.assign(run_started=started).sort_values(["run_started", "started_at"])
+
+
+def compare_runs(df, baseline_runs=5, threshold=0.2, min_seconds=1.0):
+    """
+    Compares the stages of the latest run with their median over the previous runs.
+
+    Args:
+        df (pandas.DataFrame): The stage metrics, as read by load_runs.
+        baseline_runs (int): Number of previous runs the baseline is the median of.
+        threshold (float): Relative wall time growth flagged as a regression.
+        min_seconds (float): Wall time growth below which nothing is flagged.
+
+    Returns:
+        pandas.DataFrame: The latest run's stages, slowest first, with their share of
+            the run's wall time, baseline wall time, change and regression flag.
+    """
+    runs = df["run_id"].drop_duplicates().tolist()
+    latest = df[df["run_id"] == runs[-1]].set_index("stage")
+    previous = df[df["run_id"].isin(runs[-baseline_runs - 1 : -1])]
+    baseline = previous.groupby("stage")["wall_s"].median()
+
+    report = latest[COLUMNS].copy()
+    share = report["wall_s"] / report["wall_s"].sum() * 100
+    report.insert(1, "share%", share.round(1))
+    report["baseline_wall_s"] = baseline.reindex(report.index)
+    growth = report["wall_s"] - report["baseline_wall_s"]
+    report["change%"] = (growth / report["baseline_wall_s"] * 100).round(1)
+    report["regression"] = (growth > min_seconds) & (
+        growth > threshold * report["baseline_wall_s"]
+    )
+    return report.sort_values("wall_s", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the latest pipeline run's stage metrics with earlier runs."
+    )
+    parser.add_argument("--path", default=os.path.join(METRICS_DIR, "stages.csv"))
+    parser.add_argument("--baseline-runs", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    df = load_runs(args.path)
+    report = compare_runs(df, args.baseline_runs, args.threshold, args.min_seconds)
+
+    print(f"run {df['run_id'].iloc[-1]}")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(report.to_string())
+    dominant, share = report.index[0], report["share%"].iloc[0]
+    print(f"dominant stage: {dominant} ({share}% of wall time)")
+    regressions = report.index[report["regression"]].tolist()
+    print(f"regressions: {', '.join(regressions) if regressions else 'none'}")
@@ -1,11 +1,79 @@
 # Python imports
+import threading
 import pymongo
 import pymongo.errors
-from dagster import get_dagster_logger
+from pymongo import monitoring
+from dagster import Field, get_dagster_logger, resource
+
+# Custom imports
+import metrics
+from ingestion_utils import SocrataRows, batched
 
 # Setting up logger
 logger = get_dagster_logger()
 
+# Process-wide MongoDB clients, one connection pool per server URI and pool sizing
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class CountingListener(monitoring.CommandListener):
+    """
+    Counts the commands a MongoClient sends, and the documents they read and write.
+
+    Every command is a round trip; documents read are those of find, aggregate and getMore
+    batches, and documents written the inserted, updated and upserted counts of writes.
+    """
+
+    def started(self, event):
+        metrics.count("mongo_round_trips")
+
+    def succeeded(self, event):
+        reply = event.reply
+        cursor = reply.get("cursor")
+        if cursor is not None:
+            batch = cursor.get("firstBatch", cursor.get("nextBatch", []))
+            metrics.count("rows_read", len(batch))
+        elif event.command_name in ("insert", "update"):
+            metrics.count("rows_written", reply.get("n", 0))
+
+    def failed(self, event):
+        pass
+
+
+def get_client(
+    uri, max_pool_size=10, min_pool_size=0, max_idle_ms=300000, timeout_ms=5000
+):
+    """
+    Returns the process-wide MongoClient for a server URI, creating it once.
+
+    A MongoClient is thread safe and keeps its own connection pool and server monitor, so
+    every MongoDB instance in the process shares one client instead of opening a new pool
+    and authenticating again. Its commands are counted in the stage metrics.
+
+    Args:
+        uri (str): The MongoDB connection string.
+        max_pool_size (int): Maximum number of pooled connections.
+        min_pool_size (int): Number of connections kept open while idle.
+        max_idle_ms (int): Milliseconds after which an idle pooled connection is closed.
+        timeout_ms (int): Milliseconds to wait for a reachable server before failing.
+
+    Returns:
+        pymongo.MongoClient: The shared client.
+    """
+    key = (uri, max_pool_size, min_pool_size, max_idle_ms, timeout_ms)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = pymongo.MongoClient(
+                uri,
+                maxPoolSize=max_pool_size,
+                minPoolSize=min_pool_size,
+                maxIdleTimeMS=max_idle_ms,
+                serverSelectionTimeoutMS=timeout_ms,
+                event_listeners=[CountingListener()],
+            )
+        return _clients[key]
+
 
 class MongoDB:
     """
@@ -17,13 +85,24 @@ class MongoDB:
         db (str): The name of the MongoDB database.
         uname (str): The username for authentication.
         pwd (str): The password for authentication.
-        client (pymongo.MongoClient): The MongoDB client connection object.
+        client (pymongo.MongoClient): The shared MongoDB client and its connection pool.
         db (pymongo.database.Database): The MongoDB database object.
     """
 
-    def __init__(self, host="localhost", port=27017, db="dap", uname="dap", pwd="dap"):
+    def __init__(
+        self,
+        host="localhost",
+        port=27017,
+        db="dap",
+        uname="dap",
+        pwd="dap",
+        max_pool_size=10,
+        min_pool_size=0,
+        max_idle_ms=300000,
+        timeout_ms=5000,
+    ):
         """
-        Initializes a new MongoDB instance and establishes a connection to the MongoDB server.
+        Initializes a new MongoDB instance on the process-wide client of the MongoDB server.
 
         Args:
             host (str): The hostname or IP address of the MongoDB server.
@@ -31,26 +110,50 @@ class MongoDB:
             db (str): The name of the MongoDB database.
             uname (str): The username for authentication.
             pwd (str): The password for authentication.
+            max_pool_size (int): Maximum number of pooled connections.
+            min_pool_size (int): Number of connections kept open while idle.
+            max_idle_ms (int): Milliseconds after which an idle pooled connection is closed.
+            timeout_ms (int): Milliseconds to wait for a reachable server before failing.
         """
         self.client = None
         self.db = None
 
         try:
-            # Establish connection to the MongoDB server
-            self.client = pymongo.MongoClient(f"mongodb://{uname}:{pwd}@{host}:{port}")
+            # Get the shared client of the MongoDB server
+            self.client = get_client(
+                f"mongodb://{uname}:{pwd}@{host}:{port}",
+                max_pool_size,
+                min_pool_size,
+                max_idle_ms,
+                timeout_ms,
+            )
             self.db = self.client[db]
             logger.info("MongoDB Connection Successful.")
 
         except (Exception, pymongo.errors.ConnectionFailure) as e:
             logger.error(f"Error While Connecting To MongoDB : {e}")
 
-    def load_data(self, data, collection_name):
+    def load_data(
+        self, data, collection_name, row_documents=False, batch_size=10000, key=None
+    ):
         """
         Loads data into a specified collection in the MongoDB database.
 
+        With row_documents enabled a Socrata export (a `meta` schema and a `data` array of
+        rows) replaces the collection with one document per row. The column schema is stored
+        once in the `<collection_name>_meta` collection, and rows are inserted unordered in
+        batches of `batch_size`.
+
         Args:
-            data (dict or list): The data to be loaded into the collection.
+            data (dict, list or ingestion_utils.SocrataRows): The data to be loaded into the
+                collection.
             collection_name (str): The name of the collection where the data will be loaded.
+            row_documents (bool): Store a Socrata export as one document per row.
+            batch_size (int): Number of row documents per insert_many call.
+            key (str, optional): Column identifying a row document, indexed for upserts.
+
+        Returns:
+            bool: True if the data was loaded, False if loading failed.
 
         Raises:
             pymongo.errors.BulkWriteError: If an error occurs during bulk write operation.
@@ -58,9 +161,25 @@ class MongoDB:
         """
         if self.client is None or self.db is None:
             logger.error("No Connection To MongoDB.")
-            return
+            return False
 
         try:
+            if row_documents:
+                rows = self._load_rows(data, collection_name, batch_size)
+                if key is not None:
+                    self.db[collection_name].create_index(key)
+                logger.info(
+                    f"MongoDB: Data Load To {collection_name} Successful ({rows} Rows)."
+                )
+                return True
+
+            # A streamed payload is materialized to be stored as a single document
+            if isinstance(data, SocrataRows):
+                data = data.to_dict()
+
+            # Forget any row document schema, the collection holds whole documents
+            self.db[f"{collection_name}_meta"].delete_one({"_id": collection_name})
+
             # Insert single document or multiple documents into the collection
             if isinstance(data, dict):
                 self.db[collection_name].insert_one(data)
@@ -68,16 +187,98 @@ class MongoDB:
                 self.db[collection_name].insert_many(data)
 
             logger.info(f"MongoDB: Data Load To {collection_name} Successful.")
+            return True
 
         except (pymongo.errors.BulkWriteError, Exception) as e:
             logger.error(f"Error While Data Load To {collection_name}: {e}")
+            return False
+
+    def _load_rows(self, data, collection_name, batch_size):
+        """
+        Replaces a collection with one document per Socrata row and returns the row count.
+        """
+        columns = data["meta"]["view"]["columns"]
+        names = [col["name"] for col in columns]
+
+        # Store the column schema once
+        self.db[f"{collection_name}_meta"].replace_one(
+            {"_id": collection_name}, {"columns": columns}, upsert=True
+        )
+
+        collection = self.db[collection_name]
+        collection.drop()
+
+        rows = 0
+        docs = (dict(zip(names, values)) for values in data["data"])
+        for batch in batched(docs, batch_size):
+            collection.insert_many(batch, ordered=False)
+            rows += len(batch)
+
+        return rows
+
+    def upsert_data(self, docs, collection_name, key, batch_size=10000):
+        """
+        Inserts or replaces row documents in a collection, matched on a key column.
+
+        Args:
+            docs (iterable): Row documents keyed by column name.
+            collection_name (str): The name of the collection.
+            key (str): Column identifying a row document.
+            batch_size (int): Number of documents per unordered bulk write.
+
+        Returns:
+            int: The number of documents inserted or replaced, or None if the upsert failed.
+        """
+        written = 0
+        try:
+            collection = self.db[collection_name]
+            collection.create_index(key)
+
+            for batch in batched(docs, batch_size):
+                result = collection.bulk_write(
+                    [
+                        pymongo.ReplaceOne({key: doc[key]}, doc, upsert=True)
+                        for doc in batch
+                    ],
+                    ordered=False,
+                )
+                written += result.upserted_count + result.modified_count
 
-    def fetch_data(self, collection_name):
+        except pymongo.errors.PyMongoError as e:
+            logger.error(
+                f"Error While Data Upsert To {collection_name} After {written} "
+                f"Documents: {e}"
+            )
+            return None
+
+        logger.info(f"MongoDB: Upserted {written} Documents To {collection_name}.")
+        return written
+
+    def max_value(self, collection_name, field):
         """
-        Fetches all data from a specified collection in the MongoDB database.
+        Returns the largest value of a field across the documents of a collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            field (str): The field to inspect.
+
+        Returns:
+            object: The largest value, or None if the collection is empty.
+        """
+        doc = self.db[collection_name].find_one(
+            {field: {"$ne": None}}, {field: 1}, sort=[(field, pymongo.DESCENDING)]
+        )
+        return doc[field] if doc else None
+
+    def fetch_data(self, collection_name, filter=None, projection=None, batch_size=None):
+        """
+        Fetches data from a specified collection in the MongoDB database.
 
         Args:
             collection_name (str): The name of the collection from which data will be fetched.
+            filter (dict, optional): A query filter. Default is all documents.
+            projection (dict, optional): The fields to return. Default is all fields.
+            batch_size (int, optional): Number of documents per server round trip.
 
         Returns:
             list: A list of documents retrieved from the collection.
@@ -92,17 +293,198 @@ class MongoDB:
 
         try:
             # Fetch all documents from the collection
-            collection = list(self.db[collection_name].find())
+            collection = [
+                doc
+                for batch in self.iter_data(
+                    collection_name, filter, projection, batch_size or 10000
+                )
+                for doc in batch
+            ]
             logger.info(f"MongoDB: Data Fetch From {collection_name} Successful.")
             return collection
 
         except (pymongo.errors.PyMongoError, Exception) as e:
             logger.error(f"Error While Data Fetch From {collection_name}: {e}")
 
+    def iter_data(self, collection_name, filter=None, projection=None, batch_size=10000):
+        """
+        Streams documents of a specified collection in batches from a server cursor.
+
+        Args:
+            collection_name (str): The name of the collection from which data will be fetched.
+            filter (dict, optional): A query filter. Default is all documents.
+            projection (dict, optional): The fields to return. Default is all fields.
+            batch_size (int): Number of documents per server round trip and yielded batch.
+
+        Yields:
+            list: Batches of at most `batch_size` documents.
+        """
+        cursor = self.db[collection_name].find(filter or {}, projection)
+        yield from batched(cursor.batch_size(batch_size), batch_size)
+
+    def fetch_query(self, collection_name, query, batch_size=10000):
+        """
+        Fetches the rows and columns selected by a SourceQuery with an aggregation pipeline.
+
+        Args:
+            collection_name (str): The name of the collection from which data will be fetched.
+            query (source_query.SourceQuery): The projection and filters to push down.
+            batch_size (int): Number of documents per server round trip.
+
+        Returns:
+            list: A list of row documents keyed by column name.
+
+        Raises:
+            pymongo.errors.PyMongoError: If an error occurs during data fetching.
+            Exception: For other unexpected errors.
+        """
+        if self.client is None or self.db is None:
+            logger.error("No Connection To MongoDB.")
+            return None
+
+        try:
+            rows = [
+                row
+                for batch in self.iter_query(collection_name, query, batch_size)
+                for row in batch
+            ]
+            logger.info(f"MongoDB: Query Fetch From {collection_name} Successful.")
+            return rows
+
+        except (pymongo.errors.PyMongoError, Exception) as e:
+            logger.error(f"Error While Data Fetch From {collection_name}: {e}")
+
+    def iter_query(self, collection_name, query, batch_size=10000):
+        """
+        Streams the rows and columns selected by a SourceQuery in batches.
+
+        Collections holding a whole Socrata export (a `meta` schema and a `data` array of
+        rows) are unwound into one document per row on the server before filtering, so both
+        storage layouts return the same row documents.
+
+        Args:
+            collection_name (str): The name of the collection from which data will be fetched.
+            query (source_query.SourceQuery): The projection and filters to push down.
+            batch_size (int): Number of documents per server round trip and yielded batch.
+
+        Yields:
+            list: Batches of at most `batch_size` row documents keyed by column name.
+        """
+        positions = self._column_positions(collection_name)
+        pipeline = query.to_mongo(positions)
+        if positions is None:
+            # Row documents only need their own _id removed
+            pipeline.append({"$project": {"_id": 0}})
+
+        cursor = self.db[collection_name].aggregate(
+            pipeline, batchSize=batch_size, allowDiskUse=True
+        )
+        yield from batched(cursor, batch_size)
+
+    def fetch_meta(self, collection_name):
+        """
+        Fetches the Socrata column schema stored for a row document collection.
+
+        Args:
+            collection_name (str): The name of the row document collection.
+
+        Returns:
+            list: The `meta.view.columns` entries, or None if no schema is stored.
+        """
+        doc = self.db[f"{collection_name}_meta"].find_one({"_id": collection_name})
+        return doc["columns"] if doc else None
+
+    def count_data(self, collection_name):
+        """
+        Counts the rows stored in a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection to count.
+
+        Returns:
+            int: The number of rows, counting each entry of a Socrata `data` array.
+        """
+        collection = self.db[collection_name]
+        if self._column_positions(collection_name) is None:
+            return collection.count_documents({})
+
+        result = list(
+            collection.aggregate(
+                [{"$group": {"_id": None, "n": {"$sum": {"$size": "$data"}}}}]
+            )
+        )
+        return result[0]["n"] if result else 0
+
+    def _column_positions(self, collection_name):
+        """
+        Returns column name to array index for Socrata export collections, otherwise None.
+        """
+        if self.fetch_meta(collection_name) is not None:
+            # Row document collection
+            return None
+
+        doc = self.db[collection_name].find_one(
+            {"meta": {"$exists": True}}, {"meta.view.columns.name": 1}
+        )
+        if doc is None:
+            return None
+        columns = doc["meta"]["view"]["columns"]
+        return {col["name"]: i for i, col in enumerate(columns)}
+
+    def ping(self):
+        """
+        Checks that the MongoDB server is reachable and the credentials are accepted.
+
+        Returns:
+            bool: True if the server answered, False otherwise.
+        """
+        try:
+            self.client.admin.command("ping")
+            return True
+
+        except pymongo.errors.PyMongoError as e:
+            logger.error(f"MongoDB Health Check Failed: {e}")
+            return False
+
     def close_connection(self):
         """
-        Closes the connection to the MongoDB server.
+        Releases this instance. The shared client and its pool stay open for reuse.
         """
-        if self.client is not None:
-            self.client.close()
-            logger.info("MongoDB Connection Terminated.")
+        self.client = None
+        self.db = None
+        logger.info("MongoDB Connection Terminated.")
+
+
+@resource(
+    config_schema={
+        "host": Field(str, default_value="localhost"),
+        "port": Field(int, default_value=27017),
+        "db": Field(str, default_value="dap"),
+        "uname": Field(str, default_value="dap"),
+        "pwd": Field(str, default_value="dap"),
+        "max_pool_size": Field(int, default_value=10),
+        "min_pool_size": Field(int, default_value=0),
+        "max_idle_ms": Field(int, default_value=300000),
+        "timeout_ms": Field(int, default_value=5000),
+    }
+)
+def mongo_resource(init_context):
+    """
+    Provides ops with a MongoDB connector on the process-wide client.
+
+    The server is health checked when the resource is initialized.
+
+    Args:
+        init_context (InitResourceContext): The resource context holding the configuration.
+
+    Yields:
+        MongoDB: The connector bound to the shared client.
+    """
+    mongo_obj = MongoDB(**init_context.resource_config)
+    if mongo_obj.client is None or not mongo_obj.ping():
+        raise ConnectionError("MongoDB Is Not Reachable.")
+
+    try:
+        yield mongo_obj
+    finally:
+        mongo_obj.close_connection()
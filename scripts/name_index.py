@@ -0,0 +1,221 @@
+# Python imports
+import itertools
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+from dagster import get_dagster_logger
+
+# Custom imports
+from summary_tables import RESTAURANT_COLUMNS
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Table persisting the normalized name to restaurant key mapping between runs
+KEY_TABLE = "restaurant_keys"
+
+# Per-name counts of both sides of the open restaurant / inspection join
+RESTAURANT_COUNTS = sql.SQL(
+    "SELECT name, {columns}, count(*) AS count FROM nyc_restraunts_cleaned "
+    "GROUP BY name, {columns}"
+).format(columns=sql.SQL(", ").join(map(sql.Identifier, RESTAURANT_COLUMNS)))
+
+INSPECTION_COUNTS = (
+    "SELECT name, borough, grade, count(*) AS count FROM nyc_inspection_cleaned "
+    "GROUP BY name, borough, grade"
+)
+
+
+def normalize_names(names):
+    """
+    Normalizes restaurant names so spelling variants of one name compare equal.
+
+    Names are lowercased, "&" is spelled "and", apostrophes are dropped, other punctuation
+    becomes a space and whitespace is collapsed, e.g. "JOE'S PIZZA & PASTA" and
+    "joes pizza and pasta." both become "joes pizza and pasta".
+
+    Args:
+        names (pandas.Series): The restaurant names.
+
+    Returns:
+        pandas.Series: The normalized names.
+    """
+    names = names.astype("string").str.lower().str.replace("&", " and ", regex=False)
+    names = names.str.replace(r"['`’]", "", regex=True)
+    return names.str.replace(r"[^0-9a-z]+", " ", regex=True).str.strip()
+
+
+class NameIndex:
+    """
+    A dictionary index assigning stable integer restaurant keys to normalized names.
+
+    Keys are handed out in order of first appearance and persisted in KEY_TABLE, so a name
+    keeps its key across runs and only names new to the index are written back.
+
+    Attributes:
+        keys (dict): Normalized name to integer key.
+    """
+
+    def __init__(self, keys=None):
+        """
+        Initializes a new NameIndex.
+
+        Args:
+            keys (dict, optional): Normalized name to integer key, e.g. a persisted mapping.
+        """
+        self.keys = dict(keys or {})
+        self._saved = len(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def encode(self, names):
+        """
+        Maps names to integer keys, adding unseen normalized names to the index.
+
+        Each distinct raw name is normalized and looked up once, the keys are then spread
+        back to the rows with one take.
+
+        Args:
+            names (pandas.Series): The restaurant names.
+
+        Returns:
+            numpy.ndarray: int32 keys, -1 for missing or blank names.
+        """
+        codes, uniques = pd.factorize(names)
+        normalized = normalize_names(pd.Series(uniques))
+
+        unique_keys = np.empty(len(uniques) + 1, dtype=np.int32)
+        unique_keys[-1] = -1
+        for i, name in enumerate(normalized):
+            if pd.isna(name) or not name:
+                unique_keys[i] = -1
+            else:
+                unique_keys[i] = self.keys.setdefault(name, len(self.keys))
+
+        # Missing names have code -1, which takes the trailing -1 key
+        return unique_keys[codes]
+
+    def added(self):
+        """
+        Returns the names added to the index since it was loaded or last saved.
+
+        Returns:
+            pandas.DataFrame: name_key and key columns.
+        """
+        added = itertools.islice(self.keys.items(), self._saved, None)
+        return pd.DataFrame(list(added), columns=["name_key", "key"])
+
+    @classmethod
+    def load(cls, postgres_obj, table_name=KEY_TABLE):
+        """
+        Loads the persisted index from PostgresDB, or an empty index on the first run.
+
+        Args:
+            postgres_obj (PostgresDB): The PostgresDB connection.
+            table_name (str): The table holding the mapping.
+
+        Returns:
+            NameIndex: The index.
+        """
+        if not postgres_obj.table_exists(table_name):
+            return cls()
+        mapping = postgres_obj.fetch_data(table_name, columns=["name_key", "key"])
+        return cls(zip(mapping["name_key"], mapping["key"].astype(int)))
+
+    def save(self, postgres_obj, table_name=KEY_TABLE):
+        """
+        Appends the names added since the index was loaded to the persisted mapping.
+
+        Args:
+            postgres_obj (PostgresDB): The PostgresDB connection.
+            table_name (str): The table holding the mapping.
+
+        Names whose keys could not be written stay added, so a later save retries them.
+
+        Returns:
+            int: The number of keys written, or None if writing them failed.
+        """
+        added = self.added()
+        if len(added) and not postgres_obj.load_data(
+            added, table_name, if_exists="append"
+        ):
+            return None
+        self._saved = len(self.keys)
+        return len(added)
+
+
+def _aggregate(df, by):
+    """
+    Sums the count column per group, dropping rows without a restaurant key.
+    """
+    df = df[df["key"] >= 0]
+    grouped = df.groupby(by, observed=True, dropna=False, sort=False)["count"]
+    return grouped.sum().reset_index()
+
+
+def _megabytes(*frames):
+    """
+    Returns the deep memory footprint of DataFrames in MB.
+    """
+    return sum(df.memory_usage(deep=True).sum() for df in frames) / 1e6
+
+
+def join_open_inspections(restaurants, inspections, index, borough_key=False):
+    """
+    Counts NYC inspections of open restaurants, joined on integer restaurant keys.
+
+    Both sides arrive as per-name counts. Names are encoded to restaurant keys, optionally
+    co-keyed with the borough, and each side is aggregated per key before the join, so the
+    join produces one row per matching pair of key groups. The count of each pair is the
+    product of both sides' counts: the number of rows joining the raw rows would create.
+
+    Args:
+        restaurants (pandas.DataFrame): name, RESTAURANT_COLUMNS and count columns.
+        inspections (pandas.DataFrame): name, borough, grade and count columns.
+        index (NameIndex): The name index, extended with unseen names.
+        borough_key (bool): Only join restaurants and inspections in the same borough.
+
+    Returns:
+        tuple: The summary DataFrame (RESTAURANT_COLUMNS, grade and count columns) and a
+            dict of join statistics.
+    """
+    restaurants = restaurants.assign(key=index.encode(restaurants["name"]))
+    inspections = inspections.assign(key=index.encode(inspections["name"]))
+
+    on = ["key"]
+    if borough_key:
+        # Shared borough codes, spelled alike on both sides
+        boroughs = pd.concat(
+            [restaurants["borough"], inspections["borough"]], ignore_index=True
+        )
+        boroughs = boroughs.astype("string").str.strip().str.title()
+        codes, _ = pd.factorize(boroughs)
+        restaurants["borough_key"] = codes[: len(restaurants)]
+        inspections["borough_key"] = codes[len(restaurants) :]
+        on.append("borough_key")
+
+    restaurant_keys = _aggregate(restaurants, on + RESTAURANT_COLUMNS)
+    inspection_keys = _aggregate(inspections, on + ["grade"])
+
+    pairs = restaurant_keys.merge(inspection_keys, on=on, suffixes=("_r", "_i"))
+    pairs["count"] = pairs.pop("count_r") * pairs.pop("count_i")
+
+    summary = (
+        pairs.groupby(RESTAURANT_COLUMNS + ["grade"], observed=True, dropna=False)["count"]
+        .sum()
+        .reset_index()
+    )
+
+    stats = {
+        "restaurant_names": int(restaurants["name"].nunique()),
+        "inspection_names": int(inspections["name"].nunique()),
+        "restaurant_keys": int(restaurant_keys["key"].nunique()),
+        "inspection_keys": int(inspection_keys["key"].nunique()),
+        "matched_keys": int(pairs["key"].nunique()),
+        "pair_rows": len(pairs),
+        "joined_rows": int(pairs["count"].sum()),
+        "summary_rows": len(summary),
+        "memory_mb": round(float(_megabytes(restaurant_keys, inspection_keys, pairs)), 2),
+    }
+    return summary, stats
@@ -0,0 +1,127 @@
+# Python imports
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dagster import Field, IOManager, get_dagster_logger, io_manager
+
+# Setting up logger
+logger = get_dagster_logger()
+
+
+class ParquetIOManager(IOManager):
+    """
+    Stores DataFrame outputs as compressed Parquet files and reads them back memory-mapped.
+
+    String columns are dictionary encoded in the file, so repeated values such as boroughs,
+    grades and restaurant names are stored once per row group. Inputs are read through a
+    memory map and converted to pandas without keeping a second copy of the Arrow buffers.
+
+    Attributes:
+        base_dir (str): Directory holding the files, one sub-directory per run and step.
+        compression (str): Parquet compression codec.
+        memory_map (bool): Read files through a memory map.
+    """
+
+    def __init__(self, base_dir="storage", compression="zstd", memory_map=True):
+        """
+        Initializes a new ParquetIOManager.
+
+        Args:
+            base_dir (str): Directory holding the files, one sub-directory per run and step.
+            compression (str): Parquet compression codec, e.g. "zstd", "snappy" or "gzip".
+            memory_map (bool): Read files through a memory map.
+        """
+        self.base_dir = base_dir
+        self.compression = compression
+        self.memory_map = memory_map
+
+    def _path(self, context):
+        """
+        Returns the Parquet file path of a step output.
+        """
+        return os.path.join(self.base_dir, *context.get_identifier()) + ".parquet"
+
+    def handle_output(self, context, obj):
+        """
+        Writes a DataFrame output to its Parquet file.
+
+        Args:
+            context (dagster.OutputContext): The context of the step output.
+            obj (pandas.DataFrame): The output to store.
+        """
+        path = self._path(context)
+        write_parquet(obj, path, self.compression)
+
+        context.add_output_metadata(
+            {"path": path, "rows": len(obj), "bytes": os.path.getsize(path)}
+        )
+        logger.info(f"Stored {len(obj)} Rows In {path}.")
+
+    def load_input(self, context):
+        """
+        Reads a DataFrame input from the Parquet file of the upstream output.
+
+        Args:
+            context (dagster.InputContext): The context of the step input.
+
+        Returns:
+            pandas.DataFrame: The stored output.
+        """
+        return read_parquet(self._path(context.upstream_output), self.memory_map)
+
+
+def write_parquet(df, path, compression="zstd"):
+    """
+    Writes a DataFrame to a Parquet file with dictionary-encoded string columns.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to write.
+        path (str): The file path; missing directories are created.
+        compression (str): Parquet compression codec.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    strings = [
+        field.name
+        for field in table.schema
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+    ]
+    pq.write_table(table, path, compression=compression, use_dictionary=strings)
+
+
+def read_parquet(path, memory_map=True):
+    """
+    Reads a Parquet file into a DataFrame.
+
+    Args:
+        path (str): The file path.
+        memory_map (bool): Read the file through a memory map.
+
+    Returns:
+        pandas.DataFrame: The stored DataFrame.
+    """
+    table = pq.read_table(path, memory_map=memory_map)
+
+    # Release each Arrow column as soon as it has been converted
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+@io_manager(
+    config_schema={
+        "base_dir": Field(str, default_value="storage"),
+        "compression": Field(str, default_value="zstd"),
+        "memory_map": Field(bool, default_value=True),
+    }
+)
+def parquet_io_manager(init_context):
+    """
+    Provides the ParquetIOManager for the cleaned DataFrame outputs.
+
+    Args:
+        init_context (InitResourceContext): The resource context holding the configuration.
+
+    Returns:
+        ParquetIOManager: The configured IO manager.
+    """
+    return ParquetIOManager(**init_context.resource_config)
@@ -1,12 +1,100 @@
 # Python imports
+import io
+import uuid
 import psycopg2
+from psycopg2 import sql
+import threading
 import pandas as pd
 from sqlalchemy import create_engine
-from dagster import get_dagster_logger
+from dagster import Field, get_dagster_logger, resource
+
+# Custom imports
+import metrics
 
 # Setting up logger
 logger = get_dagster_logger()
 
+# Process-wide SQLAlchemy engines, one connection pool per database URL and pool sizing
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """
+    A psycopg2 cursor counting its round trips to the server and the rows it fetches.
+
+    Every statement is a round trip, as is every fetch of a server-side (named) cursor.
+    Client-side cursors hold their whole result after the statement, so their fetches
+    only count rows.
+    """
+
+    def execute(self, query, vars=None):
+        metrics.count("postgres_round_trips")
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        metrics.count("postgres_round_trips")
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        metrics.count("postgres_round_trips")
+        return super().copy_expert(sql, file, size)
+
+    def fetchone(self):
+        return self._fetched(super().fetchone(), single=True)
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany() if size is None else super().fetchmany(size)
+        return self._fetched(rows)
+
+    def fetchall(self):
+        return self._fetched(super().fetchall())
+
+    def _fetched(self, rows, single=False):
+        """
+        Counts a fetch and returns its rows.
+        """
+        if self.name is not None:
+            metrics.count("postgres_round_trips")
+        if rows:
+            metrics.count("rows_read", 1 if single else len(rows))
+        return rows
+
+
+def get_engine(url, pool_size=5, max_overflow=5, pool_timeout=30, pool_recycle=1800):
+    """
+    Returns the process-wide SQLAlchemy engine for a database URL, creating it once.
+
+    The engine's QueuePool is shared by every PostgresDB instance in the process, and
+    connections are checked with a ping before they are handed out, so a connection
+    dropped by the server is replaced instead of failing the borrowing op. Connections
+    open CountingCursors, so every query through the engine or a borrowed connection is
+    counted in the stage metrics.
+
+    Args:
+        url (str): The SQLAlchemy database URL.
+        pool_size (int): Number of connections kept open in the pool.
+        max_overflow (int): Number of extra connections opened above pool_size under load.
+        pool_timeout (int): Seconds to wait for a free connection before failing.
+        pool_recycle (int): Seconds after which a pooled connection is reopened.
+
+    Returns:
+        sqlalchemy.engine.base.Engine: The shared engine.
+    """
+    key = (url, pool_size, max_overflow, pool_timeout, pool_recycle)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = create_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=True,
+                connect_args={"cursor_factory": CountingCursor},
+            )
+        return _engines[key]
+
 
 class PostgresDB:
     """
@@ -18,15 +106,27 @@ class PostgresDB:
         db (str): The name of the database.
         uname (str): The username for authentication.
         pwd (str): The password for authentication.
-        engine (sqlalchemy.engine.base.Engine): The SQLAlchemy engine for database connection.
-        connection (psycopg2.extensions.connection): The psycopg2 database connection object.
+        engine (sqlalchemy.engine.base.Engine): The shared SQLAlchemy engine and its pool.
+        connection (sqlalchemy.pool.PoolProxiedConnection): A psycopg2 connection borrowed
+            from the engine's pool.
     """
 
     def __init__(
-        self, host="localhost", port=5432, db="postgres", uname="dap", pwd="dap"
+        self,
+        host="localhost",
+        port=5432,
+        db="postgres",
+        uname="dap",
+        pwd="dap",
+        pool_size=5,
+        max_overflow=5,
+        pool_timeout=30,
+        pool_recycle=1800,
     ):
         """
-        Initializes a new PostgresDB instance and establishes a connection to the PostgreSQL database.
+        Initializes a new PostgresDB instance and borrows a connection from the process-wide
+        pool of the PostgreSQL database, so only the first instance pays the connection
+        handshake and authentication.
 
         Args:
             host (str): The hostname or IP address of the database server.
@@ -34,51 +134,682 @@ class PostgresDB:
             db (str): The name of the database.
             uname (str): The username for authentication.
             pwd (str): The password for authentication.
+            pool_size (int): Number of connections kept open in the pool.
+            max_overflow (int): Number of extra connections opened above pool_size under load.
+            pool_timeout (int): Seconds to wait for a free connection before failing.
+            pool_recycle (int): Seconds after which a pooled connection is reopened.
         """
         self.engine = None
         self.connection = None
 
         try:
-            # Create SQLAlchemy engine and establish psycopg2 connection
-            self.engine = create_engine(
-                f"postgresql+psycopg2://{uname}:{pwd}@{host}:{port}/{db}"
-            )
-            self.connection = psycopg2.connect(
-                host=host, port=port, database=db, user=uname, password=pwd
+            # Get the shared SQLAlchemy engine and borrow a psycopg2 connection from its pool
+            self.engine = get_engine(
+                f"postgresql+psycopg2://{uname}:{pwd}@{host}:{port}/{db}",
+                pool_size,
+                max_overflow,
+                pool_timeout,
+                pool_recycle,
             )
+            self.connection = self.engine.raw_connection()
             logger.info("PostgresDB Connection Successful.")
 
         except (Exception, psycopg2.Error) as e:
             logger.error(f"Error While Connecting To PostgresDB : {e}")
 
-    def load_data(self, data, table_name):
+    def load_data(
+        self,
+        data,
+        table_name,
+        if_exists="replace",
+        method="copy",
+        staging=False,
+        unlogged=False,
+        schema=None,
+    ):
         """
         Loads data from a DataFrame into a specified table in the PostgreSQL database.
 
+        With method "copy" the DataFrame is serialized to an in-memory CSV buffer and streamed
+        through COPY FROM STDIN on the psycopg2 connection. With staging enabled the data is
+        copied into a separate staging table which then atomically replaces the target table,
+        so readers of the target table are only locked for the rename.
+
+        With a managed schema the table is created with the schema's typed columns, key and
+        indexes instead of the types pandas infers, and the partitions of a partitioned
+        schema are created for the loaded values before the copy.
+
         Args:
             data (pandas.DataFrame): The DataFrame containing the data to be loaded.
             table_name (str): The name of the table in the database where the data will be loaded.
+            if_exists (str): Behaviour when the table already exists, "replace" or "append".
+            method (str): "copy" for COPY FROM STDIN or "insert" for DataFrame.to_sql INSERTs.
+            staging (bool): Load into a staging table and swap it in place of the target table.
+                Only applies to "replace" loads with method "copy".
+            unlogged (bool): Create the staging table as UNLOGGED. The swapped-in table stays
+                unlogged, trading crash safety for load speed.
+            schema (TableSchema, optional): The managed layout of the table. Only applies
+                to method "copy".
+
+        Returns:
+            bool: True if the data was loaded, False if loading failed.
 
         Raises:
             psycopg2.Error: If an error occurs during data loading.
             Exception: For other unexpected errors.
         """
         try:
-            data.to_sql(
-                name=table_name, con=self.engine, if_exists="replace", index=False
-            )
+            if method == "insert":
+                data.to_sql(
+                    name=table_name, con=self.engine, if_exists=if_exists, index=False
+                )
+                metrics.count("rows_written", len(data))
+            elif staging and if_exists == "replace":
+                staging_name = self._create_staging_table(
+                    data, table_name, unlogged, schema
+                )
+                self._copy_data(data, staging_name, schema)
+                self._swap_table(staging_name, table_name, schema)
+            else:
+                self._create_table(data, table_name, if_exists, schema)
+                self._copy_data(data, table_name, schema)
+
             self.connection.commit()
             logger.info(f"PostgresDB: Data Load To {table_name} Successful.")
+            return True
 
         except (psycopg2.Error, Exception) as e:
+            self.connection.rollback()
             logger.error(f"Error While Data Load To {table_name}: {e}")
+            return False
+
+    def load_chunks(
+        self,
+        chunks,
+        table_name,
+        method="copy",
+        staging=False,
+        unlogged=False,
+        schema=None,
+    ):
+        """
+        Loads an iterable of DataFrame chunks into a specified table, one chunk at a time.
+
+        The first chunk replaces the table and the following chunks are appended, so only
+        one chunk needs to be held in memory at any time. Without staging each chunk is
+        committed on its own and loading stops at the first chunk that fails, leaving the
+        chunks before it in the table. With staging enabled all chunks are copied into the
+        staging table and it is swapped in once, after the last chunk, so a failed load
+        leaves the target table untouched.
+
+        Args:
+            chunks (iterable): An iterable of pandas.DataFrame chunks sharing the same columns.
+            table_name (str): The name of the table in the database where the data will be loaded.
+            method (str): "copy" for COPY FROM STDIN or "insert" for DataFrame.to_sql INSERTs.
+            staging (bool): Load into a staging table and swap it in after the last chunk.
+            unlogged (bool): Create the staging table as UNLOGGED.
+            schema (TableSchema, optional): The managed layout of the table.
+
+        Returns:
+            int: The number of rows loaded, or None if the load failed, including when
+                reading a chunk failed.
+        """
+        if not (staging and method == "copy"):
+            rows = 0
+            try:
+                for i, chunk in enumerate(chunks):
+                    loaded = self.load_data(
+                        chunk,
+                        table_name,
+                        if_exists="replace" if i == 0 else "append",
+                        method=method,
+                        schema=schema,
+                    )
+                    if not loaded:
+                        logger.error(
+                            f"PostgresDB: Load To {table_name} Stopped At Chunk {i} "
+                            f"After {rows} Rows."
+                        )
+                        return None
+                    rows += len(chunk)
+
+            except Exception as e:
+                logger.error(
+                    f"Error While Data Load To {table_name} After {rows} Rows: {e}"
+                )
+                return None
+
+            logger.info(f"PostgresDB: Loaded {rows} Rows To {table_name}.")
+            return rows
+
+        rows = 0
+        staging_name = None
+        try:
+            for chunk in chunks:
+                if staging_name is None:
+                    staging_name = self._create_staging_table(
+                        chunk, table_name, unlogged, schema
+                    )
+                self._copy_data(chunk, staging_name, schema)
+                self.connection.commit()
+                rows += len(chunk)
+
+            if staging_name is not None:
+                self._swap_table(staging_name, table_name, schema)
+                self.connection.commit()
+
+            logger.info(f"PostgresDB: Loaded {rows} Rows To {table_name}.")
+            return rows
+
+        except (psycopg2.Error, Exception) as e:
+            self.connection.rollback()
+            logger.error(f"Error While Data Load To {table_name}: {e}")
+            return None
+
+    def _create_table(self, data, table_name, if_exists, schema=None):
+        """
+        Creates (or replaces) an empty table with the columns and inferred types of a DataFrame,
+        or with the layout of a managed schema.
+        """
+        if schema is None:
+            data.head(0).to_sql(
+                name=table_name, con=self.engine, if_exists=if_exists, index=False
+            )
+            return
+
+        statements = schema.create_statements(table_name)
+        if if_exists == "replace":
+            statements.insert(
+                0, sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table_name))
+            )
+        self._run(statements)
+
+    def _create_staging_table(self, data, table_name, unlogged, schema=None):
+        """
+        Creates an empty staging table for `table_name` and returns its name.
+        """
+        staging_name = f"{table_name}_staging"
+        self._create_table(data, staging_name, "replace", schema)
+        # A partitioned table has no storage of its own to make unlogged
+        if unlogged and (schema is None or schema.partition_key is None):
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} SET UNLOGGED").format(
+                        sql.Identifier(staging_name)
+                    )
+                )
+        return staging_name
+
+    def _copy_data(self, data, table_name, schema=None):
+        """
+        Streams a DataFrame into an existing table through COPY FROM STDIN, creating the
+        partitions of the loaded values first if the table is partitioned.
+        """
+        if self._partitioned(table_name, schema):
+            values = data[schema.partition_key].dropna().unique().tolist()
+            self._run(schema.partition_statements(table_name, values))
+
+        buffer = io.StringIO()
+        data.to_csv(buffer, index=False, header=False, na_rep="\\N")
+        buffer.seek(0)
+
+        query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(sql.Identifier(str(col)) for col in data.columns),
+        )
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(query, buffer)
+        metrics.count("rows_written", len(data))
+
+    def _partitioned(self, table_name, schema):
+        """
+        Checks whether a table was created partitioned by a managed schema. Tables created
+        before the schema was partitioned keep their layout until they are replaced.
+        """
+        if schema is None or schema.partition_key is None:
+            return False
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table_name,)
+            )
+            return cursor.fetchone()[0] == "p"
+
+    def _swap_table(self, staging_name, table_name, schema=None):
+        """
+        Replaces `table_name` with `staging_name` inside the current transaction, renaming
+        the key, indexes, partitions and id sequence of a managed schema along with it.
+        """
+        old_name = f"{table_name}_old"
+        partitions = []
+        if schema is not None and schema.partition_key is not None:
+            partitions = self._partition_values(staging_name, schema)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(old_name))
+            )
+            cursor.execute(
+                sql.SQL("ALTER TABLE IF EXISTS {} RENAME TO {}").format(
+                    sql.Identifier(table_name), sql.Identifier(old_name)
+                )
+            )
+            cursor.execute(
+                sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                    sql.Identifier(staging_name), sql.Identifier(table_name)
+                )
+            )
+            cursor.execute(
+                sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(old_name))
+            )
+        if schema is None:
+            return
+
+        statements = schema.rename_statements(staging_name, table_name, partitions)
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table_name,))
+            sequence = cursor.fetchone()[0]
+        if sequence:
+            statements.append(
+                sql.SQL("ALTER SEQUENCE {} RENAME TO {}").format(
+                    sql.SQL(sequence), sql.Identifier(f"{table_name}_id_seq")
+                )
+            )
+        self._run(statements)
+
+    def _partition_values(self, table_name, schema):
+        """
+        Returns the partition values of a partitioned table, read from its partition names.
+        """
+        prefix = schema.partition_name(table_name, "")
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                (table_name,),
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        return [name[len(prefix) :] for name in names if name.startswith(prefix)]
+
+    def _run(self, statements):
+        """
+        Runs SQL statements without parameters inside the current transaction.
+        """
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def upsert_data(self, data, table_name, key_columns):
+        """
+        Inserts or replaces rows of a DataFrame in a table, matched on a natural key.
+
+        The rows are copied into an unlogged staging table shaped like the target table,
+        then existing rows with the same key are deleted and the new rows inserted in one
+        transaction. A missing target table is created from the DataFrame instead.
+
+        Args:
+            data (pandas.DataFrame): The DataFrame containing the rows to upsert.
+            table_name (str): The name of the target table.
+            key_columns (list): The columns identifying a row; NULLs compare as equal.
+
+        Returns:
+            int: The number of rows upserted, or None if the upsert failed.
+
+        Raises:
+            psycopg2.Error: If an error occurs during data loading.
+            Exception: For other unexpected errors.
+        """
+        if not self.table_exists(table_name):
+            return len(data) if self.load_data(data, table_name) else None
+
+        staging_name = f"{table_name}_delta"
+        target, staging = sql.Identifier(table_name), sql.Identifier(staging_name)
+        columns = sql.SQL(", ").join(sql.Identifier(str(col)) for col in data.columns)
+        match = sql.SQL(" AND ").join(
+            sql.SQL("t.{0} IS NOT DISTINCT FROM s.{0}").format(sql.Identifier(col))
+            for col in key_columns
+        )
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+                cursor.execute(
+                    sql.SQL("CREATE UNLOGGED TABLE {} (LIKE {})").format(staging, target)
+                )
+            self._copy_data(data, staging_name)
+
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    sql.SQL("DELETE FROM {} AS t USING {} AS s WHERE {}").format(
+                        target, staging, match
+                    )
+                )
+                cursor.execute(
+                    sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+                        target, columns, columns, staging
+                    )
+                )
+                cursor.execute(sql.SQL("DROP TABLE {}").format(staging))
+
+            self.connection.commit()
+            logger.info(f"PostgresDB: Upserted {len(data)} Rows To {table_name}.")
+            return len(data)
+
+        except (psycopg2.Error, Exception) as e:
+            self.connection.rollback()
+            logger.error(f"Error While Data Upsert To {table_name}: {e}")
+            return None
+
+    def replace_rows(self, data, table_name, where, params=None, schema=None):
+        """
+        Replaces the rows of a table matching a predicate with the rows of a DataFrame.
+
+        The DELETE and the COPY run in one transaction, so readers never see the matching
+        rows missing, and a failed copy leaves the deleted rows in place.
+
+        Args:
+            data (pandas.DataFrame): The DataFrame containing the replacement rows.
+            table_name (str): The name of the table.
+            where (str or psycopg2.sql.Composable): SQL predicate selecting the rows.
+            params (dict or tuple, optional): Parameters referenced by the predicate.
+            schema (TableSchema, optional): The managed layout of the table.
+
+        Returns:
+            bool: True if the rows were replaced, False if the replace failed.
+        """
+        query = sql.SQL("DELETE FROM {} WHERE {}").format(
+            sql.Identifier(table_name), _predicate(where)
+        )
+        try:
+            self._create_table(data, table_name, "append", schema)
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                deleted = cursor.rowcount
+            self._copy_data(data, table_name, schema)
+
+            self.connection.commit()
+            logger.info(
+                f"PostgresDB: Replaced {deleted} Rows Of {table_name} "
+                f"With {len(data)} Rows."
+            )
+            return True
+
+        except (psycopg2.Error, Exception) as e:
+            self.connection.rollback()
+            logger.error(f"Error While Replacing Rows Of {table_name}: {e}")
+            return False
+
+    def execute(self, statements):
+        """
+        Runs SQL statements in one transaction, rolling back if any of them fails.
+
+        Args:
+            statements (list): (query, params) tuples; queries are strings or
+                psycopg2.sql.Composable, params a dict, tuple or None.
+
+        Raises:
+            psycopg2.Error: If a statement fails.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                for query, params in statements:
+                    cursor.execute(query, params)
+            self.connection.commit()
+
+        except psycopg2.Error:
+            self.connection.rollback()
+            raise
+
+    def table_exists(self, table_name):
+        """
+        Checks whether a table exists.
+
+        Args:
+            table_name (str): The name of the table.
+
+        Returns:
+            bool: True if the table exists.
+        """
+        return self.fetch_value("SELECT to_regclass(%s) IS NOT NULL", (table_name,))
+
+    def fetch_value(self, query, params=None):
+        """
+        Runs a query and returns the first column of its first row.
+
+        Args:
+            query (str or psycopg2.sql.Composable): The query to run.
+            params (dict or tuple, optional): Parameters referenced by the query.
+
+        Returns:
+            object: The value, or None if the query returned no rows.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+        self.connection.rollback()
+        return row[0] if row else None
+
+    def read_state(self, source):
+        """
+        Reads the ingestion state of a source from the etl_state table.
+
+        Args:
+            source (str): The source name.
+
+        Returns:
+            dict: The high_water_mark, previous_mark, mode, content_hash and updated_at of
+                the last ingest, or None.
+        """
+        self._create_state_table()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT high_water_mark, previous_mark, mode, content_hash, "
+                "updated_at::text FROM etl_state "
+                "WHERE source = %s",
+                (source,),
+            )
+            row = cursor.fetchone()
+        self.connection.rollback()
+
+        if row is None:
+            return None
+        return dict(
+            zip(
+                ["high_water_mark", "previous_mark", "mode", "content_hash", "updated_at"],
+                row,
+            )
+        )
+
+    def write_state(
+        self, source, high_water_mark, previous_mark=None, mode="full", content_hash=None
+    ):
+        """
+        Records the ingestion state of a source in the etl_state table.
+
+        Args:
+            source (str): The source name.
+            high_water_mark (str): The largest ingested watermark value.
+            previous_mark (str, optional): The watermark the last ingest started from;
+                None when the whole source was reloaded.
+            mode (str): "full" or "delta".
+            content_hash (str, optional): SHA-256 of the export a full load was read from;
+                None when the loaded rows do not match one export.
+        """
+        self._create_state_table()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO etl_state "
+                "(source, high_water_mark, previous_mark, mode, content_hash, updated_at) "
+                "VALUES (%s, %s, %s, %s, %s, now()) "
+                "ON CONFLICT (source) DO UPDATE SET "
+                "high_water_mark = EXCLUDED.high_water_mark, "
+                "previous_mark = EXCLUDED.previous_mark, "
+                "mode = EXCLUDED.mode, content_hash = EXCLUDED.content_hash, "
+                "updated_at = EXCLUDED.updated_at",
+                (source, high_water_mark, previous_mark, mode, content_hash),
+            )
+        self.connection.commit()
+        logger.info(f"PostgresDB: {source} High Water Mark {high_water_mark} ({mode}).")
+
+    def clear_content_hash(self, source):
+        """
+        Forgets the export digest recorded for a source after a failed load, so the next
+        run reloads the source even from the same export. The state's updated_at changes
+        too, so fingerprints derived from the state change with it.
+
+        Args:
+            source (str): The source name.
+        """
+        self._create_state_table()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE etl_state SET content_hash = NULL, updated_at = now() "
+                "WHERE source = %s",
+                (source,),
+            )
+        self.connection.commit()
+        logger.info(f"PostgresDB: {source} Export Digest Cleared.")
+
+    def clear_state(self, source):
+        """
+        Removes the state recorded for a source from the etl_state table.
 
-    def fetch_data(self, table_name):
+        Args:
+            source (str): The source name.
         """
-        Fetches all data from a specified table in the PostgreSQL database and returns it as a DataFrame.
+        self._create_state_table()
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM etl_state WHERE source = %s", (source,))
+        self.connection.commit()
+        logger.info(f"PostgresDB: {source} State Cleared.")
+
+    def _create_state_table(self):
+        """
+        Creates the etl_state table if it doesn't exist.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS etl_state ("
+                "source TEXT PRIMARY KEY, high_water_mark TEXT, previous_mark TEXT, "
+                "mode TEXT NOT NULL, content_hash TEXT, updated_at TIMESTAMPTZ NOT NULL)"
+            )
+            cursor.execute(
+                "ALTER TABLE etl_state ADD COLUMN IF NOT EXISTS content_hash TEXT"
+            )
+        self.connection.commit()
+
+    def read_fingerprint(self, step):
+        """
+        Reads the input fingerprint a step last applied to the database.
+
+        Args:
+            step (str): The step name, e.g. a table loaded by loading_cleaned_data.
+
+        Returns:
+            str: The fingerprint, or None if none is recorded.
+        """
+        self._create_fingerprint_table()
+        return self.fetch_value(
+            "SELECT fingerprint FROM etl_fingerprints WHERE step = %s", (step,)
+        )
+
+    def write_fingerprint(self, step, fingerprint):
+        """
+        Records the input fingerprint a step applied to the database.
+
+        Args:
+            step (str): The step name.
+            fingerprint (str): The fingerprint, or None to forget the recorded one.
+        """
+        self._create_fingerprint_table()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO etl_fingerprints (step, fingerprint, updated_at) "
+                "VALUES (%s, %s, now()) "
+                "ON CONFLICT (step) DO UPDATE SET "
+                "fingerprint = EXCLUDED.fingerprint, updated_at = EXCLUDED.updated_at",
+                (step, fingerprint),
+            )
+        self.connection.commit()
+
+    def _create_fingerprint_table(self):
+        """
+        Creates the etl_fingerprints table if it doesn't exist.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS etl_fingerprints ("
+                "step TEXT PRIMARY KEY, fingerprint TEXT, "
+                "updated_at TIMESTAMPTZ NOT NULL)"
+            )
+        self.connection.commit()
+
+    def read_sketches(self, source):
+        """
+        Reads the serialized name sketches of a source.
+
+        Args:
+            source (str): The source name.
+
+        Returns:
+            dict: (grade, year) to the serialized sketch; ("", 0) for an ungraded source.
+        """
+        self._create_sketch_table()
+        rows = self.fetch_query(
+            "SELECT grade, year, sketch FROM name_sketches WHERE source = %s", (source,)
+        )
+        return {
+            (grade, int(year)): bytes(sketch)
+            for grade, year, sketch in rows.itertuples(index=False)
+        }
+
+    def write_sketches(self, source, sketches, from_year=None):
+        """
+        Replaces the name sketches of a source, all of them or those from a year on.
+
+        Args:
+            source (str): The source name.
+            sketches (dict): (grade, year) to the serialized sketch.
+            from_year (int, optional): The first year replaced. Default is None, all years.
+        """
+        self._create_sketch_table()
+        with self.connection.cursor() as cursor:
+            if from_year is None:
+                cursor.execute("DELETE FROM name_sketches WHERE source = %s", (source,))
+            else:
+                cursor.execute(
+                    "DELETE FROM name_sketches WHERE source = %s AND year >= %s",
+                    (source, from_year),
+                )
+            for (grade, year), sketch in sketches.items():
+                cursor.execute(
+                    "INSERT INTO name_sketches (source, grade, year, sketch, updated_at) "
+                    "VALUES (%s, %s, %s, %s, now())",
+                    (source, grade, year, psycopg2.Binary(sketch)),
+                )
+        self.connection.commit()
+
+    def _create_sketch_table(self):
+        """
+        Creates the name_sketches table if it doesn't exist.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS name_sketches ("
+                "source TEXT NOT NULL, grade TEXT NOT NULL, year SMALLINT NOT NULL, "
+                "sketch BYTEA NOT NULL, updated_at TIMESTAMPTZ NOT NULL, "
+                "PRIMARY KEY (source, grade, year))"
+            )
+        self.connection.commit()
+
+    def fetch_data(self, table_name, columns=None, where=None, params=None):
+        """
+        Fetches data from a specified table in the PostgreSQL database and returns it as a DataFrame.
 
         Args:
             table_name (str): The name of the table from which data will be fetched.
+            columns (list, optional): Columns to select. Default is all columns.
+            where (str or psycopg2.sql.Composable, optional): SQL predicate applied in the
+                database. Default is no filter.
+            params (dict or tuple, optional): Parameters referenced by the predicate.
 
         Returns:
             pandas.DataFrame: The DataFrame containing the fetched data.
@@ -88,24 +819,234 @@ class PostgresDB:
             Exception: For other unexpected errors.
         """
         try:
-            df = pd.read_sql_query(f"SELECT * FROM {table_name}", self.engine)
+            query = self._select_query(table_name, columns, where)
+            df = pd.read_sql_query(
+                query.as_string(self.connection.dbapi_connection), self.engine, params=params
+            )
             logger.info(f"PostgresDB: Data Fetch From {table_name} Successful.")
             return df
 
         except (psycopg2.Error, Exception) as e:
             logger.error(f"Error While Data Fetch From {table_name}: {e}")
 
+    def fetch_query(self, query, params=None):
+        """
+        Runs a query and returns its rows as a DataFrame.
+
+        Args:
+            query (str or psycopg2.sql.Composable): The query to run.
+            params (dict or tuple, optional): Parameters referenced by the query.
+
+        Returns:
+            pandas.DataFrame: The rows returned by the query.
+
+        Raises:
+            psycopg2.Error: If the query fails.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(query, params)
+                columns = [desc[0] for desc in cursor.description]
+                return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+        finally:
+            self.connection.rollback()
+
+    def iter_data(
+        self,
+        table_name,
+        columns=None,
+        where=None,
+        params=None,
+        chunksize=50000,
+        distinct=False,
+    ):
+        """
+        Streams data from a specified table as DataFrame chunks using a server-side cursor.
+
+        Only `chunksize` rows are transferred and held in memory at a time. With distinct
+        enabled, rows duplicated on the selected columns are removed in the database.
+
+        Args:
+            table_name (str): The name of the table from which data will be fetched.
+            columns (list, optional): Columns to select. Default is all columns.
+            where (str or psycopg2.sql.Composable, optional): SQL predicate applied in the
+                database. Default is no filter.
+            params (dict or tuple, optional): Parameters referenced by the predicate.
+            chunksize (int): Number of rows per yielded DataFrame.
+            distinct (bool): Remove rows duplicated on the selected columns in the database.
+
+        Yields:
+            pandas.DataFrame: Chunks of at most `chunksize` rows.
+
+        Raises:
+            psycopg2.Error: If an error occurs during data fetching.
+            Exception: For other unexpected errors.
+        """
+        query = self._select_query(table_name, columns, where, distinct)
+        cursor = self.connection.cursor(name=f"iter_{table_name}_{uuid.uuid4().hex[:8]}")
+        cursor.itersize = chunksize
+
+        try:
+            cursor.execute(query, params)
+            chunks = 0
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                chunks += 1
+                yield pd.DataFrame(rows, columns=[desc[0] for desc in cursor.description])
+
+            logger.info(
+                f"PostgresDB: Data Fetch From {table_name} Successful ({chunks} Chunks)."
+            )
+
+        except (psycopg2.Error, Exception) as e:
+            logger.error(f"Error While Data Fetch From {table_name}: {e}")
+            raise
+
+        finally:
+            cursor.close()
+            self.connection.rollback()
+
+    def iter_query(self, table_name, query, chunksize=50000, distinct=False):
+        """
+        Streams the rows and columns selected by a SourceQuery as DataFrame chunks.
+
+        Args:
+            table_name (str): The name of the table from which data will be fetched.
+            query (source_query.SourceQuery): The projection and filters to push down.
+            chunksize (int): Number of rows per yielded DataFrame.
+            distinct (bool): Remove rows duplicated on the selected columns in the database.
+
+        Returns:
+            generator: pandas.DataFrame chunks of at most `chunksize` rows.
+        """
+        where, params = query.to_sql()
+        return self.iter_data(
+            table_name,
+            columns=query.columns,
+            where=where,
+            params=params,
+            chunksize=chunksize,
+            distinct=distinct,
+        )
+
+    def count_rows(self, table_name, where=None, params=None):
+        """
+        Counts the rows of a specified table, optionally restricted by a predicate.
+
+        Args:
+            table_name (str): The name of the table to count.
+            where (str or psycopg2.sql.Composable, optional): SQL predicate applied in the
+                database. Default is no filter.
+            params (dict or tuple, optional): Parameters referenced by the predicate.
+
+        Returns:
+            int: The number of matching rows.
+        """
+        query = sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table_name))
+        if where:
+            query = sql.SQL("{} WHERE {}").format(query, _predicate(where))
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, params)
+            count = cursor.fetchone()[0]
+        self.connection.rollback()
+        return count
+
+    def _select_query(self, table_name, columns=None, where=None, distinct=False):
+        """
+        Builds a SELECT statement with optional projection, predicate and DISTINCT on the
+        selected columns.
+        """
+        fields = (
+            sql.SQL(", ").join(sql.Identifier(col) for col in columns)
+            if columns
+            else sql.SQL("*")
+        )
+        source = sql.Identifier(table_name)
+        predicate = (
+            sql.SQL(" WHERE {}").format(_predicate(where)) if where else sql.SQL("")
+        )
+
+        return sql.SQL("SELECT {}{} FROM {}{}").format(
+            sql.SQL("DISTINCT ") if distinct else sql.SQL(""), fields, source, predicate
+        )
+
+    def ping(self):
+        """
+        Checks that the borrowed connection is alive.
+
+        Returns:
+            bool: True if the database answered, False otherwise.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self.connection.rollback()
+            return True
+
+        except (Exception, psycopg2.Error) as e:
+            logger.error(f"PostgresDB Health Check Failed: {e}")
+            return False
+
     def close_connection(self):
         """
-        Closes the connection to the PostgreSQL database.
+        Returns the borrowed connection to the pool, rolling back any open transaction.
 
         Raises:
             psycopg2.Error: If an error occurs while closing the connection.
             Exception: For other unexpected errors.
         """
         try:
-            self.connection.close()
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
             logger.info("PostgresDB Connection Terminated.")
 
         except (psycopg2.Error, Exception) as e:
             logger.error(f"Error While Closing Connection: {e}")
+
+
+def _predicate(where):
+    """
+    Wraps a raw SQL predicate string; composed predicates are returned unchanged.
+    """
+    return sql.SQL(where) if isinstance(where, str) else where
+
+
+@resource(
+    config_schema={
+        "host": Field(str, default_value="localhost"),
+        "port": Field(int, default_value=5432),
+        "db": Field(str, default_value="postgres"),
+        "uname": Field(str, default_value="dap"),
+        "pwd": Field(str, default_value="dap"),
+        "pool_size": Field(int, default_value=5),
+        "max_overflow": Field(int, default_value=5),
+        "pool_timeout": Field(int, default_value=30),
+        "pool_recycle": Field(int, default_value=1800),
+    }
+)
+def postgres_resource(init_context):
+    """
+    Provides ops with a PostgresDB connection borrowed from the process-wide pool.
+
+    The connection is health checked when the resource is initialized and returned to
+    the pool when the step finishes.
+
+    Args:
+        init_context (InitResourceContext): The resource context holding the configuration.
+
+    Yields:
+        PostgresDB: The connector bound to a pooled connection.
+    """
+    postgres_obj = PostgresDB(**init_context.resource_config)
+    if postgres_obj.connection is None or not postgres_obj.ping():
+        raise ConnectionError("PostgresDB Is Not Reachable.")
+
+    try:
+        yield postgres_obj
+    finally:
+        postgres_obj.close_connection()
@@ -0,0 +1,188 @@
+# Python imports
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_integer_dtype
+
+# Custom imports
+from summary_tables import GRADES
+
+# Largest number of cells of a dense grade cube
+MAX_CELLS = 50_000_000
+
+# Widest value range of an integer column offset to codes instead of factorized
+MAX_INTEGER_RANGE = 4096
+
+
+def _codes(values):
+    """
+    Maps a column to integer codes and the values they stand for, missing values as -1.
+
+    Categorical columns reuse their codes and small-range integer columns, such as years
+    and months, are offset by their minimum, so only other columns pay for hashing.
+    """
+    if isinstance(values.dtype, CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), values.cat.categories
+    if is_integer_dtype(values.dtype) and len(values):
+        low, high = int(values.min()), int(values.max())
+        if high - low < MAX_INTEGER_RANGE:
+            codes = values.to_numpy().astype(np.int64)
+            codes -= low
+            return codes, pd.RangeIndex(low, high + 1)
+    codes, levels = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), pd.Index(levels)
+
+
+class GradeCube:
+    """
+    Row counts per grade and value of every dimension, built in one pass over a DataFrame.
+
+    The grade and dimension columns are factorized to integer codes and combined into one
+    flat cell index, and a single bincount over it fills a dense count array with one axis
+    per dimension. Counts of any dimensions, of one grade or all grades, are sums over the
+    other axes, so chart builders slice the cube instead of masking the rows once per grade.
+
+    Rows with a grade outside `grades` are not counted. Rows missing a dimension value are
+    counted in a trailing slot of that dimension's axis, so they are left out of the counts
+    of that dimension only, as a pandas groupby on it drops them.
+
+    Attributes:
+        grades (pandas.Index): The grades, the first axis of the cube.
+        dims (list): The dimension names, the remaining axes of the cube.
+        levels (dict): Dimension name to the pandas.Index of its values, in axis order.
+        counts (numpy.ndarray): int64 counts, one axis per grade and dimension, each
+            dimension axis ending with the slot of rows missing its value.
+    """
+
+    def __init__(self, grades, levels, counts):
+        """
+        Initializes a new GradeCube.
+
+        Args:
+            grades (list): The grades, the first axis of the cube.
+            levels (dict): Dimension name to its values, in axis order.
+            counts (numpy.ndarray): Counts with one axis per grade and dimension, each
+                dimension axis ending with the slot of rows missing its value.
+        """
+        self.grades = pd.Index(grades)
+        self.dims = list(levels)
+        self.levels = {dim: pd.Index(values) for dim, values in levels.items()}
+        self.counts = counts
+
+    @classmethod
+    def build(cls, df, dims, grades=GRADES, weight=None):
+        """
+        Counts the rows of a DataFrame per grade and dimension values.
+
+        Args:
+            df (pandas.DataFrame): Rows with a grade column and the dimension columns.
+            dims (list): The dimension columns, e.g. year, quarter, month and borough.
+            grades (list): The grades to count, in axis order.
+            weight (str, optional): Column of counts to sum, e.g. of a summary table.
+                Default is None, counting rows.
+
+        Returns:
+            GradeCube: The cube.
+
+        Raises:
+            ValueError: If the dense cube would have more than MAX_CELLS cells.
+        """
+        grade_codes = pd.Categorical(df["grade"], categories=list(grades)).codes
+        weights = None if weight is None else df[weight].to_numpy(dtype=np.float64)
+
+        # One extra slot per axis collects missing values; the grade slot is dropped
+        key = grade_codes.astype(np.int64)
+        key[key < 0] = len(grades)
+        shape = [len(grades) + 1]
+        levels = {}
+        for dim in dims:
+            codes, levels[dim] = _codes(df[dim])
+            size = len(levels[dim]) + 1
+            codes[codes < 0] = size - 1
+            key *= size
+            key += codes
+            shape.append(size)
+
+        cells = int(np.prod(shape))
+        if cells > MAX_CELLS:
+            raise ValueError(f"Grade cube of {cells} cells exceeds {MAX_CELLS} cells.")
+
+        counts = np.bincount(key, weights, minlength=cells).reshape(shape)[:-1]
+        return cls(grades, levels, counts.astype(np.int64))
+
+    def _axis(self, dim):
+        """
+        Returns the axis of a dimension, 0 for the grade.
+        """
+        return 0 if dim == "grade" else self.dims.index(dim) + 1
+
+    def _level(self, dim):
+        """
+        Returns the values along the axis of a dimension.
+        """
+        return self.grades if dim == "grade" else self.levels[dim]
+
+    def where(self, dim, values):
+        """
+        Returns the cube of the rows whose dimension value is one of `values`.
+
+        Args:
+            dim (str): The dimension.
+            values (list): The values to keep.
+
+        Returns:
+            GradeCube: The restricted cube, sharing no counts with this one.
+        """
+        keep = np.flatnonzero(self.levels[dim].isin(values))
+        levels = dict(self.levels)
+        levels[dim] = self.levels[dim][keep]
+
+        # Keep an empty slot of missing values at the end of the axis
+        axis = self._axis(dim)
+        counts = np.take(self.counts, np.append(keep, -1), axis=axis)
+        counts[(slice(None),) * axis + (-1,)] = 0
+        return GradeCube(self.grades, levels, counts)
+
+    def total(self, grade=None):
+        """
+        Returns the number of rows, of one grade or all grades.
+        """
+        if grade is None:
+            return int(self.counts.sum())
+        return int(self.counts[self.grades.get_loc(grade)].sum())
+
+    def counts_by(self, *dims, grade=None):
+        """
+        Counts the rows per value of some dimensions, of one grade or all grades.
+
+        Args:
+            *dims (str): The dimensions, "grade" for the grade axis.
+            grade (str, optional): The grade to count. Default is None, all grades.
+
+        Returns:
+            pandas.DataFrame: The dimension columns in the given order and a count column,
+                one row per non-zero combination, sorted by the dimensions.
+        """
+        counts = self.counts
+        if grade is not None:
+            counts = counts[[self.grades.get_loc(grade)]]
+
+        axes = [self._axis(dim) for dim in dims]
+        other = tuple(axis for axis in range(counts.ndim) if axis not in axes)
+        counts = counts.sum(axis=other)
+        kept = sorted(axes)
+        counts = counts.transpose([kept.index(axis) for axis in axes])
+        # Drop the missing value slots of the counted dimensions
+        counts = counts[tuple(slice(None) if a == 0 else slice(-1) for a in axes)]
+
+        cells = np.nonzero(counts)
+        df = pd.DataFrame(
+            {dim: self._level(dim)[idx] for dim, idx in zip(dims, cells)}
+        )
+        df["count"] = counts[cells]
+        return df
+
+    def nbytes(self):
+        """
+        Returns the memory footprint of the counts in bytes.
+        """
+        return self.counts.nbytes
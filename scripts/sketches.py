@@ -0,0 +1,554 @@
+# Python imports
+import copy
+import io
+import json
+import math
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+from dagster import get_dagster_logger
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Rows of a cleaned table added to the sketches at a time
+CHUNK_ROWS = 1_000_000
+
+
+def hash_names(names):
+    """
+    Hashes names to 64-bit values, the same in every process and run.
+
+    Categorical columns only hash their categories, which are then taken by code.
+
+    Args:
+        names (pandas.Series): The names; missing names are dropped.
+
+    Returns:
+        numpy.ndarray: uint64 hashes.
+    """
+    if isinstance(names.dtype, CategoricalDtype):
+        codes = names.cat.codes.to_numpy()
+        hashes = pd.util.hash_array(names.cat.categories.to_numpy(dtype=object))
+        return hashes[codes[codes >= 0]]
+    names = names.dropna()
+    return pd.util.hash_array(names.to_numpy(dtype=object))
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the most frequent items of a stream, in `capacity` counters.
+
+    Every monitored item has a count that overestimates its true count by at most its
+    error, and the error is at most total / capacity. Chunks are counted exactly and
+    reduced to their top counters, which are merged into the summary as two summaries
+    are merged: an item missing from a full summary is credited with its minimum count.
+
+    Attributes:
+        capacity (int): The number of counters.
+        counts (dict): Item to its overestimated count.
+        errors (dict): Item to the bound of its overestimate.
+        total (int): The number of items counted.
+    """
+
+    def __init__(self, capacity, counts=None, errors=None, total=0):
+        """
+        Initializes a new SpaceSaving summary.
+
+        Args:
+            capacity (int): The number of counters.
+            counts (dict, optional): Item to its count.
+            errors (dict, optional): Item to its error.
+            total (int): The number of items counted.
+        """
+        self.capacity = capacity
+        self.counts = dict(counts or {})
+        self.errors = dict(errors or {})
+        self.total = total
+
+    def _floor(self):
+        """
+        Returns the count bounding every unmonitored item, 0 if a counter is free.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, items):
+        """
+        Counts a chunk of items.
+
+        Args:
+            items (pandas.Series): The items; missing items are not counted.
+        """
+        counts = items.value_counts(sort=True)
+        counts = counts[counts > 0]
+        chunk = SpaceSaving(self.capacity, total=int(counts.sum()))
+        top = counts.iloc[: self.capacity]
+        chunk.counts = dict(zip(top.index, top.to_numpy().tolist()))
+        chunk.errors = dict.fromkeys(chunk.counts, 0)
+        self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Merges another summary of the same capacity into this one.
+
+        Args:
+            other (SpaceSaving): The summary to merge.
+
+        Raises:
+            ValueError: If the capacities differ.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("Space-Saving summaries of different capacities.")
+
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, floor) + other.counts.get(
+                item, other_floor
+            )
+            errors[item] = self.errors.get(item, floor) + other.errors.get(
+                item, other_floor
+            )
+
+        kept = sorted(counts, key=counts.get, reverse=True)[: self.capacity]
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self.total += other.total
+
+    def top(self, n):
+        """
+        Returns the n items with the highest counts, ties by item.
+        """
+        return sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+class CountMin:
+    """
+    Count-Min sketch estimating the count of any item, never below its true count.
+
+    With width ceil(e / epsilon) and depth ceil(ln(1 / delta)) an estimate exceeds the
+    true count by more than epsilon * total with probability at most delta. Sketches of
+    the same shape merge by adding their tables.
+
+    Attributes:
+        table (numpy.ndarray): depth x width int64 counters.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, table=None):
+        """
+        Initializes a new CountMin sketch.
+
+        Args:
+            epsilon (float): The error bound, as a share of the total count.
+            delta (float): The probability of exceeding the error bound.
+            table (numpy.ndarray, optional): Existing counters, which fix the shape.
+        """
+        if table is None:
+            width = math.ceil(math.e / epsilon)
+            depth = math.ceil(math.log(1 / delta))
+            table = np.zeros((depth, width), dtype=np.int64)
+        self.table = table
+
+    def _columns(self, hashes):
+        """
+        Returns the column of each hash in every row, by double hashing.
+        """
+        depth, width = self.table.shape
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = hashes >> np.uint64(32)
+        return [
+            (low + np.uint64(row) * high) % np.uint64(width) for row in range(depth)
+        ]
+
+    def update(self, hashes):
+        """
+        Counts a chunk of hashed items.
+
+        Args:
+            hashes (numpy.ndarray): uint64 hashes of the items.
+        """
+        width = self.table.shape[1]
+        for row, columns in enumerate(self._columns(hashes)):
+            self.table[row] += np.bincount(columns.astype(np.int64), minlength=width)
+
+    def estimate(self, hashes):
+        """
+        Estimates the counts of hashed items.
+
+        Args:
+            hashes (numpy.ndarray): uint64 hashes of the items.
+
+        Returns:
+            numpy.ndarray: int64 estimates.
+        """
+        rows = [
+            self.table[row, columns.astype(np.int64)]
+            for row, columns in enumerate(self._columns(hashes))
+        ]
+        return np.min(rows, axis=0)
+
+    def merge(self, other):
+        """
+        Merges another sketch of the same shape into this one.
+
+        Raises:
+            ValueError: If the shapes differ.
+        """
+        if other.table.shape != self.table.shape:
+            raise ValueError("Count-Min sketches of different shapes.")
+        self.table += other.table
+
+
+class HyperLogLog:
+    """
+    HyperLogLog estimate of the number of distinct items, in 2 ** precision registers.
+
+    The relative standard error is about 1.04 / sqrt(2 ** precision), 0.8% for the
+    default precision of 14. Sketches of the same precision merge by register maximum.
+
+    Attributes:
+        precision (int): The number of hash bits selecting a register.
+        registers (numpy.ndarray): uint8 registers.
+    """
+
+    def __init__(self, precision=14, registers=None):
+        """
+        Initializes a new HyperLogLog sketch.
+
+        Args:
+            precision (int): The number of hash bits selecting a register, 4 to 18.
+            registers (numpy.ndarray, optional): Existing registers.
+        """
+        self.precision = precision
+        if registers is None:
+            registers = np.zeros(2**precision, dtype=np.uint8)
+        self.registers = registers
+
+    def update(self, hashes):
+        """
+        Adds a chunk of hashed items.
+
+        Args:
+            hashes (numpy.ndarray): uint64 hashes of the items.
+        """
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+
+        # Rank: the position of the first set bit of the remaining bits, 1-based
+        rest = (hashes << np.uint64(p)) | np.uint64(1 << (p - 1))
+        high = (rest >> np.uint64(32)).astype(np.float64)
+        low = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        with np.errstate(divide="ignore"):
+            bits = np.where(
+                high > 0, 32 + np.floor(np.log2(high)), np.floor(np.log2(low))
+            )
+        rank = (64 - bits).astype(np.int64)
+
+        # Largest rank per register, from a register x rank occurrence grid
+        seen = np.zeros((len(self.registers), 65), dtype=bool)
+        seen[index, rank] = True
+        seen[:, 0] = True
+        chunk = 64 - np.argmax(seen[:, ::-1], axis=1)
+        np.maximum(self.registers, chunk.astype(np.uint8), out=self.registers)
+
+    def estimate(self):
+        """
+        Returns the estimated number of distinct items.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting of the empty registers for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """
+        Merges another sketch of the same precision into this one.
+
+        Raises:
+            ValueError: If the precisions differ.
+        """
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog sketches of different precisions.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+
+class NameSketch:
+    """
+    Sketches of a stream of restaurant names: heavy hitters and distinct names.
+
+    Space-Saving picks the candidate top names and Count-Min caps their counts, so a top
+    count overestimates the true count by at most epsilon * total with probability
+    1 - delta. HyperLogLog estimates the number of distinct names. All three are sized by
+    their error bounds rather than the number of names, and merge across chunks, grades
+    and years.
+
+    Attributes:
+        heavy_hitters (SpaceSaving): Candidate top names with their counts.
+        count_min (CountMin): Count estimates of any name.
+        distinct (HyperLogLog): Distinct name estimate.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, precision=14):
+        """
+        Initializes an empty NameSketch.
+
+        Args:
+            epsilon (float): Error bound of the counts, as a share of the total count.
+            delta (float): Probability of a Count-Min estimate exceeding the bound.
+            precision (int): HyperLogLog precision.
+        """
+        self.heavy_hitters = SpaceSaving(math.ceil(1 / epsilon))
+        self.count_min = CountMin(epsilon, delta)
+        self.distinct = HyperLogLog(precision)
+
+    @classmethod
+    def build(
+        cls, names, epsilon=0.001, delta=0.01, precision=14, chunk_rows=CHUNK_ROWS
+    ):
+        """
+        Sketches a column of names, `chunk_rows` names at a time.
+
+        Args:
+            names (pandas.Series): The names.
+            epsilon (float): Error bound of the counts, as a share of the total count.
+            delta (float): Probability of a Count-Min estimate exceeding the bound.
+            precision (int): HyperLogLog precision.
+            chunk_rows (int): Names per chunk.
+
+        Returns:
+            NameSketch: The sketch.
+        """
+        sketch = cls(epsilon, delta, precision)
+        for start in range(0, len(names), chunk_rows):
+            sketch.update(names.iloc[start : start + chunk_rows])
+        return sketch
+
+    def update(self, names):
+        """
+        Adds a chunk of names.
+
+        Args:
+            names (pandas.Series): The names; missing names are skipped.
+        """
+        hashes = hash_names(names)
+        self.heavy_hitters.update(names.astype(object))
+        self.count_min.update(hashes)
+        self.distinct.update(hashes)
+
+    def compatible(self, other):
+        """
+        Checks whether another sketch has the same error bounds, so they can be merged.
+        """
+        return (
+            self.heavy_hitters.capacity == other.heavy_hitters.capacity
+            and self.count_min.table.shape == other.count_min.table.shape
+            and self.distinct.precision == other.distinct.precision
+        )
+
+    def merge(self, other):
+        """
+        Merges another sketch with the same error bounds into this one.
+
+        Args:
+            other (NameSketch): The sketch to merge.
+
+        Returns:
+            NameSketch: This sketch.
+        """
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.count_min.merge(other.count_min)
+        self.distinct.merge(other.distinct)
+        return self
+
+    def top(self, n):
+        """
+        Returns the estimated n most frequent names.
+
+        Args:
+            n (int): The number of names.
+
+        Returns:
+            pandas.DataFrame: name and count columns, highest count first and ties by name.
+        """
+        candidates = self.heavy_hitters.top(self.heavy_hitters.capacity)
+        df = pd.DataFrame(candidates, columns=["name", "count"])
+        if len(df):
+            estimates = self.count_min.estimate(hash_names(df["name"]))
+            df["count"] = np.minimum(df["count"].to_numpy(), estimates)
+        df = df.sort_values(["count", "name"], ascending=[False, True]).head(n)
+        return df.reset_index(drop=True)
+
+    def to_bytes(self):
+        """
+        Serializes the sketch to compressed bytes.
+        """
+        ss = self.heavy_hitters
+        meta = {
+            "capacity": ss.capacity,
+            "total": ss.total,
+            "items": list(ss.counts),
+            "precision": self.distinct.precision,
+        }
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+            counts=np.array(list(ss.counts.values()), dtype=np.int64),
+            errors=np.array([ss.errors[item] for item in ss.counts], dtype=np.int64),
+            count_min=self.count_min.table,
+            registers=self.distinct.registers,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserializes a sketch serialized by to_bytes.
+
+        Args:
+            data (bytes): The serialized sketch.
+
+        Returns:
+            NameSketch: The sketch.
+        """
+        arrays = np.load(io.BytesIO(bytes(data)))
+        meta = json.loads(arrays["meta"].tobytes())
+        sketch = cls.__new__(cls)
+        items = meta["items"]
+        sketch.heavy_hitters = SpaceSaving(
+            meta["capacity"],
+            dict(zip(items, arrays["counts"].tolist())),
+            dict(zip(items, arrays["errors"].tolist())),
+            meta["total"],
+        )
+        sketch.count_min = CountMin(table=arrays["count_min"])
+        sketch.distinct = HyperLogLog(meta["precision"], arrays["registers"])
+        return sketch
+
+
+def merge_sketches(sketches):
+    """
+    Merges sketches, e.g. the per-year sketches of one grade, leaving them unchanged.
+
+    Args:
+        sketches (iterable): NameSketch objects with the same error bounds.
+
+    Returns:
+        NameSketch: The merged sketch, or None if there are none.
+    """
+    merged = None
+    for sketch in sketches:
+        merged = copy.deepcopy(sketch) if merged is None else merged.merge(sketch)
+    return merged
+
+
+def sketch_partitions(df, keys, epsilon=0.001, delta=0.01, precision=14):
+    """
+    Sketches the names of a cleaned table per partition, e.g. per grade and year.
+
+    Args:
+        df (pandas.DataFrame): Rows with a name column and the key columns.
+        keys (list): The partition columns, or an empty list for one sketch.
+        epsilon (float): Error bound of the counts, as a share of the total count.
+        delta (float): Probability of a Count-Min estimate exceeding the bound.
+        precision (int): HyperLogLog precision.
+
+    Returns:
+        dict: Partition key tuple to its NameSketch.
+    """
+    if not keys:
+        return {(): NameSketch.build(df["name"], epsilon, delta, precision)}
+    groups = df.groupby(keys, observed=True, sort=True)["name"]
+    return {
+        key if isinstance(key, tuple) else (key,): NameSketch.build(
+            names, epsilon, delta, precision
+        )
+        for key, names in groups
+    }
+
+
+def refresh_name_sketches(postgres_obj, source, table_name, df, window=None, **params):
+    """
+    Rebuilds the name sketches of a loaded cleaned table, one per grade and year.
+
+    After a full load every sketch is rebuilt from the loaded DataFrame. After a delta
+    load only the years from the start of the delta window on are rebuilt, from the rows
+    of the table read back in chunks, since those years hold both kept and new rows. If
+    the stored sketches are missing or have other error bounds, every year is rebuilt
+    from the table instead. A table without grades, such as the open restaurants, gets a
+    single sketch.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+        source (str): The source name the sketches are stored under.
+        table_name (str): The loaded table.
+        df (pandas.DataFrame): The loaded rows.
+        window (str, optional): The start of the delta window, or None after a full load.
+        **params: epsilon, delta and precision of the sketches.
+
+    Returns:
+        int: The number of sketches written.
+    """
+    if "grade" not in df.columns:
+        sketches = {("", 0): NameSketch.build(df["name"], **params)}
+        from_year = None
+    elif window is None:
+        sketches = sketch_partitions(df, ["grade", "year"], **params)
+        from_year = None
+    else:
+        from_year = pd.Timestamp(window).year
+        stored = postgres_obj.read_sketches(source).values()
+        template = NameSketch(**params)
+        if not stored or not all(
+            template.compatible(NameSketch.from_bytes(sketch)) for sketch in stored
+        ):
+            from_year = None
+
+        sketches = {}
+        chunks = postgres_obj.iter_data(
+            table_name,
+            columns=["name", "grade", "year"],
+            where="year >= %(year)s",
+            params={"year": from_year or 0},
+            chunksize=CHUNK_ROWS,
+        )
+        for chunk in chunks:
+            partitions = sketch_partitions(chunk, ["grade", "year"], **params)
+            for key, sketch in partitions.items():
+                if key in sketches:
+                    sketch = sketches[key].merge(sketch)
+                sketches[key] = sketch
+
+    serialized = {
+        (str(key[0]), int(key[1])) if key else ("", 0): sketch.to_bytes()
+        for key, sketch in sketches.items()
+    }
+    postgres_obj.write_sketches(source, serialized, from_year)
+    logger.info(f"PostgresDB: {len(serialized)} Name Sketches Of {source} Refreshed.")
+    return len(serialized)
+
+
+def top_accuracy(exact, estimated):
+    """
+    Measures sketched top names against the exact ones.
+
+    Args:
+        exact (pandas.DataFrame): Exact name and count columns.
+        estimated (pandas.DataFrame): Sketched name and count columns.
+
+    Returns:
+        dict: "recall", the share of exact top names found, and "max_error", the largest
+            count overestimate of a found name.
+    """
+    found = estimated.merge(exact, on="name", suffixes=("", "_exact"))
+    errors = found["count"] - found["count_exact"]
+    return {
+        "recall": len(found) / len(exact) if len(exact) else 1.0,
+        "max_error": int(errors.max()) if len(found) else 0,
+    }
@@ -0,0 +1,164 @@
+# Python imports
+import datetime
+from psycopg2 import sql
+
+# Supported filter operators and their SQL / MongoDB / CouchDB Mango equivalents
+OPERATORS = {
+    "==": ("=", "$eq"),
+    "!=": ("<>", "$ne"),
+    ">": (">", "$gt"),
+    ">=": (">=", "$gte"),
+    "<": ("<", "$lt"),
+    "<=": ("<=", "$lte"),
+    "in": ("IN", "$in"),
+}
+
+
+class SourceQuery:
+    """
+    A declarative projection and filter pushed down into the source databases.
+
+    The same query renders to a SQL SELECT/WHERE for PostgresDB, a $match/$project
+    aggregation for MongoDB and a Mango _find selector with fields for CouchDB, so only
+    the rows and columns surviving cleaning are transferred.
+
+    Attributes:
+        columns (list): The columns to keep, or None for all columns.
+        filters (list): (column, operator, value) tuples, combined with AND.
+        date_formats (dict): Column name to to_date() format for text dates in PostgresDB.
+    """
+
+    def __init__(self, columns=None, filters=None, date_formats=None):
+        """
+        Initializes a new SourceQuery.
+
+        Args:
+            columns (list, optional): The columns to keep. Default is all columns.
+            filters (list, optional): (column, operator, value) tuples, combined with AND.
+                Operators are "==", "!=", ">", ">=", "<", "<=" and "in".
+            date_formats (dict, optional): Column name to to_date() format, for columns
+                stored as text dates in PostgresDB and compared against date values.
+        """
+        self.columns = columns
+        self.filters = filters or []
+        self.date_formats = date_formats or {}
+
+        for column, operator, value in self.filters:
+            if operator not in OPERATORS:
+                raise ValueError(f"Unsupported operator {operator} for {column}.")
+
+    def where(self, column, operator, value):
+        """
+        Returns a copy of the query with one more filter.
+
+        Args:
+            column (str): The column to filter on.
+            operator (str): The filter operator.
+            value (object): The value compared against.
+
+        Returns:
+            SourceQuery: The narrowed query.
+        """
+        return SourceQuery(
+            self.columns, self.filters + [(column, operator, value)], self.date_formats
+        )
+
+    def to_sql(self):
+        """
+        Renders the filters as a SQL predicate.
+
+        Returns:
+            tuple: (psycopg2.sql.Composable or None, dict) predicate and its parameters.
+        """
+        clauses, params = [], {}
+        for i, (column, operator, value) in enumerate(self.filters):
+            field = sql.Identifier(column)
+            if column in self.date_formats:
+                field = sql.SQL("to_date({}, {})").format(
+                    field, sql.Literal(self.date_formats[column])
+                )
+
+            key = f"p{i}"
+            params[key] = tuple(value) if operator == "in" else value
+            clauses.append(
+                sql.SQL("{} {} {}").format(
+                    field, sql.SQL(OPERATORS[operator][0]), sql.Placeholder(key)
+                )
+            )
+
+        if not clauses:
+            return None, params
+        return sql.SQL(" AND ").join(clauses), params
+
+    def to_mongo(self, positions=None):
+        """
+        Renders the query as a MongoDB aggregation pipeline.
+
+        Args:
+            positions (dict, optional): Column name to array index, for collections storing a
+                Socrata `data` array of rows instead of one document per row.
+
+        Returns:
+            list: The aggregation pipeline stages.
+        """
+        pipeline = []
+        if positions is not None:
+            # Expand each row of the data array into a document with named fields
+            used = self.columns or list(positions)
+            used = used + [col for col, _, _ in self.filters if col not in used]
+            pipeline.append({"$unwind": "$data"})
+            pipeline.append(
+                {
+                    "$project": {
+                        "_id": 0,
+                        **{
+                            col: {"$arrayElemAt": ["$data", positions[col]]}
+                            for col in used
+                        },
+                    }
+                }
+            )
+
+        match = self._selector()
+        if match:
+            pipeline.append({"$match": match})
+        if self.columns:
+            pipeline.append(
+                {"$project": {"_id": 0, **{col: 1 for col in self.columns}}}
+            )
+
+        return pipeline
+
+    def to_mango(self):
+        """
+        Renders the query as a CouchDB Mango _find request body.
+
+        Returns:
+            dict: The request body with selector and, when projecting, fields.
+        """
+        body = {"selector": self._selector() or {"_id": {"$gt": None}}}
+        if self.columns:
+            body["fields"] = list(self.columns)
+        return body
+
+    def _selector(self):
+        """
+        Builds a MongoDB/Mango selector; dates compare as ISO strings in document stores.
+        """
+        selector = {}
+        for column, operator, value in self.filters:
+            if operator == "in":
+                value = [_document_value(val) for val in value]
+            else:
+                value = _document_value(value)
+            selector.setdefault(column, {})[OPERATORS[operator][1]] = value
+        return selector
+
+
+def _document_value(value):
+    """
+    Converts a filter value to the representation stored in the document databases.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
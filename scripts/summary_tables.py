@@ -0,0 +1,186 @@
+# Python imports
+from psycopg2 import sql
+from dagster import get_dagster_logger
+
+# Setting up logger
+logger = get_dagster_logger()
+
+# Cleaned inspection tables and the source names their delta windows are recorded under
+INSPECTION_TABLES = {
+    "nyc_inspection": "nyc_inspection_cleaned",
+    "la_inspection": "la_inspection_cleaned",
+}
+
+# Grades kept by the cleaning pipelines
+GRADES = ["A", "B", "C"]
+
+# Number of top restaurant names kept per chart
+TOP_RESTAURANTS = 10
+TOP_GRADED = 5
+
+SUMMARY_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS inspection_monthly_summary (
+        source text NOT NULL,
+        month_start date NOT NULL,
+        year integer NOT NULL,
+        quarter integer NOT NULL,
+        month integer NOT NULL,
+        grade text NOT NULL,
+        count bigint NOT NULL,
+        PRIMARY KEY (source, month_start, grade)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nyc_restaurant_summary (
+        borough text,
+        type text,
+        sidewalk_seating_approval text,
+        roadway_seating_approval text,
+        alcohol_permission text,
+        count bigint NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nyc_open_inspection_summary (
+        borough text,
+        type text,
+        sidewalk_seating_approval text,
+        roadway_seating_approval text,
+        alcohol_permission text,
+        grade text,
+        count bigint NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS top_names (
+        source text NOT NULL,
+        grade text,
+        rank integer NOT NULL,
+        name text,
+        count bigint NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS top_names_source_grade ON top_names (source, grade)",
+]
+
+RESTAURANT_COLUMNS = [
+    "borough",
+    "type",
+    "sidewalk_seating_approval",
+    "roadway_seating_approval",
+    "alcohol_permission",
+]
+
+RESTAURANT_SUMMARY = sql.SQL(
+    """
+    INSERT INTO nyc_restaurant_summary
+    SELECT {columns}, count(*) FROM nyc_restraunts_cleaned GROUP BY {columns}
+    """
+).format(columns=sql.SQL(", ").join(map(sql.Identifier, RESTAURANT_COLUMNS)))
+
+TOP_NAMES = """
+    INSERT INTO top_names
+    SELECT 'nyc_restaurants', NULL, rank, name, count FROM (
+        SELECT name, count(*) AS count,
+            row_number() OVER (ORDER BY count(*) DESC, name) AS rank
+        FROM nyc_restraunts_cleaned GROUP BY name
+    ) AS ranked WHERE rank <= %(top_restaurants)s
+    UNION ALL
+    SELECT source, grade, rank, name, count FROM (
+        SELECT source, grade, name, count,
+            row_number() OVER (
+                PARTITION BY source, grade ORDER BY count DESC, name
+            ) AS rank
+        FROM (
+            SELECT 'nyc_inspection' AS source, grade, name, count(*) AS count
+            FROM nyc_inspection_cleaned GROUP BY grade, name
+            UNION ALL
+            SELECT 'la_inspection', grade, name, count(*)
+            FROM la_inspection_cleaned GROUP BY grade, name
+        ) AS counts
+    ) AS ranked WHERE rank <= %(top_graded)s
+"""
+
+
+def inspection_summary_statements(source, window=None):
+    """
+    Builds the statements refreshing the monthly summary of one inspection source.
+
+    A full load recomputes every month. After a delta load only the months from the
+    start of the delta window onwards are recomputed, which covers every replaced row.
+
+    Args:
+        source (str): The source name, a key of INSPECTION_TABLES.
+        window (str, optional): The start of the delta window, or None after a full load.
+
+    Returns:
+        list: (query, params) tuples.
+    """
+    table = sql.Identifier(INSPECTION_TABLES[source])
+    insert = sql.SQL(
+        """
+        INSERT INTO inspection_monthly_summary
+        SELECT %(source)s, date_trunc('month', inspection_date)::date,
+            year, quarter, month, grade, count(*)
+        FROM {} {}
+        GROUP BY 2, year, quarter, month, grade
+        """
+    )
+
+    if window is None:
+        params = {"source": source}
+        return [
+            ("DELETE FROM inspection_monthly_summary WHERE source = %(source)s", params),
+            (insert.format(table, sql.SQL("")), params),
+        ]
+
+    params = {"source": source, "window": window}
+    return [
+        (
+            "DELETE FROM inspection_monthly_summary WHERE source = %(source)s "
+            "AND month_start >= date_trunc('month', %(window)s::timestamp)",
+            params,
+        ),
+        (
+            insert.format(
+                table,
+                sql.SQL(
+                    "WHERE inspection_date >= date_trunc('month', %(window)s::timestamp)"
+                ),
+            ),
+            params,
+        ),
+    ]
+
+
+def refresh_summary_tables(postgres_obj, windows):
+    """
+    Refreshes the summary tables charted by run_analysis from the cleaned tables.
+
+    Everything is computed inside PostgresDB in one transaction, so readers see either the
+    previous or the refreshed summaries. The restaurant summary and top names are
+    recomputed as a whole; the monthly inspection summary only for delta windows. The open
+    restaurant inspection summary is written by joining_open_inspections instead.
+
+    Args:
+        postgres_obj (PostgresDB): The PostgresDB connection.
+        windows (dict): Inspection source name to the start of its delta window, or None
+            after a full load.
+    """
+    statements = [(ddl, None) for ddl in SUMMARY_DDL]
+    for source, window in windows.items():
+        statements += inspection_summary_statements(source, window)
+
+    statements += [
+        ("DELETE FROM nyc_restaurant_summary", None),
+        (RESTAURANT_SUMMARY, None),
+        ("DELETE FROM top_names", None),
+        (
+            TOP_NAMES,
+            {"top_restaurants": TOP_RESTAURANTS, "top_graded": TOP_GRADED},
+        ),
+    ]
+
+    postgres_obj.execute(statements)
+    logger.info("PostgresDB: Summary Tables Refreshed.")
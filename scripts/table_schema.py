@@ -0,0 +1,211 @@
+# Python imports
+from psycopg2 import sql
+
+# Custom imports
+from summary_tables import GRADES
+
+
+class TableSchema:
+    """
+    A managed PostgresDB table layout: typed columns, a surrogate key and indexes.
+
+    Tables are created from the schema instead of the column types pandas infers. Every
+    table gets an identity `id` primary key and one index per entry of `indexes`, named
+    after the table so they can be renamed along with it. A partitioned schema is created
+    PARTITION BY LIST on its partition column, with one partition per value created on
+    demand before rows are copied in.
+
+    Attributes:
+        columns (dict): Column name to its SQL type and constraints, in load order.
+        indexes (list): Column tuples to index.
+        partition_key (str): Column the table is partitioned on, or None.
+    """
+
+    def __init__(self, columns, indexes=None, partition_key=None):
+        """
+        Initializes a new TableSchema.
+
+        Args:
+            columns (dict): Column name to its SQL type and constraints, in load order.
+            indexes (list, optional): Column tuples to index.
+            partition_key (str, optional): Column to partition on, one partition per value.
+        """
+        self.columns = columns
+        self.indexes = [tuple(index) for index in indexes or []]
+        self.partition_key = partition_key
+
+    def partition_on(self, column):
+        """
+        Returns a copy of the schema partitioned on a column.
+
+        Args:
+            column (str): The partition column, e.g. "year".
+
+        Returns:
+            TableSchema: The partitioned schema.
+        """
+        return TableSchema(self.columns, self.indexes, column)
+
+    def index_name(self, table_name, columns):
+        """
+        Returns the name of the index of a table on some columns.
+        """
+        return f"{table_name}_{'_'.join(columns)}_idx"
+
+    def partition_name(self, table_name, value):
+        """
+        Returns the name of the partition of a table holding one value.
+        """
+        return f"{table_name}_p{value}"
+
+    def create_statements(self, table_name):
+        """
+        Builds the statements creating the table and its indexes, if they don't exist.
+
+        Args:
+            table_name (str): The name of the table.
+
+        Returns:
+            list: psycopg2.sql.Composable statements.
+        """
+        table = sql.Identifier(table_name)
+        key = ["id"] + ([self.partition_key] if self.partition_key else [])
+        columns = [sql.SQL("id bigint GENERATED BY DEFAULT AS IDENTITY")] + [
+            sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(definition))
+            for name, definition in self.columns.items()
+        ]
+        columns.append(
+            sql.SQL("CONSTRAINT {} PRIMARY KEY ({})").format(
+                sql.Identifier(f"{table_name}_pkey"),
+                sql.SQL(", ").join(map(sql.Identifier, key)),
+            )
+        )
+
+        statements = [
+            sql.SQL("CREATE TABLE IF NOT EXISTS {} ({}){}").format(
+                table,
+                sql.SQL(", ").join(columns),
+                sql.SQL(" PARTITION BY LIST ({})").format(
+                    sql.Identifier(self.partition_key)
+                )
+                if self.partition_key
+                else sql.SQL(""),
+            )
+        ]
+        for index in self.indexes:
+            statements.append(
+                sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                    sql.Identifier(self.index_name(table_name, index)),
+                    table,
+                    sql.SQL(", ").join(map(sql.Identifier, index)),
+                )
+            )
+        return statements
+
+    def partition_statements(self, table_name, values):
+        """
+        Builds the statements creating the partitions of some values, if they don't exist.
+
+        Args:
+            table_name (str): The name of the partitioned table.
+            values (iterable): The partition column values about to be loaded.
+
+        Returns:
+            list: psycopg2.sql.Composable statements.
+        """
+        query = sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES IN ({})")
+        return [
+            query.format(
+                sql.Identifier(self.partition_name(table_name, value)),
+                sql.Identifier(table_name),
+                sql.Literal(value),
+            )
+            for value in sorted(values)
+        ]
+
+    def rename_statements(self, old_name, new_name, partition_values=()):
+        """
+        Builds the statements renaming the key, indexes and partitions of a renamed table.
+
+        Args:
+            old_name (str): The name the table was created under, e.g. a staging table.
+            new_name (str): The current name of the table.
+            partition_values (iterable): The values of the table's partitions.
+
+        Returns:
+            list: psycopg2.sql.Composable statements.
+        """
+        table = sql.Identifier(new_name)
+        statements = [
+            sql.SQL("ALTER TABLE {} RENAME CONSTRAINT {} TO {}").format(
+                table,
+                sql.Identifier(f"{old_name}_pkey"),
+                sql.Identifier(f"{new_name}_pkey"),
+            )
+        ]
+        for index in self.indexes:
+            statements.append(
+                sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                    sql.Identifier(self.index_name(old_name, index)),
+                    sql.Identifier(self.index_name(new_name, index)),
+                )
+            )
+        for value in sorted(partition_values):
+            statements.append(
+                sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                    sql.Identifier(self.partition_name(old_name, value)),
+                    sql.Identifier(self.partition_name(new_name, value)),
+                )
+            )
+        return statements
+
+
+# Grades kept by the cleaning pipelines
+GRADE = "char(1) NOT NULL CHECK (grade IN ({}))".format(
+    ", ".join(f"'{grade}'" for grade in GRADES)
+)
+
+DATE_PARTS = {
+    "month": "smallint NOT NULL CHECK (month BETWEEN 1 AND 12)",
+    "year": "smallint NOT NULL",
+    "quarter": "smallint NOT NULL CHECK (quarter BETWEEN 1 AND 4)",
+}
+
+# Managed layouts of the cleaned tables, in the column order of the cleaned DataFrames
+CLEANED_TABLES = {
+    "nyc_restraunts_cleaned": TableSchema(
+        columns={
+            "type": "text",
+            "name": "text NOT NULL",
+            "borough": "text",
+            "sidewalk_seating_approval": "text",
+            "roadway_seating_approval": "text",
+            "alcohol_permission": "text",
+        },
+        indexes=[("name",), ("borough",)],
+    ),
+    "nyc_inspection_cleaned": TableSchema(
+        columns={
+            "name": "text NOT NULL",
+            "borough": "text",
+            "inspection_date": "date NOT NULL",
+            "grade": GRADE,
+            **DATE_PARTS,
+        },
+        indexes=[
+            ("grade", "year"),
+            ("borough", "grade"),
+            ("name",),
+            ("inspection_date",),
+        ],
+    ),
+    "la_inspection_cleaned": TableSchema(
+        columns={
+            "inspection_date": "date NOT NULL",
+            "name": "text NOT NULL",
+            "grade": GRADE,
+            **DATE_PARTS,
+        },
+        indexes=[("grade", "year"), ("name",), ("inspection_date",)],
+    ),
+}